@@ -0,0 +1,517 @@
+'''
+File containing the Python ast compiler class.
+
+'''
+
+
+import ast
+import importlib.util
+import marshal
+
+from tokens import TokenType, Token
+from expression import Visitor as Expression_Visitor, Assign
+from statement import Visitor as Statement_Visitor
+from environment import key
+from regex_scanner import RegexScanner
+from custom_parser import Parser
+from parse_cache import ParseCache
+import interpreter
+from interpreter import RangeSet, variable_token
+
+
+FUNCTION_NAME = '_manipula'
+VALUES = '_values'
+
+NUMBER_OPERATORS = {
+    TokenType.MINUS: ast.Sub,
+    TokenType.FWD_SLASH: ast.Div,
+    TokenType.STAR: ast.Mult,
+    }
+
+COMPARISONS = {
+    TokenType.GREATER: ast.Gt,
+    TokenType.GREATER_EQUAL: ast.GtE,
+    TokenType.LESS: ast.Lt,
+    TokenType.LESS_EQUAL: ast.LtE,
+    }
+
+
+# =============================================================================
+# Runtime helpers, the globals of compiled code
+# =============================================================================
+
+
+def fail(message):
+    ''' Function to raise a runtime error from compiled code. '''
+    raise RuntimeError(message)
+
+
+def mismatched(left, right, message):
+    ''' Function to report a + between anything but two numbers or two strings. '''
+    print('Unknown or mismatched types() of left and right expressions.'\
+          f'Left is type {type(left)}, right is type {type(right)}.')
+    raise RuntimeError(message)
+
+
+def undefined(lexeme):
+    ''' Function to raise the error for an assignment to an undefined variable. '''
+    raise RuntimeError(f'Undefined variable "{lexeme}"')
+
+
+def assign(values, name, lexeme, value):
+    ''' Function to assign a variable inside a larger expression. '''
+    if name in values:
+        values[name] = value
+        return value
+    raise RuntimeError(f'Undefined variable "{lexeme}"')
+
+
+def range_set(lower, upper, name):
+    ''' Function to build the value of lower TO upper or [lower..upper]. '''
+    if type(lower) is float and type(upper) is float:
+        return RangeSet(lower, upper)
+    raise RuntimeError(f'{name} operands must be numbers')
+
+
+def for_range(numbers):
+    ''' Function to check the value of a FOR initialiser and count over it. '''
+    if type(numbers) is not RangeSet:
+        raise RuntimeError('FOR initialiser must be a range, "name := lower TO upper"')
+    return numbers.steps()
+
+
+def nothing(*values):
+    ''' Function for an operator with no meaning, which evaluates to None. '''
+    return None
+
+
+RUNTIME = {
+    '_fail': fail,
+    '_mismatched': mismatched,
+    '_undefined': undefined,
+    '_assign': assign,
+    '_range_set': range_set,
+    '_for_range': for_range,
+    '_nothing': nothing,
+    }
+
+
+# =============================================================================
+# Building ast nodes
+# =============================================================================
+
+
+def name(identifier, context=ast.Load):
+    ''' Function to build a Name node. '''
+    return ast.Name(id=identifier, ctx=context())
+
+
+def call(function, *arguments):
+    ''' Function to build a call to a named function. '''
+    return ast.Call(func=name(function), args=list(arguments), keywords=[])
+
+
+def is_type(value, type_name):
+    ''' Function to build type(value) is type_name. '''
+    return ast.Compare(left=call('type', value), ops=[ast.Is()], comparators=[name(type_name)])
+
+
+def variable(key_value, context=ast.Load):
+    ''' Function to build the _values[key] that a variable is stored in. '''
+    return ast.Subscript(value=name(VALUES), slice=ast.Constant(key_value), ctx=context())
+
+
+def first_line(node):
+    ''' Function to find the line of the first token in a statement or expression. '''
+    pending = [node]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, Token):
+            if item.line_number != None:
+                return item.line_number
+        elif isinstance(item, list):
+            pending.extend(reversed(item))
+        elif hasattr(item, 'accept'):
+            pending.extend(reversed([getattr(item, slot) for slot in type(item).__slots__]))
+    return None
+
+
+class Program:
+    '''
+    A compiled Manipula program.
+
+    code is a code object that defines the program as a function, and
+    names maps each variable key to its name for error messages. Both can
+    be marshalled, see CodeCache.
+
+    '''
+
+
+    def __init__(self, code, names):
+        self.code = code
+        self.names = names
+        self.function = None
+
+
+    def run(self, environment=None):
+        ''' Function to run the program, with variables in environment, by default the Interpreter's. '''
+        if environment == None:
+            environment = interpreter.environment
+        if self.function == None:
+            namespace = dict(RUNTIME)
+            exec(self.code, namespace)
+            self.function = namespace[FUNCTION_NAME]
+        try:
+            self.function(environment.values)
+        except KeyError as error:
+            # Variables are read with _values[key], so a missing key is an
+            # undefined variable. The traceback still ends at its line.
+            if not error.args or error.args[0] not in self.names:
+                raise
+            message = f'Undefined variable "{self.names[error.args[0]]}"'
+            raise RuntimeError(message).with_traceback(error.__traceback__) from None
+
+
+class CodeCache(ParseCache):
+    '''
+    ParseCache for the marshalled code and names of compiled programs.
+
+    Entries are keyed on the Python bytecode version too, since marshalled
+    code only loads on the version that wrote it.
+
+    '''
+
+
+    suffix = '.code'
+
+
+    def key(self, source, tag=''):
+        ''' Function to hash a source and tag into an entry name. '''
+        return super().key(source, f'{tag}:{importlib.util.MAGIC_NUMBER.hex()}')
+
+
+    def decode(self, file):
+        ''' Function to read an entry from an open cache file. '''
+        return marshal.load(file)
+
+
+    def encode(self, entry):
+        ''' Function to serialise an entry to bytes. '''
+        return marshal.dumps(entry)
+
+
+def compile_source(source, filename='<manipula>', cache=None):
+    '''
+    Function to scan, parse and compile a Manipula source into a Program.
+
+    filename is shown in tracebacks, which quote the Manipula source when
+    it is a real path. With a CodeCache, unchanged sources are not scanned,
+    parsed or compiled again.
+
+    '''
+    if cache != None:
+        entry = cache.load(source, filename)
+        if entry != None:
+            return Program(*entry)
+    scanner = RegexScanner(source)
+    if scanner.had_error:
+        raise RuntimeError('Error(s) exists in syntax, cannot compile file.')
+    program = AstCompiler.compile(Parser(scanner.tokens).parse(), filename)
+    if cache != None:
+        cache.store_entry(source, (program.code, program.names), filename)
+    return program
+
+
+class AstCompiler(Expression_Visitor, Statement_Visitor):
+    '''
+    Lowers the AST to Python ast nodes and compiles them with compile().
+
+    The program becomes the body of one function whose argument is the
+    environment's values dict, so temporaries are fast locals. Each
+    statement carries the line of its Manipula source, so tracebacks point
+    into the script. Values, output and error messages are the same as
+    Interpreter's.
+
+    '''
+
+
+    temporaries = 0
+    line = 1
+    names = None
+
+
+    def compile(statements, filename='<manipula>'):
+        ''' Function to compile a list of statements into a Program. '''
+        AstCompiler.temporaries = 0
+        AstCompiler.line = 1
+        AstCompiler.names = dict()
+        arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=VALUES)], vararg=None,
+                                  kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+        function = ast.FunctionDef(name=FUNCTION_NAME, args=arguments,
+                                   body=AstCompiler.block(statements),
+                                   decorator_list=[], returns=None, lineno=1, col_offset=0)
+        module = ast.fix_missing_locations(ast.Module(body=[function], type_ignores=[]))
+        for node in ast.walk(module):
+            # A Manipula line maps to a whole Python line, blocks included
+            if hasattr(node, 'end_lineno'):
+                node.end_lineno = node.lineno
+                node.end_col_offset = node.col_offset
+        return Program(compile(module, filename, 'exec'), AstCompiler.names)
+
+
+    def block(statements):
+        ''' Function to lower a list of statements, a block cannot be empty in Python. '''
+        nodes = []
+        for statement in statements:
+            nodes.extend(AstCompiler.lower(statement))
+        return nodes or [ast.Pass(lineno=AstCompiler.line, col_offset=0)]
+
+
+    def lower(statement):
+        ''' Function to lower one statement and give its nodes its line number. '''
+        line = first_line(statement)
+        if line != None:
+            AstCompiler.line = line
+        line = AstCompiler.line
+        nodes = statement.accept(AstCompiler)
+        for node in nodes:
+            if not hasattr(node, 'lineno'):
+                node.lineno = line
+                node.col_offset = 0
+        return nodes
+
+
+    def evaluate(expression):
+        ''' Function to send an expression back into the compiler's visitor implementation. '''
+        return expression.accept(AstCompiler)
+
+
+    def temporary():
+        ''' Function to get the name of a new temporary local. '''
+        AstCompiler.temporaries += 1
+        return f'_t{AstCompiler.temporaries}'
+
+
+    def store(temporary, value):
+        ''' Function to build (temporary := value). '''
+        return ast.NamedExpr(target=name(temporary, ast.Store), value=value)
+
+
+    def truthy(value):
+        ''' Function to build a test that value is not None or False, the Interpreter's truth. '''
+        temporary = AstCompiler.temporary()
+        return ast.BoolOp(op=ast.And(), values=[
+            ast.Compare(left=AstCompiler.store(temporary, value), ops=[ast.IsNot()],
+                        comparators=[ast.Constant(None)]),
+            ast.Compare(left=name(temporary), ops=[ast.IsNot()], comparators=[ast.Constant(False)])])
+
+
+    def falsey(value, temporary=None):
+        ''' Function to build a test that value is None or False. '''
+        temporary = temporary or AstCompiler.temporary()
+        return ast.BoolOp(op=ast.Or(), values=[
+            ast.Compare(left=AstCompiler.store(temporary, value), ops=[ast.Is()],
+                        comparators=[ast.Constant(None)]),
+            ast.Compare(left=name(temporary), ops=[ast.Is()], comparators=[ast.Constant(False)])])
+
+
+    def variable_key(variable_name):
+        ''' Function to get the environment key of a variable and record its name. '''
+        token = variable_token(variable_name)
+        name_key = key(token)
+        AstCompiler.names[name_key] = token.lexeme
+        return name_key, token.lexeme
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        expression = statement.expression
+        if type(expression) != Assign:
+            return [ast.Expr(value=AstCompiler.evaluate(expression))]
+        # An assignment on its own needs no helper call
+        name_key, lexeme = AstCompiler.variable_key(expression.name)
+        temporary = AstCompiler.temporary()
+        return [
+            ast.Assign(targets=[name(temporary, ast.Store)],
+                       value=AstCompiler.evaluate(expression.value)),
+            ast.If(test=ast.Compare(left=ast.Constant(name_key), ops=[ast.NotIn()],
+                                    comparators=[name(VALUES)]),
+                   body=[ast.Expr(value=call('_undefined', ast.Constant(lexeme)))], orelse=[]),
+            ast.Assign(targets=[variable(name_key, ast.Store)], value=name(temporary)),
+            ]
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        value = AstCompiler.evaluate(statement.expression)
+        return [ast.Expr(value=call('print', call('str', value)))]
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        name_key, _ = AstCompiler.variable_key(statement.name)
+        if statement.initialiser == None:
+            value = ast.Constant(None)
+        else:
+            value = AstCompiler.evaluate(statement.initialiser)
+        return [ast.Assign(targets=[variable(name_key, ast.Store)], value=value)]
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        nodes = AstCompiler.branch(statement.condition, statement.then_branch, [])
+        last = nodes[0]
+        for elif_branch in statement.elif_branch:
+            last.orelse = AstCompiler.lower(elif_branch)
+            last = last.orelse[0]
+        if statement.else_branch != None:
+            last.orelse = AstCompiler.block(statement.else_branch)
+        return nodes
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method, as an if with no else. '''
+        return AstCompiler.branch(statement.condition, statement.then_branch, [])
+
+
+    def branch(condition, then_branch, otherwise):
+        ''' Function to lower a condition and the branches it chooses between. '''
+        test = AstCompiler.truthy(AstCompiler.evaluate(condition))
+        return [ast.If(test=test, body=AstCompiler.block(then_branch), orelse=otherwise)]
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        test = AstCompiler.truthy(AstCompiler.evaluate(statement.condition))
+        return [ast.While(test=test, body=AstCompiler.block(statement.body), orelse=[])]
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if not hasattr(initialiser, 'initialiser') or initialiser.initialiser == None:
+            message = 'FOR initialiser must be a range, "name := lower TO upper"'
+            return [ast.Expr(value=call('_fail', ast.Constant(message)))]
+        numbers = call('_for_range', AstCompiler.evaluate(initialiser.initialiser))
+        name_key, _ = AstCompiler.variable_key(initialiser.name)
+        return [ast.For(target=variable(name_key, ast.Store), iter=numbers,
+                        body=AstCompiler.block(statement.body), orelse=[])]
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        left = AstCompiler.evaluate(expression.left)
+        right = AstCompiler.evaluate(expression.right)
+        operator_type = expression.operator.type
+
+        if operator_type in NUMBER_OPERATORS or operator_type in COMPARISONS or operator_type == TokenType.PLUS:
+            # Both operands are evaluated before either is checked, as the
+            # Interpreter does, so the test uses & rather than and
+            a = AstCompiler.temporary()
+            b = AstCompiler.temporary()
+            numbers = ast.BinOp(left=is_type(AstCompiler.store(a, left), 'float'), op=ast.BitAnd(),
+                                right=is_type(AstCompiler.store(b, right), 'float'))
+            if operator_type in NUMBER_OPERATORS:
+                result = ast.BinOp(left=name(a), op=NUMBER_OPERATORS[operator_type](), right=name(b))
+            elif operator_type in COMPARISONS:
+                result = ast.Compare(left=name(a), ops=[COMPARISONS[operator_type]()], comparators=[name(b)])
+            else:
+                result = ast.BinOp(left=name(a), op=ast.Add(), right=name(b))
+                strings = ast.BinOp(left=is_type(name(a), 'str'), op=ast.BitAnd(), right=is_type(name(b), 'str'))
+                message = f'{expression.operator} operands must be two numbers or two strings'
+                return ast.IfExp(test=ast.BoolOp(op=ast.Or(), values=[numbers, strings]), body=result,
+                                 orelse=call('_mismatched', name(a), name(b), ast.Constant(message)))
+            message = f'{expression.operator} operands must be numbers'
+            return ast.IfExp(test=numbers, body=result, orelse=call('_fail', ast.Constant(message)))
+        elif operator_type == TokenType.IN:
+            return ast.Compare(left=left, ops=[ast.In()], comparators=[right])
+        elif operator_type == TokenType.EQUAL_EQUAL:
+            # None == x is only True for None, as Interpreter.is_equal() says
+            return ast.Compare(left=left, ops=[ast.Eq()], comparators=[right])
+        elif operator_type == TokenType.BANG_EQUAL:
+            return ast.Compare(left=left, ops=[ast.NotEq()], comparators=[right])
+        else:
+            return call('_nothing', left, right)
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        return AstCompiler.evaluate(expression.expression)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        return ast.Constant(expression.value)
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        right = AstCompiler.evaluate(expression.right)
+        operator_type = expression.operator.type
+        if operator_type == TokenType.MINUS:
+            a = AstCompiler.temporary()
+            message = f'{expression.operator} operand must be a number'
+            return ast.IfExp(test=is_type(AstCompiler.store(a, right), 'float'),
+                             body=ast.UnaryOp(op=ast.USub(), operand=name(a)),
+                             orelse=call('_fail', ast.Constant(message)))
+        elif operator_type == TokenType.BANG or operator_type == TokenType.NOT:
+            return AstCompiler.falsey(right)
+        else:
+            return call('_nothing', right)
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        name_key, _ = AstCompiler.variable_key(expression.name)
+        return variable(name_key)
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        return AstCompiler.visit_variable_expression(expression)
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        name_key, lexeme = AstCompiler.variable_key(expression.name)
+        return call('_assign', name(VALUES), ast.Constant(name_key), ast.Constant(lexeme),
+                    AstCompiler.evaluate(expression.value))
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        left = AstCompiler.evaluate(expression.left)
+        right = AstCompiler.evaluate(expression.right)
+        temporary = AstCompiler.temporary()
+        falsey = AstCompiler.falsey(left, temporary)
+        if expression.operator.type == TokenType.OR:
+            return ast.IfExp(test=falsey, body=right, orelse=name(temporary))
+        return ast.IfExp(test=falsey, body=name(temporary), orelse=right)
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        return ast.List(elts=[AstCompiler.evaluate(element) for element in expression.sequence],
+                        ctx=ast.Load())
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        return call('_range_set', AstCompiler.evaluate(expression.lower),
+                    AstCompiler.evaluate(expression.upper), ast.Constant('TO'))
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        return call('_range_set', AstCompiler.evaluate(expression.lower),
+                    AstCompiler.evaluate(expression.upper), ast.Constant('[..]'))
@@ -119,6 +119,12 @@ class AstPrinter(Expression_Visitor, Statement_Visitor):
         ''' Overwrites the Expression.visit_unary() class method. '''
         return AstPrinter.parenthesise(expression.operator.lexeme,
                                        [expression.right])
+    
+    
+    def visit_range_list(expression):
+        ''' Overwrites the Expression.visit_range_list() class method. '''
+        return AstPrinter.parenthesise('range-list', [expression.lower,
+                                                      expression.upper])
 
     # Statments
     
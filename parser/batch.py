@@ -0,0 +1,201 @@
+'''
+File containing the batch converter.
+
+Converts every Manipula script under the given directories or globs to
+Python across a process pool, e.g.
+
+    python batch.py scripts/ "other/**/*.man" --output converted/
+
+Files whose contents are unchanged since the last run, according to the
+manifest, are skipped, unless they were converted with other options.
+
+'''
+
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from manipula import Manipula
+from parse_cache import ParseCache, GRAMMAR_VERSION, atomic_write
+
+
+MANIFEST_NAME = '.manipula-manifest.json'
+
+
+def content_hash(data, options=''):
+    '''
+    Function to hash a file's bytes, together with the grammar version and
+    the options that change its output, so changing either converts it again.
+
+    '''
+    return hashlib.sha256(f'{GRAMMAR_VERSION}:{options}:'.encode() + data).hexdigest()
+
+
+def glob_root(pattern):
+    ''' Function to get the directory a glob pattern starts matching in. '''
+    parts = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if any(character in part for character in '*?['):
+            break
+        parts.append(part)
+    return os.sep.join(parts)
+
+
+def find_sources(patterns, extension):
+    '''
+    Function to expand directories and globs into (source, root) pairs.
+
+    Directories are searched recursively for files ending in extension.
+    root is the directory outputs are placed relative to.
+
+    '''
+    sources = dict()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for directory, _, names in os.walk(pattern):
+                for name in sorted(names):
+                    if name.endswith(extension):
+                        sources.setdefault(os.path.join(directory, name), pattern)
+        else:
+            root = glob_root(pattern)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    sources.setdefault(path, root)
+    return list(sources.items())
+
+
+def output_path(source, root, output_directory):
+    ''' Function to get the .py path a source is written to. '''
+    if output_directory == None:
+        target = source
+    else:
+        target = os.path.join(output_directory, os.path.relpath(source, root))
+    return os.path.splitext(target)[0] + '.py'
+
+
+def convert_file(job):
+    '''
+    Function to convert one source in a worker process.
+
+    Returns the source, its content hash, the seconds taken, an error
+    message, which is None if the output was written, and the repeated
+    expressions reused and node evaluations this saved.
+
+    '''
+    source, target, digest, cache_directory, eliminate_common = job
+    start = time.perf_counter()
+    reused = saved = 0
+    try:
+        cache = ParseCache(cache_directory) if cache_directory != None else None
+        manipula = Manipula(source, cache=cache, eliminate_common=eliminate_common)
+        reused, saved = manipula.reused, manipula.saved
+        if manipula.scanner != None and manipula.scanner.had_error:
+            raise ValueError('syntax errors, see above')
+        syntax = ''.join(line + '\n' for line in manipula.syntax)
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        atomic_write(target, syntax.encode())
+        error = None
+    except Exception as exception:
+        error = str(exception) or type(exception).__name__
+    return source, digest, time.perf_counter() - start, error, reused, saved
+
+
+def load_manifest(path):
+    ''' Function to load the content hashes converted by the previous run. '''
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return dict()
+
+
+def chunk_size(jobs, workers):
+    ''' Function to choose how many files each worker takes at a time. '''
+    return max(1, len(jobs) // (workers * 4))
+
+
+def convert(patterns, output_directory=None, manifest_path=None, workers=None,
+            chunksize=None, extension='.man', cache_directory=None, eliminate_common=False):
+    '''
+    Function to convert every changed source and print timings.
+
+    With eliminate_common, repeated expressions are computed once, see
+    CommonSubexpressions, and the evaluations saved are printed too.
+
+    Returns the number of files that failed to convert.
+
+    '''
+    start = time.perf_counter()
+    if manifest_path == None:
+        manifest_path = os.path.join(output_directory or '.', MANIFEST_NAME)
+    old_manifest = load_manifest(manifest_path)
+    manifest = dict()
+    options = f'eliminate_common={eliminate_common}'
+
+    jobs = []
+    skipped = 0
+    for source, root in find_sources(patterns, extension):
+        with open(source, 'rb') as file:
+            digest = content_hash(file.read(), options)
+        target = output_path(source, root, output_directory)
+        if old_manifest.get(source) == digest and os.path.exists(target):
+            manifest[source] = digest
+            skipped += 1
+        else:
+            jobs.append((source, target, digest, cache_directory, eliminate_common))
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or chunk_size(jobs, workers)
+    failed = 0
+    busy = 0.0
+    total_reused = total_saved = 0
+    if jobs:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as executor:
+            for source, digest, elapsed, error, reused, saved in executor.map(convert_file, jobs,
+                                                                              chunksize=chunksize):
+                busy += elapsed
+                total_reused += reused
+                total_saved += saved
+                if error == None:
+                    manifest[source] = digest
+                    print(f'{elapsed * 1000:9.1f}ms  {source}')
+                else:
+                    failed += 1
+                    print(f'{elapsed * 1000:9.1f}ms  {source}  FAILED: {error}')
+    atomic_write(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode())
+
+    wall = time.perf_counter() - start
+    converted = len(jobs) - failed
+    print(f'{converted} converted, {skipped} unchanged, {failed} failed '
+          f'in {wall:.2f}s with {workers} workers (chunks of {chunksize}); '
+          f'{busy:.2f}s converting, {converted / wall:.1f} files/s')
+    if eliminate_common:
+        print(f'{total_reused} repeated expressions reused, saving {total_saved} node evaluations')
+    return failed
+
+
+def main(arguments=None):
+    ''' Function to run the batch converter from the command line. '''
+    parser = argparse.ArgumentParser(description='Convert Manipula scripts to Python.')
+    parser.add_argument('paths', nargs='+', help='directories or globs of scripts')
+    parser.add_argument('--output', help='directory for .py files, default next to each script')
+    parser.add_argument('--manifest', help=f'manifest file, default {MANIFEST_NAME} in the output directory')
+    parser.add_argument('--workers', type=int, help='worker processes, default one per core')
+    parser.add_argument('--chunksize', type=int, help='files sent to a worker at a time')
+    parser.add_argument('--extension', default='.man', help='script extension searched for in directories')
+    parser.add_argument('--cache', help='ParseCache directory shared by the workers')
+    parser.add_argument('--eliminate-common', action='store_true',
+                        help='compute repeated expressions once and report the evaluations saved')
+    options = parser.parse_args(arguments)
+    failed = convert(options.paths, options.output, options.manifest, options.workers,
+                     options.chunksize, options.extension, options.cache, options.eliminate_common)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,698 @@
+'''
+File containing benchmarks for the scanner, parser and interpreter.
+
+Run from this directory with "python benchmark.py".
+
+'''
+
+
+import mmap
+import random
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from tokens import TokenType, Token
+from scanner import Scanner
+from regex_scanner import RegexScanner
+from bytes_scanner import BytesScanner
+from token_buffer import BufferScanner
+from incremental_scanner import IncrementalScanner
+from parallel_scanner import ParallelScanner
+from parallel_parser import ParallelParser
+from incremental_parser import IncrementalParser
+from block_parser import BlockParser
+from custom_parser import Parser
+from pratt_parser import PrattParser
+from hash_consing_parser import HashConsingParser
+from python_printer import PythonPrinter
+from interpreter import Interpreter
+from closure_compiler import ClosureCompiler
+from ast_compiler import AstCompiler, CodeCache, compile_source
+from bytecode_compiler import BytecodeCompiler
+from virtual_machine import VirtualMachine
+from resolver import Resolver
+from optimiser import Optimiser, count_nodes
+from dead_code import DeadCodeEliminator
+from loop_invariants import LoopInvariantMotion
+from common_subexpressions import CommonSubexpressions
+from environment import Environment
+import interpreter
+from parse_cache import ParseCache
+from manipula import Manipula, convert_stream
+
+
+# A block of Manipula exercising comments, strings, lists and nested blocks
+SAMPLE_BLOCK = '''{ generated block {nested comment} }
+count := 0
+name := 'Respondent name'
+ages := [1..10]
+codes := [1, 2, 3]
+answer := household.member[index].age
+IF (count = 0) AND (answer > 18) THEN
+    PRINT 'adult'
+ELSEIF (answer < 5) THEN
+    PRINT 'infant'
+ELSE
+    PRINT 'child'
+ENDIF
+FOR index := 1 TO household.size DO
+    PRINT index
+ENDDO
+'''
+
+
+def generate_source(blocks):
+    ''' Function to generate a Manipula source of the given number of blocks. '''
+    return SAMPLE_BLOCK * blocks
+
+
+def token_key(tokens):
+    ''' Function to reduce a token list to comparable tuples. '''
+    return [(token.type, token.lexeme, token.literal, token.line_number)
+            for token in tokens]
+
+
+def tree_key(node):
+    ''' Function to reduce a statement list or AST node to comparable values. '''
+    if isinstance(node, list):
+        return [tree_key(element) for element in node]
+    elif isinstance(node, Token):
+        return (node.type, node.lexeme, node.literal, node.line_number)
+    elif hasattr(node, 'accept'):
+        return (type(node).__name__,
+                [(name, tree_key(getattr(node, name))) for name in sorted(type(node).__slots__)])
+    else:
+        return (type(node), node)
+
+
+def best_time(function, repeat):
+    ''' Function to return the fastest of repeat timed calls to function. '''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def compare_scanners(blocks=2000, repeat=3):
+    ''' Function to compare the throughput of Scanner and RegexScanner. '''
+    source = generate_source(blocks)
+    reference = token_key(Scanner(source).tokens)
+    if token_key(RegexScanner(source).tokens) != reference:
+        raise RuntimeError('RegexScanner tokens differ from Scanner tokens')
+
+    print(f'Scanning {len(source)} characters, {len(reference)} tokens')
+    baseline = None
+    for scanner_class in (Scanner, RegexScanner):
+        elapsed = best_time(lambda: scanner_class(source), repeat)
+        rate = len(source) / elapsed / 1e6
+        if baseline == None:
+            baseline = elapsed
+        print(f'{scanner_class.__name__:>16}: {elapsed:.3f}s '
+              f'({rate:.2f} MB/s, x{baseline / elapsed:.1f})')
+
+
+def write_temporary_source(blocks):
+    ''' Function to write a generated source to a temporary file and return its path. '''
+    handle, path = tempfile.mkstemp(suffix='.man')
+    with os.fdopen(handle, 'w') as file:
+        file.write(generate_source(blocks))
+    return path
+
+
+def streaming_memory(sizes=(500, 2000, 8000)):
+    ''' Function to show peak memory of streamed scanning, parsing and printing is flat. '''
+    for blocks in sizes:
+        path = write_temporary_source(blocks)
+        try:
+            with open(os.devnull, 'w') as output_file:
+                tracemalloc.start()
+                scanner, parser = convert_stream(path, output_file)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        finally:
+            os.remove(path)
+        print(f'{blocks * len(SAMPLE_BLOCK):>10} characters, '
+              f'{scanner.line_number} lines: peak {peak / 1024:.0f} KiB')
+
+
+def compare_input_paths(blocks=4000):
+    ''' Function to compare reading a str against scanning an mmap as bytes. '''
+    path = write_temporary_source(blocks)
+
+    def read_and_scan():
+        with open(path, 'r') as file:
+            return RegexScanner(file.read())
+
+    def map_and_scan():
+        with open(path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                return BytesScanner(source)
+
+    try:
+        print(f'Scanning a {os.path.getsize(path)} byte file')
+        for name, function in (('read()', read_and_scan), ('mmap', map_and_scan)):
+            tracemalloc.start()
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            elapsed = best_time(function, 3)
+            print(f'{name:>16}: {elapsed:.3f}s, peak {peak / 1024 / 1024:.1f} MiB')
+    finally:
+        os.remove(path)
+
+
+def token_memory(blocks=2000):
+    ''' Function to compare the bytes per token of a Token list and a TokenBuffer. '''
+    source = generate_source(blocks)
+    for scanner_class in (RegexScanner, BufferScanner):
+        tracemalloc.start()
+        tokens = scanner_class(source).tokens
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        elapsed = best_time(lambda: scanner_class(source), 3)
+        print(f'{scanner_class.__name__:>16}: {size / len(tokens):.1f} bytes per token, '
+              f'{len(tokens)} tokens scanned in {elapsed:.3f}s')
+        del tokens
+
+
+def incremental_rescan(sizes=(200, 2000, 20000)):
+    ''' Function to time re-scanning a one line edit against a full scan. '''
+    for blocks in sizes:
+        source = generate_source(blocks)
+        scanner = IncrementalScanner(source)
+        offset = source.index('count := 0', len(source) // 2)
+        edits = [(offset, 10, 'count := 10'), (offset, 11, 'count := 0')]
+        start = time.perf_counter()
+        for edit in edits:
+            scanner.edit(*edit)
+        elapsed = (time.perf_counter() - start) / len(edits)
+        full = best_time(lambda: RegexScanner(source), 1)
+        print(f'{len(source):>10} characters: edit {elapsed * 1000:.2f}ms, '
+              f'full scan {full * 1000:.0f}ms')
+
+
+def generate_field_source(lines, fields, seed=0):
+    ''' Function to generate assignments between a fixed set of field names. '''
+    generator = random.Random(seed)
+    names = [f'Household_Field{number}' for number in range(fields)]
+    return ''.join(f'{generator.choice(names)} := {generator.choice(names)} + '
+                   f'{generator.choice(names)}\n' for _ in range(lines))
+
+
+def identifier_interning(lines=50000, fields=300):
+    ''' Function to show the effect of interned identifiers and symbol ids. '''
+    source = generate_field_source(lines, fields)
+    scanner = RegexScanner(source)
+    statements = Parser(scanner.tokens).parse()
+    identifiers = [token for token in scanner.tokens if token.type == TokenType.IDENTIFIER]
+    lexemes = len({id(token.lexeme) for token in identifiers})
+    print(f'{len(identifiers)} identifier tokens share {lexemes} lexeme strings '
+          f'({len(scanner.symbols)} symbols)')
+    for name, symbols in (('lower() per use', None), ('symbol ids', scanner.symbols)):
+        elapsed = best_time(lambda: PythonPrinter._write(statements, symbols), 3)
+        print(f'{name:>16}: printed in {elapsed:.3f}s')
+
+
+def parallel_scanning(blocks=20000, workers=(1, 2, 4, 8)):
+    ''' Function to show how ParallelScanner scales with the number of workers. '''
+    source = generate_source(blocks)
+    reference = token_key(BufferScanner(source).tokens)
+    print(f'Scanning {len(source)} characters on {os.cpu_count()} cores')
+    baseline = None
+    for count in workers:
+        scanner = ParallelScanner(source, count, minimum_chunk=1)
+        if token_key(scanner.tokens) != reference:
+            raise RuntimeError('ParallelScanner tokens differ from a serial scan')
+        elapsed = best_time(lambda: ParallelScanner(source, count, minimum_chunk=1), 3)
+        if baseline == None:
+            baseline = elapsed
+        print(f'{count:>4} workers: {elapsed:.3f}s (x{baseline / elapsed:.1f})')
+
+
+def generate_expression_source(lines, seed=0):
+    ''' Function to generate assignments with long, mixed-precedence expressions. '''
+    generator = random.Random(seed)
+    operators = ['+', '-', '*', '/', '>', '<=', '=', '<>', 'AND', 'OR', 'IN']
+    lines_out = []
+    for _ in range(lines):
+        terms = [generator.choice(['a', 'b.c', '2', "'s'", '(d - 1)', 'NOT e', '-f'])
+                 for _ in range(8)]
+        expression = terms[0]
+        for term in terms[1:]:
+            expression += f' {generator.choice(operators)} {term}'
+        lines_out.append(f'x := {expression}\n')
+    return ''.join(lines_out)
+
+
+def compare_parsers(lines=20000, repeat=3):
+    ''' Function to compare Parser and PrattParser on expression heavy source. '''
+    tokens = RegexScanner(generate_expression_source(lines)).tokens
+    reference = tree_key(Parser(tokens).parse())
+    if tree_key(PrattParser(tokens).parse()) != reference:
+        raise RuntimeError('PrattParser trees differ from Parser trees')
+
+    print(f'Parsing {len(tokens)} tokens of expressions')
+    baseline = None
+    for parser_class in (Parser, PrattParser):
+        elapsed = best_time(lambda: parser_class(tokens).parse(), repeat)
+        if baseline == None:
+            baseline = elapsed
+        print(f'{parser_class.__name__:>16}: {elapsed:.3f}s (x{baseline / elapsed:.1f})')
+
+
+def range_lists(width=100000):
+    '''
+    Function to compare a range list with a fully expanded list.
+
+    "[0, 1..width]" still expands to one Literal per element, so it stands
+    in for how "[1..width]" was parsed before Range_List.
+
+    '''
+    for name, source in (('expanded', f'x := [0, 1..{width}]'),
+                         ('Range_List', f'x := [1..{width}]')):
+        tokens = RegexScanner(source).tokens
+        tracemalloc.start()
+        statements = Parser(tokens).parse()
+        syntax = PythonPrinter._write(statements)[0]
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        elapsed = best_time(lambda: PythonPrinter._write(Parser(tokens).parse()), 3)
+        print(f'{name:>16}: parsed and printed in {elapsed:.4f}s, '
+              f'peak {peak / 1024:.0f} KiB, {len(syntax[0])} characters of Python')
+
+
+def incremental_reparse(blocks=3200):
+    ''' Function to time refreshing the AST after a one line edit. '''
+    source = generate_source(blocks)
+    scanner = IncrementalScanner(source)
+    parser = IncrementalParser(scanner.tokens)
+    old_statements = parser.parse()
+    full = best_time(lambda: Parser(scanner.tokens).parse(), 1)
+
+    offset = source.index('count := 0', len(source) // 2)
+    start = time.perf_counter()
+    changed = scanner.edit(offset, 10, 'count := 10')
+    statements = parser.reparse(scanner.tokens, *changed)
+    elapsed = time.perf_counter() - start
+
+    if tree_key(statements) != tree_key(Parser(scanner.tokens).parse()):
+        raise RuntimeError('IncrementalParser statements differ from a full parse')
+    reused = len(set(map(id, statements)) & set(map(id, old_statements)))
+    print(f'{source.count(chr(10))} lines: edit re-scanned and re-parsed in '
+          f'{elapsed * 1000:.1f}ms, full parse {full * 1000:.0f}ms, '
+          f'{reused} of {len(statements)} statements reused')
+
+
+def generate_nested_source(depth):
+    ''' Function to generate IF, FOR and WHILE blocks nested depth levels deep. '''
+    openers = ['IF a > 1 THEN\n', 'FOR i := 1 TO 2 DO\n', 'WHILE (b) DO\n']
+    closers = ['ELSEIF a < 1 THEN PRINT 1\nELSE PRINT 2\nENDIF\n', 'ENDDO\n', 'ENDDO\n']
+    levels = [level % 3 for level in range(depth)]
+    return (''.join(openers[level] for level in levels) + 'x := 1\n'
+            + ''.join(closers[level] for level in reversed(levels)))
+
+
+def nesting_stress(depths=(10000, 50000)):
+    ''' Function to time BlockParser on deeply nested blocks, checked in test_block_parser.py. '''
+    for depth in depths:
+        tokens = RegexScanner(generate_nested_source(depth)).tokens
+        try:
+            Parser(tokens).parse()
+            recursive = 'parsed'
+        except RecursionError:
+            recursive = 'RecursionError'
+        start = time.perf_counter()
+        BlockParser(tokens).parse()
+        elapsed = time.perf_counter() - start
+        print(f'{depth:>8} levels: Parser {recursive}, BlockParser {elapsed:.3f}s')
+
+
+def parse_cache(files=200, blocks=20):
+    ''' Function to time converting unchanged files with a cold and a warm cache. '''
+    source = generate_source(blocks)
+    paths = []
+    for index in range(files):
+        handle, path = tempfile.mkstemp(suffix='.man')
+        with os.fdopen(handle, 'w') as file:
+            file.write(f'{{ file {index} }}\n' + source)
+        paths.append(path)
+    directory = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(directory)
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            conversions = [Manipula(path, cache=cache) for path in paths]
+            timings.append(time.perf_counter() - start)
+        if any(conversion.scanner != None for conversion in conversions):
+            raise RuntimeError('warm run scanned a cached file')
+        if conversions[0].syntax != Manipula(paths[0]).syntax:
+            raise RuntimeError('cached conversion differs from a fresh one')
+        print(f'{files} files: cold {timings[0]:.2f}s, warm {timings[1]:.2f}s '
+              f'({timings[0] / timings[1]:.1f}x)')
+    finally:
+        shutil.rmtree(directory)
+        for path in paths:
+            os.remove(path)
+
+
+def unslotted(node, classes):
+    ''' Function to copy an AST into equivalent classes that keep a __dict__. '''
+    if isinstance(node, list):
+        return [unslotted(element, classes) for element in node]
+    elif not hasattr(node, 'accept') or isinstance(node, Token):
+        return node
+    node_class = type(node)
+    if node_class not in classes:
+        classes[node_class] = type(node_class.__name__, (),
+                                   {'__init__': node_class.__init__})
+    return classes[node_class](*[unslotted(getattr(node, name), classes)
+                                 for name in node_class.__slots__])
+
+
+def node_memory(blocks=2000):
+    ''' Function to compare AST memory with __slots__ nodes and __dict__ nodes. '''
+    tokens = RegexScanner(generate_source(blocks)).tokens
+    parse_time = best_time(lambda: Parser(tokens).parse(), 3)
+
+    tracemalloc.start()
+    statements = Parser(tokens).parse()
+    slotted = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    classes = {}
+    tracemalloc.start()
+    copy = unslotted(statements, classes)
+    with_dict = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    nodes = 0
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif hasattr(node, 'accept') and not isinstance(node, Token):
+            nodes += 1
+            pending.extend(getattr(node, name) for name in type(node).__slots__)
+    print(f'{nodes} nodes: {slotted / nodes:.0f} bytes per node with __slots__, '
+          f'{with_dict / nodes:.0f} with __dict__, parse {parse_time:.3f}s')
+
+
+def allocated(function):
+    ''' Function to call function and return its result and the bytes it left allocated. '''
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def hash_consing(blocks=2000, repeat=3):
+    ''' Function to compare ASTs and printing with and without shared subtrees. '''
+    scanner = RegexScanner(generate_source(blocks))
+    tokens = scanner.tokens
+    statements, plain_size = allocated(lambda: Parser(tokens).parse())
+    parser = HashConsingParser(tokens)
+    shared, shared_size = allocated(parser.parse)
+
+    plain_text = PythonPrinter._write(statements, scanner.symbols)[0]
+    if PythonPrinter._write(shared, scanner.symbols, True)[0] != plain_text:
+        raise RuntimeError('shared AST prints differently')
+
+    parse_plain = best_time(lambda: Parser(tokens).parse(), repeat)
+    parse_shared = best_time(lambda: HashConsingParser(tokens).parse(), repeat)
+    print_plain = best_time(lambda: PythonPrinter._write(statements, scanner.symbols), repeat)
+    print_shared = best_time(lambda: PythonPrinter._write(shared, scanner.symbols, True), repeat)
+    print(f'{parser.occurrences} expressions, {len(parser.pool)} unique, '
+          f'{len(parser.constants)} constants: AST {plain_size >> 10}KB -> {shared_size >> 10}KB, '
+          f'parse {parse_plain:.3f}s -> {parse_shared:.3f}s, '
+          f'print {print_plain:.3f}s -> {print_shared:.3f}s')
+
+
+def parallel_parsing(blocks=4000, workers=(1, 2, 4, 8)):
+    ''' Function to show how ParallelParser scales with the number of workers. '''
+    tokens = RegexScanner(generate_source(blocks)).tokens
+    reference = tree_key(Parser(tokens).parse())
+    serial = best_time(lambda: Parser(tokens).parse(), 3)
+    print(f'Parsing {len(tokens)} tokens on {os.cpu_count()} cores, serial {serial:.3f}s')
+    for count in workers:
+        if tree_key(ParallelParser(tokens, count, minimum_chunk=1).parse()) != reference:
+            raise RuntimeError('ParallelParser statements differ from a serial parse')
+        elapsed = best_time(lambda: ParallelParser(tokens, count, minimum_chunk=1).parse(), 3)
+        print(f'{count:>4} workers: {elapsed:.3f}s (x{serial / elapsed:.1f})')
+
+
+def generate_loop_source(iterations):
+    ''' Function to generate a tight WHILE loop with arithmetic and a branch. '''
+    return (f'x := 0\ntotal := 0\nWHILE (x < {iterations}) DO\n'
+            '    x := x + 1\n'
+            '    IF x > 10 THEN total := total + x * 2\n'
+            '    ELSE total := total - 1\n'
+            '    ENDIF\n'
+            'ENDDO\n')
+
+
+def generate_for_source(iterations):
+    ''' Function to generate nested FOR loops with a compare and an update per iteration. '''
+    inner = 100
+    return (f'total := 0\nFOR i := 1 TO {iterations // inner} DO\n'
+            f'    FOR j := 1 TO {inner} DO\n'
+            '        IF j < 50 THEN total := total + j\n'
+            '        ELSE total := total - 1\n'
+            '        ENDIF\n'
+            '    ENDDO\n'
+            'ENDDO\n')
+
+
+def run_interpreter(statements):
+    ''' Function to run statements with the visitor Interpreter. '''
+    Interpreter().interpret(statements)
+
+
+def run_checked_interpreter(statements):
+    ''' Function to run statements with the visitor Interpreter, checking every operator's types. '''
+    Interpreter(infer_types=False).interpret(statements)
+
+
+def run_closures(statements):
+    ''' Function to compile statements to closures and run them. '''
+    ClosureCompiler.compile(statements)()
+
+
+def run_ast(statements):
+    ''' Function to compile statements through Python's ast and run them. '''
+    AstCompiler.compile(statements).run()
+
+
+def run_bytecode(statements):
+    ''' Function to compile statements to bytecode and run them on the VirtualMachine. '''
+    VirtualMachine.run(BytecodeCompiler.compile(statements))
+
+
+def loop_engines(iterations=200000, engines=(run_interpreter, run_closures, run_ast, run_bytecode),
+                 repeat=3, generate=generate_loop_source):
+    ''' Function to compare the execution engines on a loop-heavy script. '''
+    print(f'{generate.__name__}:')
+    scanner = RegexScanner(generate(iterations))
+    statements = Parser(scanner.tokens).parse()
+    total = scanner.symbols.intern('total')
+    results = []
+    baseline = None
+    for engine in engines:
+        interpreter.environment.values.clear()
+        elapsed = best_time(lambda: engine(statements), repeat)
+        results.append(interpreter.environment.values[total])
+        if baseline == None:
+            baseline = elapsed
+        print(f'{engine.__name__:>24}: {iterations} iterations in {elapsed:.3f}s '
+              f'(x{baseline / elapsed:.1f})')
+    if len(set(results)) != 1:
+        raise RuntimeError(f'engines disagree: {results}')
+
+
+def type_specialisation(iterations=200000):
+    ''' Function to time the Interpreter with and without inferred operand types. '''
+    for generate in (generate_loop_source, generate_for_source):
+        loop_engines(iterations, (run_checked_interpreter, run_interpreter), generate=generate)
+
+
+def variable_slots(lookups=1000000, repeat=3):
+    ''' Function to time variable reads by name in an Environment and by slot in a Frame. '''
+    scanner = RegexScanner(generate_loop_source(10))
+    statements = Parser(scanner.tokens).parse()
+    environment = Environment()
+    frame = Resolver.resolve(statements)
+    for slot, name_key in enumerate(frame.keys):
+        environment.values[name_key] = frame.values[slot] = float(slot)
+    tokens = [token for token in scanner.tokens if token.type == TokenType.IDENTIFIER]
+    tokens = (tokens * (lookups // len(tokens) + 1))[:lookups]
+    slot_names = frame.slot_names()
+    slots = [slot_names[token.lexeme] for token in tokens]
+    by_name = best_time(lambda: [environment.get(token) for token in tokens], repeat)
+    by_slot = best_time(lambda: [frame.get(slot) for slot in slots], repeat)
+    resolve = best_time(lambda: Resolver.resolve(statements), repeat)
+    print(f'{lookups} reads: Environment {by_name:.3f}s, Frame {by_slot:.3f}s '
+          f'(x{by_name / by_slot:.1f}); resolving took {resolve * 1000:.2f}ms')
+
+
+def constant_folding(iterations=200000, repeat=3):
+    ''' Function to time the Interpreter on a loop full of constants, with and without the Optimiser. '''
+    source = (f'x := 0\ntotal := 0\nWHILE (x < {iterations}) DO\n'
+              '    x := x + 1\n'
+              '    total := total + (2 * 3) - (10 / 5) + x * (1 + 1)\n'
+              '    IF NOT NOT (x > (100 * 10)) OR FALSE THEN total := total - ((1))\n'
+              '    ENDIF\n'
+              'ENDDO\n')
+    scanner = RegexScanner(source)
+    statements = Parser(scanner.tokens).parse()
+    total = scanner.symbols.intern('total')
+    start = time.perf_counter()
+    optimised = Optimiser.optimise(statements)
+    optimising = time.perf_counter() - start
+    results = []
+    for label, program in (('as parsed', statements), ('optimised', optimised)):
+        interpreter.environment.values.clear()
+        elapsed = best_time(lambda: Interpreter().interpret(program), repeat)
+        results.append(interpreter.environment.values[total])
+        print(f'{label:>10}: {iterations} iterations in {elapsed:.3f}s')
+    if results[0] != results[1]:
+        raise RuntimeError(f'optimised program gave {results[1]}, not {results[0]}')
+    print(f'Optimiser eliminated {Optimiser.eliminated} of {count_nodes(statements)} nodes '
+          f'in {optimising * 1000:.2f}ms')
+
+
+def dead_code(iterations=200000, repeat=3):
+    ''' Function to time the Interpreter on a loop with dead branches and stores, with and without removing them. '''
+    source = ('DEBUG := FALSE\nx := 0\ntotal := 0\nprevious := 0\nWHILE (x < ' f'{iterations}' ') DO\n'
+              '    previous := total\n'
+              '    x := x + 1\n'
+              '    IF DEBUG THEN PRINT x\n'
+              '    ENDIF\n'
+              '    IF FALSE THEN PRINT previous\n'
+              '    ELSE total := total + x\n'
+              '    ENDIF\n'
+              'ENDDO\n'
+              'previous := total\n')
+    scanner = RegexScanner(source)
+    statements = Optimiser.optimise(Parser(scanner.tokens).parse())
+    start = time.perf_counter()
+    eliminated = DeadCodeEliminator.eliminate(statements)
+    eliminating = time.perf_counter() - start
+    for label, program in (('as parsed', statements), ('eliminated', eliminated)):
+        interpreter.environment.values.clear()
+        elapsed = best_time(lambda: Interpreter().interpret(program), repeat)
+        lines = '\n'.join(PythonPrinter._write(program)[0]).count('\n') + 1
+        print(f'{label:>10}: {iterations} iterations in {elapsed:.3f}s, {lines} lines of Python')
+    print(f'DeadCodeEliminator took {eliminating * 1000:.2f}ms:')
+    for line in DeadCodeEliminator.report:
+        print(f'    {line}')
+
+
+def loop_invariants(iterations=100000, repeat=3):
+    ''' Function to time the Interpreter on nested loops, with and without moving their invariants out. '''
+    source = ('width := 3\nheight := 4\nscale := 2\ni := 0\ntotal := 0\n'
+              f'WHILE (i < {iterations} * scale / 2) DO\n'
+              '    i := i + 1\n'
+              '    total := total + width * height * scale\n'
+              '    FOR j := 1 TO 2 DO\n'
+              '        total := total + (i * scale - width) * j\n'
+              '    ENDDO\n'
+              'ENDDO\n')
+    scanner = RegexScanner(source)
+    statements = Parser(scanner.tokens).parse()
+    total = scanner.symbols.intern('total')
+    start = time.perf_counter()
+    moved = LoopInvariantMotion.move(statements)
+    moving = time.perf_counter() - start
+    results = []
+    for label, program in (('as parsed', statements), ('moved', moved)):
+        interpreter.environment.values.clear()
+        elapsed = best_time(lambda: Interpreter().interpret(program), repeat)
+        results.append(interpreter.environment.values[total])
+        print(f'{label:>10}: {iterations} iterations in {elapsed:.3f}s')
+    if results[0] != results[1]:
+        raise RuntimeError(f'moved program gave {results[1]}, not {results[0]}')
+    print(f'LoopInvariantMotion moved {LoopInvariantMotion.moved} expressions in {moving * 1000:.2f}ms')
+
+
+def common_subexpressions(iterations=50000, repeat=3):
+    ''' Function to time the Interpreter on a loop that repeats expressions, with and without sharing them. '''
+    source = ('household.member[1] := 40\nhousehold.size := 3\nadults := 0\nscore := 0\ni := 0\n'
+              f'WHILE (i < {iterations}) DO\n'
+              '    i := i + 1\n'
+              '    household.member[1] := household.member[1] + 1\n'
+              '    score := household.member[1] + household.size\n'
+              '    IF household.member[1] + household.size > 18 THEN\n'
+              '        adults := adults + (household.member[1] + household.size) / 2\n'
+              '    ELSEIF household.member[1] + household.size > 5 THEN\n'
+              '        adults := adults - 1\n'
+              '    ENDIF\n'
+              '    score := score * (household.member[1] + household.size)\n'
+              'ENDDO\n')
+    scanner = RegexScanner(source)
+    statements = Parser(scanner.tokens).parse()
+    adults = scanner.symbols.intern('adults')
+    start = time.perf_counter()
+    eliminated = CommonSubexpressions.eliminate(statements)
+    eliminating = time.perf_counter() - start
+    results = []
+    for label, program in (('as parsed', statements), ('shared', eliminated)):
+        interpreter.environment.values.clear()
+        elapsed = best_time(lambda: Interpreter().interpret(program), repeat)
+        results.append(interpreter.environment.values[adults])
+        print(f'{label:>10}: {iterations} iterations in {elapsed:.3f}s')
+    if results[0] != results[1]:
+        raise RuntimeError(f'shared program gave {results[1]}, not {results[0]}')
+    print(f'CommonSubexpressions declared {CommonSubexpressions.temporaries} temporaries in '
+          f'{eliminating * 1000:.2f}ms, reusing {CommonSubexpressions.reused} repeats, '
+          f'{CommonSubexpressions.saved} node evaluations saved per pass')
+
+
+def code_cache(blocks=2000, repeat=3):
+    ''' Function to time compiling a script to a code object with and without a CodeCache. '''
+    source = generate_source(blocks)
+    directory = tempfile.mkdtemp()
+    try:
+        cache = CodeCache(directory)
+        compile_source(source, cache=cache)
+        cold = best_time(lambda: compile_source(source), repeat)
+        warm = best_time(lambda: compile_source(source, cache=cache), repeat)
+        print(f'Compiling {len(source)} characters: {cold:.3f}s, cached {warm:.4f}s '
+              f'(x{cold / warm:.0f})')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    compare_scanners()
+    streaming_memory()
+    compare_input_paths()
+    token_memory()
+    incremental_rescan()
+    identifier_interning()
+    parallel_scanning()
+    parallel_parsing()
+    compare_parsers()
+    range_lists()
+    incremental_reparse()
+    nesting_stress()
+    parse_cache()
+    node_memory()
+    hash_consing()
+    loop_engines()
+    loop_engines(generate=generate_for_source)
+    variable_slots()
+    type_specialisation()
+    constant_folding()
+    dead_code()
+    loop_invariants()
+    common_subexpressions()
+    code_cache()
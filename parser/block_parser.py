@@ -0,0 +1,134 @@
+'''
+File containing the block parser class.
+
+'''
+
+
+from tokens import TokenType
+from statement import If, Elif, While, For
+from custom_parser import Parser
+
+
+class Block:
+    '''
+    An IF, FOR or WHILE statement whose body is still being parsed.
+
+    statements is the branch that the next nested statement is added to.
+
+    '''
+    __slots__ = ('kind', 'condition', 'then_branch', 'elif_branch',
+                 'else_branch', 'statements')
+
+
+    def __init__(self, kind, condition):
+        self.kind = kind
+        self.condition = condition
+        self.then_branch = []
+        self.elif_branch = []
+        self.else_branch = None
+        self.statements = self.then_branch
+
+
+class BlockParser(Parser):
+    '''
+    Parser that keeps open IF, FOR and WHILE blocks on an explicit stack
+    instead of recursing through statement() for every nesting level.
+
+    Nesting depth costs one Block on the heap rather than several Python
+    frames, so deeply nested generated code does not hit the recursion
+    limit. The If, Elif, For and While nodes are the same as Parser's.
+    Passes over the tree, such as PythonPrinter and Interpreter, still
+    recurse for every level, so a tree deeper than they allow must be
+    handled by the caller, see nesting.nesting_depth().
+
+    '''
+
+
+    def statement(self):
+        ''' Function to parse one statement, with any nested blocks. '''
+        stack = []
+        while True:
+            # Close the innermost block if its terminator is next
+            if stack:
+                finished = self.close_block(stack[-1])
+                if finished != None:
+                    stack.pop()
+                    if not stack:
+                        return finished
+                    stack[-1].statements.append(finished)
+                    continue
+
+            # Otherwise open a nested block or parse a simple statement
+            block = self.open_block()
+            if block != None:
+                stack.append(block)
+                continue
+            if self.match([TokenType.PRINT]):
+                simple = self.print_statement()
+            else:
+                simple = self.expression_statement()
+            if not stack:
+                return simple
+            stack[-1].statements.append(simple)
+
+
+    def open_block(self):
+        ''' Function to parse the header of an IF, FOR or WHILE block, if one is next. '''
+        if self.match([TokenType.FOR]):
+            if self.check(TokenType.IDENTIFIER):
+                initialiser = self.var_declaration()
+            else:
+                self.error(self.tokens[self.current], 'expect IDENTIFIER after "FOR"')
+            self.consume(TokenType.DO, 'expect "DO" after FOR initialiser')
+            return Block(TokenType.FOR, initialiser)
+        elif self.match([TokenType.IF]):
+            condition = self.expression()
+            self.consume(TokenType.THEN, 'expect a "THEN" after condition')
+            return Block(TokenType.IF, condition)
+        elif self.match([TokenType.WHILE]):
+            self.consume(TokenType.LEFT_PAREN, 'expect a "(" after "while"')
+            condition = self.expression()
+            self.consume(TokenType.RIGHT_PAREN, 'expect a ")" after condition')
+            self.consume(TokenType.DO, 'expect "DO" after WHILE condition')
+            return Block(TokenType.WHILE, condition)
+        else:
+            return None
+
+
+    def close_block(self, block):
+        '''
+        Function to handle the token after a statement in a block.
+
+        Starts the next ELSEIF or ELSE branch, or consumes the terminator
+        and returns the finished statement. Returns None if the block's
+        current branch continues.
+
+        '''
+        if block.kind == TokenType.FOR:
+            if not self.check(TokenType.ENDDO):
+                return None
+            self.consume(TokenType.ENDDO, 'expect an "ENDDO" after for statement')
+            return For(block.condition, block.then_branch)
+        elif block.kind == TokenType.WHILE:
+            if not self.check(TokenType.ENDDO):
+                return None
+            self.consume(TokenType.ENDDO, 'expect an "ENDDO" after WHILE statement')
+            return While(block.condition, block.then_branch)
+
+        # IF: ELSEIF and ELSE may only follow the THEN or an ELSEIF branch,
+        # and a new branch may itself be empty
+        while block.else_branch == None:
+            if self.match([TokenType.ELIF]):
+                elif_condition = self.expression()
+                self.consume(TokenType.THEN, 'expect a "THEN" after condition')
+                block.statements = []
+                block.elif_branch.append(Elif(elif_condition, block.statements))
+            elif self.match([TokenType.ELSE]):
+                block.else_branch = []
+                block.statements = block.else_branch
+            else:
+                break
+        if not self.check(TokenType.ENDIF):
+            return None
+        self.consume(TokenType.ENDIF, 'expect an "ENDIF" after if statement')
+        return If(block.condition, block.then_branch, block.elif_branch, block.else_branch)
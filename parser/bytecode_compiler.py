@@ -0,0 +1,429 @@
+'''
+File containing the bytecode compiler class.
+
+'''
+
+
+import operator
+
+from tokens import TokenType
+from expression import Visitor as Expression_Visitor, Assign, Binary, Grouping, Literal, \
+    Variable_Expression
+from statement import Visitor as Statement_Visitor
+from environment import key
+from interpreter import variable_token
+from ast_compiler import first_line
+
+
+# =============================================================================
+# Instruction set
+# =============================================================================
+
+# Each instruction is an opcode followed by a fixed number of integer
+# operands, OPERANDS[opcode], all stored flat in Chunk.code
+
+CONSTANT = 0                    # k: push constants[k]
+LOAD = 1                        # s: push slot s
+DEFINE = 2                      # s: pop into slot s
+ASSIGN = 3                      # s: pop into slot s, which must be defined
+ASSIGN_KEEP = 4                 # s: as ASSIGN, leaving the value on the stack
+POP = 5
+PRINT = 6
+ADD = 7                         # m: two numbers or two strings, else error constants[m]
+NUMBER_OPERATION = 8            # o m: OPERATIONS[o] of two numbers, else error constants[m]
+EQUAL = 9
+NOT_EQUAL = 10
+IN = 11
+NEGATE = 12                     # m
+NOT = 13
+RANGE = 14                      # m: RangeSet of two numbers
+LIST = 15                       # n: pop n values into a list
+JUMP = 16                       # t: go to t
+JUMP_IF_FALSE = 17              # t: pop, go to t if None or False
+JUMP_IF_FALSE_OR_POP = 18       # t: go to t keeping the value if None or False, else pop
+JUMP_IF_TRUE_OR_POP = 19        # t: go to t keeping the value unless None or False, else pop
+RANGE_ITERATOR = 20             # replace a RangeSet with an iterator over its FOR steps
+FOR_NEXT = 21                   # s t: next number into slot s, or pop the iterator and go to t
+FAIL = 22                       # m: raise constants[m]
+RETURN = 23
+
+# Superinstructions for the patterns loops are made of
+COMPARE_JUMP = 24               # o m t: pop two numbers, go to t unless OPERATIONS[o] holds
+COMPARE_LOCAL_CONSTANT_JUMP = 25    # o s k m t: as COMPARE_JUMP on slot s and constants[k]
+INCREMENT = 26                  # s k m: slot s := slot s + constants[k]
+DECREMENT = 27                  # s k m: slot s := slot s - constants[k]
+
+OPCODE_NAMES = ('CONSTANT', 'LOAD', 'DEFINE', 'ASSIGN', 'ASSIGN_KEEP', 'POP', 'PRINT', 'ADD',
+                'NUMBER_OPERATION', 'EQUAL', 'NOT_EQUAL', 'IN', 'NEGATE', 'NOT', 'RANGE', 'LIST',
+                'JUMP', 'JUMP_IF_FALSE', 'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP',
+                'RANGE_ITERATOR', 'FOR_NEXT', 'FAIL', 'RETURN', 'COMPARE_JUMP',
+                'COMPARE_LOCAL_CONSTANT_JUMP', 'INCREMENT', 'DECREMENT')
+
+OPERANDS = (1, 1, 1, 1, 1, 0, 0, 1, 2, 0, 0, 0, 1, 0, 1, 1, 1, 1, 1, 1, 0, 2, 1, 0, 3, 5, 3, 3)
+
+# Operations of NUMBER_OPERATION and the compare-and-branch instructions
+OPERATIONS = (operator.sub, operator.truediv, operator.mul,
+              operator.gt, operator.ge, operator.lt, operator.le)
+
+OPERATION_TYPES = (TokenType.MINUS, TokenType.FWD_SLASH, TokenType.STAR,
+                   TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL)
+
+OPERATION_SYMBOLS = ('-', '/', '*', '>', '>=', '<', '<=')
+
+# The first operation that is a comparison
+FIRST_COMPARISON = 3
+
+
+class Chunk:
+    '''
+    A compiled Manipula program.
+
+    code is the flat list of opcodes and operands, constants the pool the
+    operands index, and slot i holds the variable stored under keys[i] in
+    an Environment, named names[i]. lines maps the first instruction of
+    each statement to its Manipula line.
+
+    '''
+
+
+    def __init__(self):
+        self.code = []
+        self.constants = []
+        self.keys = []
+        self.names = []
+        self.lines = dict()
+
+
+def disassemble(chunk):
+    ''' Function to list a chunk's instructions, one per line, with their operands explained. '''
+    lines = []
+    pc = 0
+    while pc < len(chunk.code):
+        opcode = chunk.code[pc]
+        operands = chunk.code[pc + 1:pc + 1 + OPERANDS[opcode]]
+        notes = []
+        if opcode in (CONSTANT, FAIL, ADD, NEGATE, RANGE):
+            notes.append(repr(chunk.constants[operands[0]]))
+        elif opcode in (LOAD, DEFINE, ASSIGN, ASSIGN_KEEP, FOR_NEXT):
+            notes.append(chunk.names[operands[0]])
+        elif opcode in (NUMBER_OPERATION, COMPARE_JUMP):
+            notes.append(OPERATION_SYMBOLS[operands[0]])
+        elif opcode == COMPARE_LOCAL_CONSTANT_JUMP:
+            notes.append(f'{chunk.names[operands[1]]} {OPERATION_SYMBOLS[operands[0]]} '
+                         f'{chunk.constants[operands[2]]!r}')
+        elif opcode in (INCREMENT, DECREMENT):
+            symbol = '+' if opcode == INCREMENT else '-'
+            notes.append(f'{chunk.names[operands[0]]} {symbol} {chunk.constants[operands[1]]!r}')
+        if opcode in (JUMP, JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP, FOR_NEXT,
+                      COMPARE_JUMP, COMPARE_LOCAL_CONSTANT_JUMP):
+            notes.append(f'to {operands[-1]}')
+        line = chunk.lines.get(pc, '')
+        text = ' '.join(str(operand) for operand in operands)
+        lines.append(f'{line:>5} {pc:>6} {OPCODE_NAMES[opcode]:<28} {text:<14} {", ".join(notes)}'.rstrip())
+        pc += 1 + len(operands)
+    return '\n'.join(lines)
+
+
+class BytecodeCompiler(Expression_Visitor, Statement_Visitor):
+    '''
+    Compiles statements into a Chunk of bytecode for VirtualMachine.
+
+    Each variable gets an integer slot and every value an index into the
+    constant pool. IF, ELSEIF, WHILE and FOR become jumps, and conditions
+    that compare two numbers branch in one instruction.
+
+    '''
+
+
+    chunk = None
+    constant_indices = None
+    slots = None
+
+
+    def compile(statements):
+        ''' Function to compile a list of statements into a Chunk. '''
+        BytecodeCompiler.chunk = Chunk()
+        BytecodeCompiler.constant_indices = dict()
+        BytecodeCompiler.slots = dict()
+        BytecodeCompiler.block(statements)
+        BytecodeCompiler.emit(RETURN)
+        return BytecodeCompiler.chunk
+
+
+    def block(statements):
+        ''' Function to compile a list of statements, recording the line each starts on. '''
+        for statement in statements:
+            line = first_line(statement)
+            if line != None:
+                BytecodeCompiler.chunk.lines.setdefault(len(BytecodeCompiler.chunk.code), line)
+            statement.accept(BytecodeCompiler)
+
+
+    def compile_expression(expression):
+        ''' Function to send an expression back into the compiler's visitor implementation. '''
+        expression.accept(BytecodeCompiler)
+
+
+    def emit(opcode, *operands):
+        ''' Function to append an instruction, returning the index of its last operand. '''
+        code = BytecodeCompiler.chunk.code
+        code.append(opcode)
+        code.extend(operands)
+        return len(code) - 1
+
+
+    def here():
+        ''' Function to get the index the next instruction will start at. '''
+        return len(BytecodeCompiler.chunk.code)
+
+
+    def patch(operand):
+        ''' Function to point the jump target at operand to the next instruction. '''
+        BytecodeCompiler.chunk.code[operand] = BytecodeCompiler.here()
+
+
+    def constant(value):
+        ''' Function to get the index of a value in the constant pool, adding it once. '''
+        # Keyed on type and repr, so 1.0 and TRUE or 0.0 and -0.0 stay apart
+        value_key = (type(value), repr(value))
+        if value_key not in BytecodeCompiler.constant_indices:
+            BytecodeCompiler.constant_indices[value_key] = len(BytecodeCompiler.chunk.constants)
+            BytecodeCompiler.chunk.constants.append(value)
+        return BytecodeCompiler.constant_indices[value_key]
+
+
+    def slot(name):
+        ''' Function to get the slot of a variable, giving it the next slot the first time. '''
+        token = variable_token(name)
+        name_key = key(token)
+        if name_key not in BytecodeCompiler.slots:
+            BytecodeCompiler.slots[name_key] = len(BytecodeCompiler.chunk.keys)
+            BytecodeCompiler.chunk.keys.append(name_key)
+            BytecodeCompiler.chunk.names.append(token.lexeme)
+        return BytecodeCompiler.slots[name_key]
+
+
+    def message(token, text):
+        ''' Function to add the error message for an operator to the constant pool. '''
+        return BytecodeCompiler.constant(f'{token} {text}')
+
+
+    def condition(expression):
+        '''
+        Function to compile a condition that falls through when it holds.
+
+        Returns the operand to patch with the target to jump to otherwise.
+
+        '''
+        while type(expression) == Grouping:
+            expression = expression.expression
+        if type(expression) == Binary and expression.operator.type in OPERATION_TYPES[FIRST_COMPARISON:]:
+            operation = OPERATION_TYPES.index(expression.operator.type)
+            message = BytecodeCompiler.message(expression.operator, 'operands must be numbers')
+            left = expression.left
+            right = expression.right
+            if type(left) == Variable_Expression and type(right) == Literal and type(right.value) is float:
+                return BytecodeCompiler.emit(COMPARE_LOCAL_CONSTANT_JUMP, operation,
+                                             BytecodeCompiler.slot(left), BytecodeCompiler.constant(right.value),
+                                             message, 0)
+            BytecodeCompiler.compile_expression(left)
+            BytecodeCompiler.compile_expression(right)
+            return BytecodeCompiler.emit(COMPARE_JUMP, operation, message, 0)
+        BytecodeCompiler.compile_expression(expression)
+        return BytecodeCompiler.emit(JUMP_IF_FALSE, 0)
+
+
+    def increment(assignment):
+        ''' Function to compile name := name + number or name - number as one instruction, if it is one. '''
+        value = assignment.value
+        if type(value) != Binary or value.operator.type not in (TokenType.PLUS, TokenType.MINUS):
+            return False
+        if type(value.left) != Variable_Expression or type(value.right) != Literal or type(value.right.value) is not float:
+            return False
+        slot = BytecodeCompiler.slot(assignment.name)
+        if BytecodeCompiler.slot(value.left) != slot:
+            return False
+        if value.operator.type == TokenType.PLUS:
+            message = BytecodeCompiler.message(value.operator, 'operands must be two numbers or two strings')
+            BytecodeCompiler.emit(INCREMENT, slot, BytecodeCompiler.constant(value.right.value), message)
+        else:
+            message = BytecodeCompiler.message(value.operator, 'operands must be numbers')
+            BytecodeCompiler.emit(DECREMENT, slot, BytecodeCompiler.constant(value.right.value), message)
+        return True
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        expression = statement.expression
+        if type(expression) != Assign:
+            BytecodeCompiler.compile_expression(expression)
+            BytecodeCompiler.emit(POP)
+        elif not BytecodeCompiler.increment(expression):
+            BytecodeCompiler.compile_expression(expression.value)
+            BytecodeCompiler.emit(ASSIGN, BytecodeCompiler.slot(expression.name))
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        BytecodeCompiler.compile_expression(statement.expression)
+        BytecodeCompiler.emit(PRINT)
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        if statement.initialiser == None:
+            BytecodeCompiler.emit(CONSTANT, BytecodeCompiler.constant(None))
+        else:
+            BytecodeCompiler.compile_expression(statement.initialiser)
+        BytecodeCompiler.emit(DEFINE, BytecodeCompiler.slot(statement.name))
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        exits = []
+        branches = [statement] + list(statement.elif_branch)
+        for index, branch in enumerate(branches):
+            otherwise = BytecodeCompiler.condition(branch.condition)
+            BytecodeCompiler.block(branch.then_branch)
+            if index < len(branches) - 1 or statement.else_branch != None:
+                exits.append(BytecodeCompiler.emit(JUMP, 0))
+            BytecodeCompiler.patch(otherwise)
+        if statement.else_branch != None:
+            BytecodeCompiler.block(statement.else_branch)
+        for operand in exits:
+            BytecodeCompiler.patch(operand)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method, as an IF with no else. '''
+        otherwise = BytecodeCompiler.condition(statement.condition)
+        BytecodeCompiler.block(statement.then_branch)
+        BytecodeCompiler.patch(otherwise)
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        start = BytecodeCompiler.here()
+        otherwise = BytecodeCompiler.condition(statement.condition)
+        BytecodeCompiler.block(statement.body)
+        BytecodeCompiler.emit(JUMP, start)
+        BytecodeCompiler.patch(otherwise)
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if not hasattr(initialiser, 'initialiser') or initialiser.initialiser == None:
+            message = 'FOR initialiser must be a range, "name := lower TO upper"'
+            BytecodeCompiler.emit(FAIL, BytecodeCompiler.constant(message))
+            return
+        BytecodeCompiler.compile_expression(initialiser.initialiser)
+        BytecodeCompiler.emit(RANGE_ITERATOR)
+        start = BytecodeCompiler.here()
+        done = BytecodeCompiler.emit(FOR_NEXT, BytecodeCompiler.slot(initialiser.name), 0)
+        BytecodeCompiler.block(statement.body)
+        BytecodeCompiler.emit(JUMP, start)
+        BytecodeCompiler.patch(done)
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        BytecodeCompiler.compile_expression(expression.left)
+        BytecodeCompiler.compile_expression(expression.right)
+        token = expression.operator
+        if token.type in OPERATION_TYPES:
+            BytecodeCompiler.emit(NUMBER_OPERATION, OPERATION_TYPES.index(token.type),
+                                  BytecodeCompiler.message(token, 'operands must be numbers'))
+        elif token.type == TokenType.PLUS:
+            BytecodeCompiler.emit(ADD, BytecodeCompiler.message(token, 'operands must be two numbers or two strings'))
+        elif token.type == TokenType.IN:
+            BytecodeCompiler.emit(IN)
+        elif token.type == TokenType.EQUAL_EQUAL:
+            BytecodeCompiler.emit(EQUAL)
+        elif token.type == TokenType.BANG_EQUAL:
+            BytecodeCompiler.emit(NOT_EQUAL)
+        else:
+            BytecodeCompiler.emit(POP)
+            BytecodeCompiler.emit(POP)
+            BytecodeCompiler.emit(CONSTANT, BytecodeCompiler.constant(None))
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        BytecodeCompiler.compile_expression(expression.expression)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        BytecodeCompiler.emit(CONSTANT, BytecodeCompiler.constant(expression.value))
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        BytecodeCompiler.compile_expression(expression.right)
+        token = expression.operator
+        if token.type == TokenType.MINUS:
+            BytecodeCompiler.emit(NEGATE, BytecodeCompiler.message(token, 'operand must be a number'))
+        elif token.type == TokenType.BANG or token.type == TokenType.NOT:
+            BytecodeCompiler.emit(NOT)
+        else:
+            BytecodeCompiler.emit(POP)
+            BytecodeCompiler.emit(CONSTANT, BytecodeCompiler.constant(None))
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        BytecodeCompiler.emit(LOAD, BytecodeCompiler.slot(expression))
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        BytecodeCompiler.emit(LOAD, BytecodeCompiler.slot(expression))
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        BytecodeCompiler.compile_expression(expression.value)
+        BytecodeCompiler.emit(ASSIGN_KEEP, BytecodeCompiler.slot(expression.name))
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        BytecodeCompiler.compile_expression(expression.left)
+        if expression.operator.type == TokenType.OR:
+            done = BytecodeCompiler.emit(JUMP_IF_TRUE_OR_POP, 0)
+        else:
+            done = BytecodeCompiler.emit(JUMP_IF_FALSE_OR_POP, 0)
+        BytecodeCompiler.compile_expression(expression.right)
+        BytecodeCompiler.patch(done)
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        for element in expression.sequence:
+            BytecodeCompiler.compile_expression(element)
+        BytecodeCompiler.emit(LIST, len(expression.sequence))
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        BytecodeCompiler.compile_expression(expression.lower)
+        BytecodeCompiler.compile_expression(expression.upper)
+        BytecodeCompiler.emit(RANGE, BytecodeCompiler.constant('TO operands must be numbers'))
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        BytecodeCompiler.compile_expression(expression.lower)
+        BytecodeCompiler.compile_expression(expression.upper)
+        BytecodeCompiler.emit(RANGE, BytecodeCompiler.constant('[..] operands must be numbers'))
@@ -0,0 +1,144 @@
+'''
+File containing the bytes scanner class.
+
+'''
+
+
+import re
+
+from tokens import TokenType, Token
+from regex_scanner import RegexScanner, TOKEN_PATTERN, OPERATORS
+
+
+# TOKEN_PATTERN compiled for bytes, so it can run directly over an mmap
+BYTES_TOKEN_PATTERN = re.compile(TOKEN_PATTERN.pattern.encode('ascii'),
+                                 TOKEN_PATTERN.flags & ~re.UNICODE)
+
+# Sources are single-byte ASCII/Latin-1, so any byte decodes to one character
+ENCODING = 'latin-1'
+
+
+def translate_newlines(text):
+    ''' Function to turn CRLF and CR line endings into LF, as reading in text mode does. '''
+    if '\r' in text:
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def count_newlines(source, start, end):
+    '''
+    Function to count the line endings between start and end using find().
+
+    CRLF, CR and LF each end one line, the same line endings text mode
+    translates, so line numbers match the text path on any source.
+
+    '''
+    count = 0
+    for ending in (b'\n', b'\r'):
+        position = source.find(ending, start, end)
+        while position != -1:
+            count += 1
+            position = source.find(ending, position + 1, end)
+    # A CRLF was counted as both a CR and an LF
+    position = source.find(b'\r\n', start, end)
+    while position != -1:
+        count -= 1
+        position = source.find(b'\r\n', position + 2, end)
+    return count
+
+
+def skip_comment_bytes(source, position, depth=1):
+    '''
+    Function to skip the rest of a (possibly nested) comment in bytes.
+
+    Same as regex_scanner.skip_comment() but only uses find(), which an
+    mmap supports, so the comment is never copied.
+
+    '''
+    while depth:
+        close = source.find(b'}', position)
+        if close == -1:
+            return len(source), depth
+        opening = source.find(b'{', position, close)
+        if opening == -1:
+            depth -= 1
+            position = close + 1
+        else:
+            depth += 1
+            position = opening + 1
+    return position, depth
+
+
+class BytesScanner(RegexScanner):
+    '''
+    Scanner that works directly on a bytes-like source, such as an mmap.
+
+    Lexemes are only decoded when their Token is created. String literals,
+    which can be long, are decoded straight from a memoryview of the source
+    without an intermediate bytes copy. CRLF and CR line endings are
+    translated as in text mode, in line numbers and in string literals.
+
+    '''
+
+
+    def generate_tokens(self, position=0):
+        ''' Function to lazily scan tokens from position to the end of the source. '''
+        source = self.source
+        view = memoryview(source)
+        length = len(source)
+        match = BYTES_TOKEN_PATTERN.match
+        keywords = self.keywords
+        intern = self.symbols.intern
+        names = self.symbols.names
+
+        while position < length:
+            found = match(source, position)
+            kind = found.lastgroup
+            end = found.end()
+
+            if kind == 'WHITESPACE':
+                text = found.group()
+                if b'\r' in text:
+                    self.line_number += count_newlines(text, 0, len(text))
+                else:
+                    self.line_number += text.count(b'\n')
+            elif kind == 'IDENTIFIER':
+                text = found.group().decode(ENCODING)
+                token_type = keywords.get(text)
+                if token_type == None:
+                    symbol_id = intern(text)
+                    yield Token(TokenType.IDENTIFIER, names[symbol_id], None,
+                                self.line_number, position, symbol_id)
+                else:
+                    yield Token(token_type, text, None, self.line_number, position)
+            elif kind == 'OPERATOR':
+                text = found.group().decode(ENCODING)
+                yield Token(OPERATORS[text], text, None, self.line_number, position)
+            elif kind == 'NUMBER':
+                text = found.group().decode(ENCODING)
+                yield Token(TokenType.NUMBER, text, float(text), self.line_number, position)
+            elif kind == 'STRING':
+                text = translate_newlines(str(view[position:end], ENCODING))
+                self.line_number += text.count('\n')
+                value = text[1:-1]
+                yield Token(TokenType.STRING, text, value, self.line_number, position)
+            elif kind == 'COMMENT':
+                end, depth = skip_comment_bytes(source, end)
+                self.line_number += self.count_lines(position, end)
+                if depth:
+                    self.error('Unmatched character "{"')
+                    return
+            elif kind == 'UNMATCHED':
+                self.error('Unmatched character "}"')
+            elif kind == 'UNTERMINATED':
+                self.line_number += self.count_lines(position, length)
+                self.error('Untermenated string')
+                return
+            else:
+                self.error(f'Unexpected character "{str(view[position:end], ENCODING)}"')
+            position = end
+
+
+    def count_lines(self, start, end):
+        ''' Function to count the line endings between start and end using find(). '''
+        return count_newlines(self.source, start, end)
@@ -0,0 +1,376 @@
+'''
+File containing the closure compiler class.
+
+'''
+
+
+import operator
+
+from tokens import TokenType
+from expression import Visitor as Expression_Visitor
+from statement import Visitor as Statement_Visitor
+from environment import key
+import interpreter
+from interpreter import RangeSet, variable_token
+
+
+# Binary operators that take two numbers, by the function applied to them
+NUMBER_OPERATIONS = {
+    TokenType.MINUS: operator.sub,
+    TokenType.FWD_SLASH: operator.truediv,
+    TokenType.STAR: operator.mul,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    }
+
+
+def nothing():
+    ''' Function compiled from an empty block. '''
+    return None
+
+
+def number_operation(left, right, operation, token):
+    ''' Function to compile a binary operator that takes two numbers. '''
+    def evaluate():
+        left_value = left()
+        right_value = right()
+        if type(left_value) is float and type(right_value) is float:
+            return operation(left_value, right_value)
+        raise RuntimeError(f'{token} operands must be numbers')
+    return evaluate
+
+
+def range_set(lower, upper, name):
+    ''' Function to compile a range, lower TO upper or [lower..upper]. '''
+    def evaluate():
+        lower_value = lower()
+        upper_value = upper()
+        if type(lower_value) is float and type(upper_value) is float:
+            return RangeSet(lower_value, upper_value)
+        raise RuntimeError(f'{name} operands must be numbers')
+    return evaluate
+
+
+class ClosureCompiler(Expression_Visitor, Statement_Visitor):
+    '''
+    Compiles statements once into nested Python closures that run them.
+
+    Operators, variable keys and the shape of each branch are chosen at
+    compile time, so running a program is only calls between closures.
+    Values, output and error messages are the same as Interpreter's.
+
+    '''
+
+
+    values = None
+
+
+    def compile(statements, environment=None):
+        '''
+        Function to compile a list of statements into a function that runs them.
+
+        Variables live in environment, by default the Interpreter's.
+
+        '''
+        if environment == None:
+            environment = interpreter.environment
+        ClosureCompiler.values = environment.values
+        return ClosureCompiler.block(statements)
+
+
+    def block(statements):
+        ''' Function to compile a list of statements into one closure. '''
+        compiled = tuple(statement.accept(ClosureCompiler) for statement in statements)
+        if not compiled:
+            return nothing
+        elif len(compiled) == 1:
+            return compiled[0]
+
+        def run_block():
+            for run in compiled:
+                run()
+        return run_block
+
+
+    def compile_expression(expression):
+        ''' Function to send an expression back into the compiler's visitor implementation. '''
+        return expression.accept(ClosureCompiler)
+
+
+    def variable(name):
+        ''' Function to get the environment key and lexeme of a variable name. '''
+        token = variable_token(name)
+        return key(token), token.lexeme
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        return ClosureCompiler.compile_expression(statement.expression)
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        value = ClosureCompiler.compile_expression(statement.expression)
+
+        def run_print():
+            print(str(value()))
+        return run_print
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        values = ClosureCompiler.values
+        name, _ = ClosureCompiler.variable(statement.name)
+        if statement.initialiser == None:
+            def declare():
+                values[name] = None
+            return declare
+        value = ClosureCompiler.compile_expression(statement.initialiser)
+
+        def define():
+            values[name] = value()
+        return define
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        otherwise = None
+        if statement.else_branch != None:
+            otherwise = ClosureCompiler.block(statement.else_branch)
+        for elif_branch in reversed(statement.elif_branch):
+            otherwise = ClosureCompiler.branch(elif_branch.condition, elif_branch.then_branch, otherwise)
+        return ClosureCompiler.branch(statement.condition, statement.then_branch, otherwise)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method, as a branch with no else. '''
+        return ClosureCompiler.branch(statement.condition, statement.then_branch, None)
+
+
+    def branch(condition, then_branch, otherwise):
+        ''' Function to compile a condition and the branches it chooses between. '''
+        condition = ClosureCompiler.compile_expression(condition)
+        then_branch = ClosureCompiler.block(then_branch)
+        if otherwise == None:
+            def run_if():
+                value = condition()
+                if value is not None and value is not False:
+                    then_branch()
+            return run_if
+
+        def run_if_else():
+            value = condition()
+            if value is not None and value is not False:
+                then_branch()
+            else:
+                otherwise()
+        return run_if_else
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        condition = ClosureCompiler.compile_expression(statement.condition)
+        body = ClosureCompiler.block(statement.body)
+
+        def run_while():
+            while True:
+                value = condition()
+                if value is None or value is False:
+                    return
+                body()
+        return run_while
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if not hasattr(initialiser, 'initialiser') or initialiser.initialiser == None:
+            def invalid_for():
+                raise RuntimeError('FOR initialiser must be a range, "name := lower TO upper"')
+            return invalid_for
+        values = ClosureCompiler.values
+        numbers = ClosureCompiler.compile_expression(initialiser.initialiser)
+        name, _ = ClosureCompiler.variable(initialiser.name)
+        body = ClosureCompiler.block(statement.body)
+
+        def run_for():
+            range_value = numbers()
+            if type(range_value) is not RangeSet:
+                raise RuntimeError('FOR initialiser must be a range, "name := lower TO upper"')
+            for number in range_value.steps():
+                values[name] = number
+                body()
+        return run_for
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        left = ClosureCompiler.compile_expression(expression.left)
+        right = ClosureCompiler.compile_expression(expression.right)
+        token = expression.operator
+        operator_type = token.type
+
+        if operator_type in NUMBER_OPERATIONS:
+            return number_operation(left, right, NUMBER_OPERATIONS[operator_type], token)
+        elif operator_type == TokenType.PLUS:
+            def add():
+                left_value = left()
+                right_value = right()
+                if type(left_value) is float and type(right_value) is float:
+                    return left_value + right_value
+                elif type(left_value) is str and type(right_value) is str:
+                    return left_value + right_value
+                print('Unknown or mismatched types() of left and right expressions.'\
+                      f'Left is type {type(left_value)}, right is type {type(right_value)}.')
+                raise RuntimeError(f'{token} operands must be two numbers or two strings')
+            return add
+        elif operator_type == TokenType.IN:
+            def contains():
+                left_value = left()
+                return left_value in right()
+            return contains
+        elif operator_type == TokenType.EQUAL_EQUAL:
+            def equal():
+                left_value = left()
+                right_value = right()
+                if left_value is None:
+                    return right_value is None
+                return left_value == right_value
+            return equal
+        elif operator_type == TokenType.BANG_EQUAL:
+            def not_equal():
+                left_value = left()
+                right_value = right()
+                if left_value is None:
+                    return right_value is not None
+                return not left_value == right_value
+            return not_equal
+        else:
+            def unknown():
+                left()
+                right()
+                return None
+            return unknown
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method, a grouping adds no closure. '''
+        return ClosureCompiler.compile_expression(expression.expression)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        value = expression.value
+
+        def literal():
+            return value
+        return literal
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        right = ClosureCompiler.compile_expression(expression.right)
+        token = expression.operator
+        if token.type == TokenType.MINUS:
+            def negate():
+                value = right()
+                if type(value) is float:
+                    return -value
+                raise RuntimeError(f'{token} operand must be a number')
+            return negate
+        elif token.type == TokenType.BANG or token.type == TokenType.NOT:
+            def logical_not():
+                value = right()
+                return value is None or value is False
+            return logical_not
+        else:
+            def unknown():
+                right()
+                return None
+            return unknown
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        values = ClosureCompiler.values
+        name, lexeme = ClosureCompiler.variable(expression.name)
+
+        def read():
+            try:
+                return values[name]
+            except KeyError:
+                raise RuntimeError(f'Undefined variable "{lexeme}"') from None
+        return read
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        return ClosureCompiler.visit_variable_expression(expression)
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        values = ClosureCompiler.values
+        name, lexeme = ClosureCompiler.variable(expression.name)
+        value = ClosureCompiler.compile_expression(expression.value)
+
+        def assign():
+            new_value = value()
+            if name in values:
+                values[name] = new_value
+                return new_value
+            raise RuntimeError(f'Undefined variable "{lexeme}"')
+        return assign
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        left = ClosureCompiler.compile_expression(expression.left)
+        right = ClosureCompiler.compile_expression(expression.right)
+        if expression.operator.type == TokenType.OR:
+            def logical_or():
+                value = left()
+                if value is not None and value is not False:
+                    return value
+                return right()
+            return logical_or
+
+        def logical_and():
+            value = left()
+            if value is None or value is False:
+                return value
+            return right()
+        return logical_and
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        elements = tuple(ClosureCompiler.compile_expression(element) for element in expression.sequence)
+
+        def make_list():
+            return [element() for element in elements]
+        return make_list
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        return range_set(ClosureCompiler.compile_expression(expression.lower),
+                         ClosureCompiler.compile_expression(expression.upper), 'TO')
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        return range_set(ClosureCompiler.compile_expression(expression.lower),
+                         ClosureCompiler.compile_expression(expression.upper), '[..]')
@@ -0,0 +1,401 @@
+'''
+File containing the common subexpression elimination class.
+
+'''
+
+
+from tokens import TokenType, Token
+from expression import Visitor as Expression_Visitor, Binary, Grouping, Literal, Unary, \
+    Variable_Expression, Multi_Identifier_Variable_Expression, Assign, Logical, List, Range, \
+    Range_List
+from statement import Visitor as Statement_Visitor, Expression, Print, Variable_Statement, \
+    If, Elif, While, For
+from environment import key, variable_token
+from type_inference import TypeInference
+from dead_code import DefUseChains
+from loop_invariants import COMPOUND, walk, assigned_keys, identifiers
+from optimiser import count_nodes
+from ast_compiler import first_line
+
+
+NOT_OPERATORS = (TokenType.BANG, TokenType.NOT)
+EQUALITY_OPERATORS = (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+
+
+class CommonSubexpressions(Expression_Visitor, Statement_Visitor):
+    '''
+    Computes expressions that are repeated along a run of statements once,
+    into a temporary the repeats read instead.
+
+    Expressions are the same when they have the same structure, ignoring
+    groupings. An expression is available once it has been evaluated, in
+    this statement or an earlier one, and stops being available when a
+    variable it reads is declared or assigned. IF branches and loop bodies
+    start with what is available before them, and what they make
+    available is forgotten after them. Inside a loop only what the loop
+    does not assign stays available.
+
+    A temporary is declared just before the statement that first evaluates
+    the expression, and only when it is read again. That statement must
+    evaluate the expression on every run, and everything it evaluates
+    first must be unable to raise or assign, so the expression raises and
+    prints as it did. Statements that assign inside an expression are left
+    as they are.
+
+    The program is walked twice in the same order, first counting the
+    repeats of each expression, then rewriting. CommonSubexpressions
+    counts the temporaries declared, the repeats reused and the
+    evaluations of nodes these save in temporaries, reused and saved.
+
+    '''
+
+
+    rewriting = False
+    table = None
+    uses = None
+    instance = 0
+    leading = False
+    declarations = None
+    described = None
+    safe = None
+    names = None
+    temporaries = 0
+    reused = 0
+    saved = 0
+
+
+    def eliminate(statements):
+        ''' Function to eliminate common subexpressions from a list of statements, returning the new list. '''
+        TypeInference.infer(statements)
+        DefUseChains.analyse(statements)
+        CommonSubexpressions.names = identifiers(statements)
+        CommonSubexpressions.described = dict()
+        CommonSubexpressions.safe = dict()
+        CommonSubexpressions.uses = dict()
+        CommonSubexpressions.temporaries = CommonSubexpressions.reused = CommonSubexpressions.saved = 0
+        for rewriting in (False, True):
+            CommonSubexpressions.rewriting = rewriting
+            CommonSubexpressions.instance = 0
+            CommonSubexpressions.table = dict()
+            eliminated = CommonSubexpressions.block(statements)
+        CommonSubexpressions.table = CommonSubexpressions.uses = CommonSubexpressions.names = None
+        CommonSubexpressions.described = CommonSubexpressions.safe = None
+        return eliminated
+
+
+    def block(statements):
+        ''' Function to eliminate common subexpressions along a list of statements. '''
+        outer = CommonSubexpressions.declarations
+        eliminated = []
+        for statement in statements:
+            CommonSubexpressions.declarations = []
+            new_statement = statement.accept(CommonSubexpressions)
+            eliminated.extend(CommonSubexpressions.declarations)
+            eliminated.append(new_statement)
+            CommonSubexpressions.invalidate(assigned_keys(statement))
+        CommonSubexpressions.declarations = outer
+        return eliminated
+
+
+    def branch(statements):
+        ''' Function to eliminate common subexpressions in a branch, forgetting what it makes available. '''
+        table = CommonSubexpressions.table
+        CommonSubexpressions.table = dict(table)
+        eliminated = CommonSubexpressions.block(statements)
+        CommonSubexpressions.table = table
+        return eliminated
+
+
+    def invalidate(keys):
+        ''' Function to forget the available expressions that read any of keys. '''
+        if keys:
+            CommonSubexpressions.table = dict((expression_key, entry) for expression_key, entry
+                                              in CommonSubexpressions.table.items() if not entry[1] & keys)
+
+
+    def statement_expression(expression, leading=True):
+        '''
+        Function to eliminate common subexpressions in an expression a
+        statement evaluates. With leading False, it only reads temporaries.
+
+        '''
+        assigns = [node for node in walk(expression) if type(node) == Assign]
+        if assigns:
+            CommonSubexpressions.invalidate(set(key(variable_token(node.name)) for node in assigns))
+            return expression
+        CommonSubexpressions.leading = leading
+        return CommonSubexpressions.common(expression)
+
+
+    def common(expression):
+        ''' Function to replace an expression with a temporary, or make it available. '''
+        eligible = CommonSubexpressions.leading
+        description = CommonSubexpressions.describe(expression)
+        inner = expression
+        while type(inner) == Grouping:
+            inner = inner.expression
+        if description == None or type(inner) not in COMPOUND:
+            new_expression = expression.accept(CommonSubexpressions)
+            CommonSubexpressions.leading = CommonSubexpressions.leading and CommonSubexpressions.is_safe(expression)
+            return new_expression
+        expression_key, dependencies = description
+        entry = CommonSubexpressions.table.get(expression_key)
+        if entry != None:
+            if not CommonSubexpressions.rewriting:
+                CommonSubexpressions.uses[entry[0]] = CommonSubexpressions.uses.get(entry[0], 0) + 1
+                return expression
+            CommonSubexpressions.reused += 1
+            CommonSubexpressions.saved += count_nodes([expression]) - 1
+            return entry[2]
+        new_expression = expression.accept(CommonSubexpressions)
+        if eligible:
+            CommonSubexpressions.instance += 1
+            entry = [CommonSubexpressions.instance, dependencies, None]
+            if CommonSubexpressions.rewriting and CommonSubexpressions.uses.get(entry[0]):
+                entry[2] = CommonSubexpressions.temporary(new_expression)
+                new_expression = entry[2]
+            CommonSubexpressions.table[expression_key] = entry
+        CommonSubexpressions.leading = CommonSubexpressions.leading and CommonSubexpressions.is_safe(expression)
+        return new_expression
+
+
+    def temporary(expression):
+        ''' Function to declare a new temporary holding an expression before the statement. '''
+        CommonSubexpressions.temporaries += 1
+        number = CommonSubexpressions.temporaries
+        while f'_common{number}' in CommonSubexpressions.names:
+            number += 1
+        lexeme = f'_common{number}'
+        CommonSubexpressions.names.add(lexeme)
+        name = Token(TokenType.IDENTIFIER, lexeme, None, first_line(expression))
+        CommonSubexpressions.declarations.append(Variable_Statement(Variable_Expression(name), expression))
+        return Variable_Expression(name)
+
+
+    def describe(expression):
+        '''
+        Function to get the structure of an expression and the keys of the
+        variables it reads, or None if it assigns.
+
+        '''
+        if id(expression) not in CommonSubexpressions.described:
+            CommonSubexpressions.described[id(expression)] = CommonSubexpressions.structure(expression)
+        return CommonSubexpressions.described[id(expression)]
+
+
+    def structure(expression):
+        ''' Function to build the description for CommonSubexpressions.describe(). '''
+        expression_class = type(expression)
+        if expression_class == Literal:
+            # 1 and TRUE are equal in Python, but not the same value
+            return ('literal', type(expression.value), expression.value), frozenset()
+        elif expression_class in (Variable_Expression, Multi_Identifier_Variable_Expression):
+            name_key = key(variable_token(expression))
+            return ('variable', name_key), frozenset((name_key,))
+        elif expression_class == Grouping:
+            return CommonSubexpressions.describe(expression.expression)
+        elif expression_class == Assign:
+            return None
+        elif expression_class == Unary:
+            children = [expression.right]
+        elif expression_class == List:
+            children = expression.sequence
+        elif expression_class in (Range, Range_List):
+            children = [expression.lower, expression.upper]
+        else:
+            children = [expression.left, expression.right]
+        descriptions = [CommonSubexpressions.describe(child) for child in children]
+        if None in descriptions:
+            return None
+        operator_type = expression.operator.type if hasattr(expression, 'operator') else None
+        return (expression_class.__name__, operator_type, tuple(child_key for child_key, _ in descriptions)), \
+            frozenset().union(*(dependencies for _, dependencies in descriptions))
+
+
+    def is_safe(expression):
+        ''' Function to determine if an expression cannot raise, from the proven types and definitions. '''
+        if id(expression) not in CommonSubexpressions.safe:
+            CommonSubexpressions.safe[id(expression)] = CommonSubexpressions.check(expression)
+        return CommonSubexpressions.safe[id(expression)]
+
+
+    def check(expression):
+        ''' Function to test an expression for CommonSubexpressions.is_safe(). '''
+        expression_class = type(expression)
+        if expression_class == Literal:
+            return True
+        elif expression_class in (Variable_Expression, Multi_Identifier_Variable_Expression):
+            return id(expression) not in DefUseChains.undefined_reads
+        elif expression_class == Grouping:
+            return CommonSubexpressions.is_safe(expression.expression)
+        elif expression_class == Unary:
+            if expression.operator.type not in NOT_OPERATORS and expression.specialised == None:
+                return False
+            return CommonSubexpressions.is_safe(expression.right)
+        elif expression_class == Binary:
+            operator_type = expression.operator.type
+            if operator_type not in EQUALITY_OPERATORS and expression.specialised == None:
+                return False
+            if operator_type == TokenType.FWD_SLASH and \
+                    (type(expression.right) != Literal or expression.right.value == 0):
+                return False
+            return CommonSubexpressions.is_safe(expression.left) and CommonSubexpressions.is_safe(expression.right)
+        elif expression_class == Logical:
+            return CommonSubexpressions.is_safe(expression.left) and CommonSubexpressions.is_safe(expression.right)
+        elif expression_class == List:
+            return all(CommonSubexpressions.is_safe(element) for element in expression.sequence)
+        return False
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        expression = statement.expression
+        if type(expression) == Assign:
+            value = CommonSubexpressions.statement_expression(expression.value)
+            if value is expression.value:
+                return statement
+            return Expression(Assign(expression.name, value))
+        return Expression(CommonSubexpressions.statement_expression(expression))
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        return Print(CommonSubexpressions.statement_expression(statement.expression))
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        if statement.initialiser == None:
+            return statement
+        return Variable_Statement(statement.name, CommonSubexpressions.statement_expression(statement.initialiser))
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        condition = CommonSubexpressions.statement_expression(statement.condition)
+        then_branch = CommonSubexpressions.branch(statement.then_branch)
+        # ELSEIF conditions only run when the ones before are false
+        elif_branch = [elif_branch.accept(CommonSubexpressions) for elif_branch in statement.elif_branch]
+        else_branch = statement.else_branch
+        if else_branch != None:
+            else_branch = CommonSubexpressions.branch(else_branch)
+        return If(condition, then_branch, elif_branch, else_branch)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method. '''
+        condition = CommonSubexpressions.statement_expression(statement.condition, False)
+        return Elif(condition, CommonSubexpressions.branch(statement.then_branch))
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        CommonSubexpressions.invalidate(assigned_keys(statement))
+        # The condition runs again each pass, so it cannot declare temporaries
+        condition = CommonSubexpressions.statement_expression(statement.condition, False)
+        return While(condition, CommonSubexpressions.branch(statement.body))
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if hasattr(initialiser, 'initialiser') and initialiser.initialiser != None:
+            initialiser = Variable_Statement(initialiser.name,
+                                             CommonSubexpressions.statement_expression(initialiser.initialiser))
+        CommonSubexpressions.invalidate(assigned_keys(statement))
+        return For(initialiser, CommonSubexpressions.branch(statement.body))
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        left = CommonSubexpressions.common(expression.left)
+        right = CommonSubexpressions.common(expression.right)
+        if left is expression.left and right is expression.right:
+            return expression
+        # A temporary has the type of what it replaced, so the operator stays proven
+        return Binary(left, expression.operator, right, expression.specialised)
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        inner = CommonSubexpressions.common(expression.expression)
+        if inner is expression.expression:
+            return expression
+        return Grouping(inner)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        return expression
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        right = CommonSubexpressions.common(expression.right)
+        if right is expression.right:
+            return expression
+        return Unary(expression.operator, right, expression.specialised)
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        return expression
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        return expression
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method, statements that assign are left as they are. '''
+        return expression
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        left = CommonSubexpressions.common(expression.left)
+        leading = CommonSubexpressions.leading
+        # The right side may not run, so it cannot declare temporaries
+        CommonSubexpressions.leading = False
+        right = CommonSubexpressions.common(expression.right)
+        CommonSubexpressions.leading = leading
+        if left is expression.left and right is expression.right:
+            return expression
+        return Logical(left, expression.operator, right)
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        sequence = [CommonSubexpressions.common(element) for element in expression.sequence]
+        if all(new is old for new, old in zip(sequence, expression.sequence)):
+            return expression
+        return List(sequence)
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        lower = CommonSubexpressions.common(expression.lower)
+        upper = CommonSubexpressions.common(expression.upper)
+        if lower is expression.lower and upper is expression.upper:
+            return expression
+        return Range(lower, upper)
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        lower = CommonSubexpressions.common(expression.lower)
+        upper = CommonSubexpressions.common(expression.upper)
+        if lower is expression.lower and upper is expression.upper:
+            return expression
+        return Range_List(lower, upper)
@@ -0,0 +1,80 @@
+'''
+File containing helpers that run a program on each engine, for tests.
+
+'''
+
+
+import contextlib
+import io
+
+from regex_scanner import RegexScanner
+from custom_parser import Parser
+from interpreter import Interpreter
+from closure_compiler import ClosureCompiler
+from ast_compiler import AstCompiler
+from bytecode_compiler import BytecodeCompiler
+from virtual_machine import VirtualMachine
+from loop_invariants import identifiers
+import interpreter
+
+
+# Each engine runs a list of statements with variables in the Interpreter's environment
+ENGINES = {
+    'Interpreter': lambda statements: Interpreter().interpret(statements),
+    'ClosureCompiler': lambda statements: ClosureCompiler.compile(statements)(),
+    'AstCompiler': lambda statements: AstCompiler.compile(statements).run(),
+    'VirtualMachine': lambda statements: VirtualMachine.run(BytecodeCompiler.compile(statements)),
+    }
+
+# Small programs whose prints, variables and errors every engine and pass must keep.
+# Undefined variables are used first, as Interpreter rejects them before running.
+CORPUS = {
+    'empty_for': 'n := 0\nFOR i := 5 TO 1 DO\nn := n + 1\nENDDO\nPRINT n',
+    'one_step_for': 'n := 0\nFOR i := 3 TO 3 DO\nn := n + i\nENDDO\nPRINT n',
+    'fractional_for': 'n := 0\nFOR i := 1.5 TO 4 DO\nn := n + i\nENDDO\nPRINT n',
+    'if_elseif_else': ("a := 2\nb := 0\nIF a > 5 THEN\nb := 1\nELSEIF a > 1 THEN\nb := 2\nPRINT 'middle'\n"
+                       "ELSE\nb := 3\nENDIF\nIF a = 0 THEN\nb := b + 10\nELSE\nb := b + 20\nENDIF\nPRINT b"),
+    'while': 'i := 0\ns := 0\nk := 3\nWHILE (i < 5) DO\ns := s + i * (k + 1) + (k + 1)\ni := i + 1\nENDDO\nPRINT s',
+    'short_circuit': "a := 0\nb := 'x'\nc := (a = 0) OR (b > 1)\nd := (a = 1) AND (b > 1)\nPRINT c\nPRINT d",
+    'type_error': "a := 1\nb := 'x'\nPRINT a\nc := a * 2\nc := a - b\nPRINT c",
+    'type_error_in_loop': "s := 0\nt := 'x'\nFOR i := 1 TO 3 DO\ns := s + i\nIF i = 2 THEN\ns := s - t\nENDIF\nENDDO",
+    'mismatched_plus': "a := 'x'\nb := a + 'y'\nc := b + 1",
+    'undefined_read': 'PRINT missing\na := 1',
+    'undefined_in_expression': 'b := (1 + 2) * missing\nPRINT b',
+    }
+
+
+def parse(source):
+    ''' Function to scan and parse a source into a fresh list of statements. '''
+    return Parser(RegexScanner(source).tokens).parse()
+
+
+def run(source, engine='Interpreter', passes=()):
+    '''
+    Function to run a source on an engine, after applying passes to its statements.
+
+    engine is a name in ENGINES, or a function that runs a list of statements.
+
+    Returns what the program printed, the variables it left in an empty
+    environment and the message of the error it raised, or None. The
+    temporaries passes declare are left out of the variables, so they
+    compare with those of the program as written.
+
+    '''
+    statements = parse(source)
+    names = identifiers(statements)
+    for transform in passes:
+        statements = transform(statements)
+    temporaries = identifiers(statements) - names
+    interpreter.environment.values.clear()
+    output = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(output):
+        try:
+            ENGINES.get(engine, engine)(statements)
+        except RuntimeError as exception:
+            error = str(exception)
+    values = {name_key: value for name_key, value in interpreter.environment.values.items()
+              if name_key not in temporaries}
+    interpreter.environment.values.clear()
+    return output.getvalue(), values, error
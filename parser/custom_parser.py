@@ -5,7 +5,7 @@ File containing the parser class.
 
 
 from tokens import TokenType, Token
-from expression import Assign, Binary, Grouping, Literal, Unary, Variable_Expression, Multi_Identifier_Variable_Expression, Logical, List, Range
+from expression import Assign, Binary, Grouping, Literal, Unary, Variable_Expression, Multi_Identifier_Variable_Expression, Logical, List, Range, Range_List
 from statement import Expression, Print, Variable_Statement, If, Elif, While, For
 
 
@@ -27,6 +27,12 @@ class Parser:
         return statements
     
     
+    def parse_lazily(self):
+        ''' Function to parse and yield one declaration at a time. '''
+        while not self.at_end():
+            yield self.declaration()
+    
+    
     def declaration(self):
         ''' Function to process list of declarations. '''
         if self.check(TokenType.IDENTIFIER):
@@ -377,6 +383,10 @@ class Parser:
                 while self.match([TokenType.DOT]):
                     continue
                 upper = self.consume(TokenType.NUMBER, 'expect NUMBER as upper limit')
+                if len(sequence) == 1:
+                    # [lower..upper] only stores its bounds
+                    self.consume(TokenType.RIGHT_SQUARE, 'expect "]" at end of list')
+                    return Range_List(sequence[0], Literal(upper.literal))
                 # Generate list of literal expressions representing given range
                 for i in range(int(sequence[0].value)+1, int(upper.literal+1)):
                     sequence.append(Literal(self.add_token(TokenType.NUMBER, float(i)).literal)) 
@@ -0,0 +1,520 @@
+'''
+File containing the dead code eliminator class.
+
+'''
+
+
+from tokens import TokenType
+from expression import Visitor as Expression_Visitor, Binary, Grouping, Literal, Unary, \
+    Variable_Expression, Multi_Identifier_Variable_Expression, Assign, Logical, List
+from statement import Visitor as Statement_Visitor, Expression, Variable_Statement, If, Elif, While, For
+from environment import key, variable_token
+from interpreter import Interpreter
+from ast_compiler import first_line
+
+
+# The definition that reaches a read when nothing may have defined the variable yet
+ENTRY = None
+ENTRY_ONLY = frozenset((ENTRY,))
+
+NOT_OPERATORS = (TokenType.BANG, TokenType.NOT)
+EQUALITY_OPERATORS = (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+
+
+def merge(states):
+    ''' Function to join the definitions reaching the ends of several paths. '''
+    merged = dict()
+    for state in states:
+        for name_key in state:
+            merged[name_key] = frozenset()
+    for name_key in merged:
+        for state in states:
+            merged[name_key] = merged[name_key] | state.get(name_key, ENTRY_ONLY)
+    return merged
+
+
+def constant(condition):
+    ''' Function to get the Literal a condition always is, or None. '''
+    while type(condition) == Grouping:
+        condition = condition.expression
+    if type(condition) == Literal:
+        return condition
+    return None
+
+
+def where(node):
+    ''' Function to give the start of a report line for a node. '''
+    line = first_line(node)
+    return '' if line == None else f'line {line}: '
+
+
+class DefUseChains(Expression_Visitor, Statement_Visitor):
+    '''
+    Links every definition of a variable to the reads it reaches.
+
+    A definition is a declaration, a FOR counter or an assignment. The
+    definitions that may reach each point of the program are followed
+    through branches and around loops until they stop changing. The end
+    of the program reads every variable, as output fields and the values
+    saved back to the Environment are what a script is run for. A
+    statement that may raise can end the program too, so it reads every
+    variable before it runs. After analyse(), used holds every definition
+    some read may see, and a definition not in it is a store that is
+    always overwritten before it is read. ENTRY stands for the variable
+    not being defined yet, so reads and assignments ENTRY reaches may fail
+    at run time.
+
+    Statements are identified by id(), so the tree must not change while
+    the results are used.
+
+    '''
+
+
+    state = None
+    used = None
+    definitions = None
+    assigns = None
+    undefined_reads = None
+    unchecked = None
+    # Stores no exit has read yet, by definition
+    unread = None
+
+
+    def analyse(statements):
+        ''' Function to build the def-use chains of a list of statements. '''
+        DefUseChains.state = dict()
+        DefUseChains.used = set()
+        DefUseChains.definitions = dict()
+        DefUseChains.assigns = dict()
+        DefUseChains.undefined_reads = set()
+        DefUseChains.unchecked = set()
+        DefUseChains.unread = dict()
+        DefUseChains.block(statements)
+        # The definitions that reach the end are the program's results
+        for reaching in DefUseChains.state.values():
+            DefUseChains.used.update(reaching)
+
+
+    def block(statements):
+        ''' Function to follow a list of statements in order. '''
+        for statement in statements:
+            statement.accept(DefUseChains)
+
+
+    def evaluate(expression):
+        ''' Function to send an expression back into the visitor implementation. '''
+        expression.accept(DefUseChains)
+
+
+    def reaching(name_key):
+        ''' Function to get the definitions of a variable that may reach this point. '''
+        return DefUseChains.state.get(name_key, ENTRY_ONLY)
+
+
+    def store(name, definition, kills):
+        ''' Function to record a definition, which replaces the others when it always happens. '''
+        name_key = key(variable_token(name))
+        if kills:
+            DefUseChains.state[name_key] = frozenset((definition,))
+        else:
+            DefUseChains.state[name_key] = DefUseChains.reaching(name_key) | {definition}
+        return name_key
+
+
+    def exit_if_raises(expression):
+        '''
+        Function to read every variable before an expression that may raise.
+
+        Only stores that no earlier exit has read are checked, and those
+        that do not reach this point may still reach a later one.
+
+        '''
+        if not DefUseChains.may_raise(expression):
+            return
+        state = DefUseChains.state
+        unread = DefUseChains.unread
+        for definition, name_key in list(unread.items()):
+            if definition in state.get(name_key, ENTRY_ONLY):
+                DefUseChains.used.add(definition)
+                del unread[definition]
+
+
+    def may_raise(expression):
+        ''' Function to determine if evaluating an expression may raise, None standing for a statement that may fail itself. '''
+        expression_class = type(expression)
+        if expression_class == Literal:
+            return False
+        elif expression_class in (Variable_Expression, Multi_Identifier_Variable_Expression):
+            return ENTRY in DefUseChains.reaching(key(variable_token(expression)))
+        elif expression_class == Grouping:
+            return DefUseChains.may_raise(expression.expression)
+        elif expression_class == Unary:
+            return expression.operator.type not in NOT_OPERATORS or DefUseChains.may_raise(expression.right)
+        elif expression_class == Binary:
+            return expression.operator.type not in EQUALITY_OPERATORS or \
+                DefUseChains.may_raise(expression.left) or DefUseChains.may_raise(expression.right)
+        elif expression_class == Logical:
+            return DefUseChains.may_raise(expression.left) or DefUseChains.may_raise(expression.right)
+        elif expression_class == List:
+            return any(DefUseChains.may_raise(element) for element in expression.sequence)
+        return True
+
+
+    def assign(name, definition, kills):
+        ''' Function to record an assignment, which fails if the variable may be undefined. '''
+        if ENTRY in DefUseChains.reaching(key(variable_token(name))):
+            DefUseChains.unchecked.add(definition)
+        name_key = DefUseChains.store(name, definition, kills)
+        DefUseChains.assigns.setdefault(name_key, []).append(definition)
+        return name_key
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        expression = statement.expression
+        if type(expression) != Assign:
+            DefUseChains.exit_if_raises(expression)
+            DefUseChains.evaluate(expression)
+            return
+        if ENTRY in DefUseChains.reaching(key(variable_token(expression.name))):
+            # Fails if the variable is undefined
+            DefUseChains.exit_if_raises(None)
+        else:
+            DefUseChains.exit_if_raises(expression.value)
+        DefUseChains.evaluate(expression.value)
+        name_key = DefUseChains.assign(expression.name, id(statement), True)
+        DefUseChains.definitions[id(statement)] = name_key
+        DefUseChains.unread[id(statement)] = name_key
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        DefUseChains.exit_if_raises(statement.expression)
+        DefUseChains.evaluate(statement.expression)
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        if statement.initialiser != None:
+            DefUseChains.exit_if_raises(statement.initialiser)
+            DefUseChains.evaluate(statement.initialiser)
+        name_key = DefUseChains.store(statement.name, id(statement), True)
+        DefUseChains.definitions[id(statement)] = name_key
+        DefUseChains.unread[id(statement)] = name_key
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        ends = []
+        DefUseChains.exit_if_raises(statement.condition)
+        DefUseChains.evaluate(statement.condition)
+        before = DefUseChains.state
+        DefUseChains.state = dict(before)
+        DefUseChains.block(statement.then_branch)
+        ends.append(DefUseChains.state)
+        DefUseChains.state = before
+        for elif_branch in statement.elif_branch:
+            ends.append(elif_branch.accept(DefUseChains))
+        if statement.else_branch != None:
+            DefUseChains.state = dict(DefUseChains.state)
+            DefUseChains.block(statement.else_branch)
+        ends.append(DefUseChains.state)
+        DefUseChains.state = merge(ends)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method, returning the state at the end of its branch. '''
+        DefUseChains.exit_if_raises(statement.condition)
+        DefUseChains.evaluate(statement.condition)
+        before = DefUseChains.state
+        DefUseChains.state = dict(before)
+        DefUseChains.block(statement.then_branch)
+        end = DefUseChains.state
+        DefUseChains.state = before
+        return end
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        head = DefUseChains.state
+        while True:
+            DefUseChains.state = dict(head)
+            DefUseChains.exit_if_raises(statement.condition)
+            DefUseChains.evaluate(statement.condition)
+            leaving = DefUseChains.state
+            DefUseChains.state = dict(leaving)
+            DefUseChains.block(statement.body)
+            widened = merge([head, DefUseChains.state])
+            if widened == head:
+                break
+            head = widened
+        DefUseChains.state = leaving
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if not hasattr(initialiser, 'initialiser') or initialiser.initialiser == None:
+            # Fails at run time before the body can run
+            DefUseChains.exit_if_raises(None)
+            return
+        DefUseChains.exit_if_raises(initialiser.initialiser)
+        DefUseChains.evaluate(initialiser.initialiser)
+        head = DefUseChains.state
+        while True:
+            DefUseChains.state = dict(head)
+            DefUseChains.store(initialiser.name, id(statement), True)
+            DefUseChains.block(statement.body)
+            widened = merge([head, DefUseChains.state])
+            if widened == head:
+                break
+            head = widened
+        # The body may not run at all, or run any number of times
+        DefUseChains.state = head
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        DefUseChains.evaluate(expression.left)
+        DefUseChains.evaluate(expression.right)
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        DefUseChains.evaluate(expression.expression)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        return None
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        DefUseChains.evaluate(expression.right)
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        reaching = DefUseChains.reaching(key(variable_token(expression)))
+        DefUseChains.used.update(reaching)
+        if ENTRY in reaching:
+            # Shared nodes are flagged if any of their reads may fail
+            DefUseChains.undefined_reads.add(id(expression))
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        DefUseChains.visit_variable_expression(expression)
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        DefUseChains.evaluate(expression.value)
+        # Inside an expression an assignment may not run, see Logical
+        DefUseChains.assign(expression.name, id(expression), False)
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        DefUseChains.evaluate(expression.left)
+        DefUseChains.evaluate(expression.right)
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        for element in expression.sequence:
+            DefUseChains.evaluate(element)
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        DefUseChains.evaluate(expression.lower)
+        DefUseChains.evaluate(expression.upper)
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        DefUseChains.visit_range(expression)
+
+
+class DeadCodeEliminator(Statement_Visitor):
+    '''
+    Removes branches that can never run and stores nothing reads.
+
+    IF and ELSEIF branches with a literal condition are dropped or become
+    the branch that runs, and WHILE loops with a false literal condition
+    are dropped. A declaration or assignment is dead when DefUseChains
+    finds no read its value can reach, the end of the program counting as
+    a read of every variable. Dead stores of values that cannot
+    raise are removed, others keep their value as an expression statement
+    so errors happen as they did. Assignments that may fail on an
+    undefined variable are kept, as are declarations a kept assignment
+    still needs. Removing a store can leave others dead, so this repeats
+    until nothing changes.
+
+    Every variable ends with the value it would have had, even when a
+    runtime error stops the program, so only stores that are overwritten
+    before any statement that may raise are removed.
+    DeadCodeEliminator.report lists what was removed.
+
+    '''
+
+
+    dead = None
+    report = []
+
+
+    def eliminate(statements):
+        ''' Function to remove dead code from a list of statements, returning the new list. '''
+        DeadCodeEliminator.report = []
+        while True:
+            DefUseChains.analyse(statements)
+            DeadCodeEliminator.dead = DeadCodeEliminator.dead_stores()
+            reported = len(DeadCodeEliminator.report)
+            statements = DeadCodeEliminator.block(statements)
+            if len(DeadCodeEliminator.report) == reported:
+                DeadCodeEliminator.dead = None
+                return statements
+
+
+    def dead_stores():
+        ''' Function to find the stores that can be removed, from the def-use chains. '''
+        used = DefUseChains.used
+        assigns = set(definition for definitions in DefUseChains.assigns.values()
+                      for definition in definitions if definition in DefUseChains.definitions)
+        dead = set(definition for definition in assigns
+                   if definition not in used and definition not in DefUseChains.unchecked)
+        # Assignments fail without a declaration, so it stays while one is kept
+        needed = set(name_key for name_key, definitions in DefUseChains.assigns.items()
+                     if any(definition not in dead for definition in definitions))
+        for definition, name_key in DefUseChains.definitions.items():
+            if definition not in assigns and definition not in used and name_key not in needed:
+                dead.add(definition)
+        return dead
+
+
+    def block(statements):
+        ''' Function to remove dead code from a list of statements. '''
+        kept = []
+        for statement in statements:
+            kept.extend(statement.accept(DeadCodeEliminator))
+        return kept
+
+
+    def is_pure(expression):
+        ''' Function to determine if evaluating an expression can be skipped, as it cannot raise or assign. '''
+        expression_class = type(expression)
+        if expression_class == Literal:
+            return True
+        elif expression_class in (Variable_Expression, Multi_Identifier_Variable_Expression):
+            return id(expression) not in DefUseChains.undefined_reads
+        elif expression_class == Grouping:
+            return DeadCodeEliminator.is_pure(expression.expression)
+        elif expression_class == Unary:
+            return expression.operator.type in NOT_OPERATORS and DeadCodeEliminator.is_pure(expression.right)
+        elif expression_class == Binary:
+            return expression.operator.type in EQUALITY_OPERATORS and \
+                DeadCodeEliminator.is_pure(expression.left) and DeadCodeEliminator.is_pure(expression.right)
+        elif expression_class == Logical:
+            return DeadCodeEliminator.is_pure(expression.left) and DeadCodeEliminator.is_pure(expression.right)
+        elif expression_class == List:
+            return all(DeadCodeEliminator.is_pure(element) for element in expression.sequence)
+        return False
+
+
+    def remove_store(statement, name, value):
+        ''' Function to remove a dead store, keeping its value if that may raise. '''
+        lexeme = variable_token(name).lexeme
+        if value == None or DeadCodeEliminator.is_pure(value):
+            DeadCodeEliminator.report.append(f'{where(statement)}removed store to "{lexeme}", '
+                                             'which is overwritten before it is read')
+            return []
+        DeadCodeEliminator.report.append(f'{where(statement)}removed store to "{lexeme}", '
+                                         'which is overwritten before it is read, keeping its value')
+        return [Expression(value)]
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        if id(statement) in DeadCodeEliminator.dead:
+            return DeadCodeEliminator.remove_store(statement, statement.expression.name,
+                                                   statement.expression.value)
+        return [statement]
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        return [statement]
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        if id(statement) in DeadCodeEliminator.dead:
+            return DeadCodeEliminator.remove_store(statement, statement.name, statement.initialiser)
+        return [statement]
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        branches = []
+        else_branch = statement.else_branch
+        for condition, then_branch in [(statement.condition, statement.then_branch)] + \
+                [(elif_branch.condition, elif_branch.then_branch) for elif_branch in statement.elif_branch]:
+            literal = constant(condition)
+            if literal == None:
+                branches.append((condition, then_branch))
+            elif Interpreter.is_truthy(literal.value):
+                # Later branches can never run, and this one always does if reached
+                DeadCodeEliminator.report.append(f'{where(statement)}kept only the branch whose condition '
+                                                 'is always true')
+                else_branch = then_branch
+                break
+            else:
+                DeadCodeEliminator.report.append(f'{where(statement)}removed a branch whose condition '
+                                                 'is always false')
+        if else_branch != None:
+            else_branch = DeadCodeEliminator.block(else_branch)
+        if branches == []:
+            return else_branch or []
+        branches = [(condition, DeadCodeEliminator.block(then_branch)) for condition, then_branch in branches]
+        if all(then_branch == [] and DeadCodeEliminator.is_pure(condition) for condition, then_branch in branches) \
+                and not else_branch:
+            DeadCodeEliminator.report.append(f'{where(statement)}removed an IF that does nothing')
+            return []
+        return [If(branches[0][0], branches[0][1],
+                   [Elif(condition, then_branch) for condition, then_branch in branches[1:]], else_branch)]
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method. '''
+        return [Elif(statement.condition, DeadCodeEliminator.block(statement.then_branch))]
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        literal = constant(statement.condition)
+        if literal != None and not Interpreter.is_truthy(literal.value):
+            DeadCodeEliminator.report.append(f'{where(statement)}removed a WHILE whose condition is always false')
+            return []
+        return [While(statement.condition, DeadCodeEliminator.block(statement.body))]
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        return [For(statement.initialiser, DeadCodeEliminator.block(statement.body))]
@@ -4,6 +4,39 @@ File containing the environment class.
 '''
 
 
+from tokens import TokenType, Token
+from expression import Variable_Expression
+
+
+def key(name):
+    '''
+    Function to get the key a variable is stored under from its name token.
+    
+    The key is the lexeme. Symbol ids are only unique within one scanner,
+    and one Environment outlives the programs it runs, so ids of different
+    names from different scripts would collide. The lexemes of a scanner
+    are interned, so their hashes are computed once.
+    
+    '''
+    return name.lexeme
+
+
+def variable_token(name):
+    '''
+    Function to get the token a variable is stored under.
+    
+    name is an identifier token, a Variable_Expression or a field path
+    such as a.b[1], which is stored under its whole text.
+    
+    '''
+    if isinstance(name, Variable_Expression):
+        name = name.name
+    if isinstance(name, Token):
+        return name
+    lexeme = ''.join(token.lexeme for token in name.names)
+    return Token(TokenType.IDENTIFIER, lexeme, None, name.names[0].line_number)
+
+
 class Environment:
     
     
@@ -13,13 +46,14 @@ class Environment:
         
     def define(self, name, value):
         ''' Function to define a new environment variable. '''
-        self.values[name] = value
+        self.values[key(name)] = value
         
         
     def get(self, name):
         ''' Function to get an environment variable. '''
-        if name in self.values:
-            return self.values[name]
+        name_key = key(name)
+        if name_key in self.values:
+            return self.values[name_key]
         else:
             raise RuntimeError(f'Undefined variable "{name.lexeme}"')
             
@@ -31,12 +65,72 @@ class Environment:
         Similar to define() but cannot assign a new variable.
         
         '''
-        key = name.lexeme
-        if key in self.values:
-            self.values[key] = value
+        name_key = key(name)
+        if name_key in self.values:
+            self.values[name_key] = value
         else:
-            raise RuntimeError(f'Undefined variable "{key}"')
-        
-        
-        
+            raise RuntimeError(f'Undefined variable "{name.lexeme}"')
+
+
+# Value of a slot whose variable has not been defined
+UNDEFINED = object()
+
+
+class Frame:
+    '''
+    Variables of one program in a list, indexed by the slots Resolver
+    gives each name.
+
+    keys[slot] is the key the variable has in an Environment and
+    names[slot] its name, kept for error messages and debugging.
+
+    '''
+
+
+    def __init__(self, keys, names):
+        self.keys = keys
+        self.names = names
+        self.values = [UNDEFINED] * len(keys)
+
+
+    def define(self, slot, value):
+        ''' Function to define a variable. '''
+        self.values[slot] = value
+
+
+    def get(self, slot):
+        ''' Function to get a variable. '''
+        value = self.values[slot]
+        if value is UNDEFINED:
+            raise RuntimeError(f'Undefined variable "{self.names[slot]}"')
+        return value
+
+
+    def assign(self, slot, value):
+        ''' Function to assign a variable, which cannot be a new one. '''
+        if self.values[slot] is UNDEFINED:
+            raise RuntimeError(f'Undefined variable "{self.names[slot]}"')
+        self.values[slot] = value
+
+
+    def load(self, environment):
+        ''' Function to copy the variables an environment already has into their slots. '''
+        for slot, name_key in enumerate(self.keys):
+            self.values[slot] = environment.values.get(name_key, UNDEFINED)
+
+
+    def save(self, environment):
+        ''' Function to copy the defined variables back into an environment. '''
+        for name_key, value in zip(self.keys, self.values):
+            if value is not UNDEFINED:
+                environment.values[name_key] = value
+
+
+    def slot_names(self):
+        ''' Function to get the slot of each variable name, for debugging. '''
+        return {name: slot for slot, name in enumerate(self.names)}
+
 
+    def __repr__(self):
+        return ', '.join(f'{slot}:{name}={"undefined" if value is UNDEFINED else repr(value)}'
+                         for slot, (name, value) in enumerate(zip(self.names, self.values)))
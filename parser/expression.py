@@ -70,6 +70,12 @@ class Visitor:
     def visit_range(expression):
         ''' Visits range expressions. '''
         raise NotImplementedError('Not yet implemented')
+        
+        
+    @abstractmethod
+    def visit_range_list(expression):
+        ''' Visits range list expressions. '''
+        raise NotImplementedError('Not yet implemented')
        
         
 class Expression(ABC):
@@ -78,6 +84,14 @@ class Expression(ABC):
     visitor to traverse a hierachichal structure of objects.
     
     '''
+    __slots__ = ()
+
+
+    def __reduce__(self):
+        ''' Function to pickle a node as a call to its constructor, whose arguments match its slots. '''
+        return (type(self), tuple([getattr(self, name) for name in self.__slots__]))
+
+
     @abstractmethod
     def accept(visitor):
         ''' The visistor traverses and accesses each object through this method. '''
@@ -85,13 +99,14 @@ class Expression(ABC):
        
 
 class Binary(Expression):
+    __slots__ = ('left', 'operator', 'right', 'specialised')
     
     
-    def __init__(self, left, operator, right):
-        super().__init__()
+    def __init__(self, left, operator, right, specialised=None):
         self.left = left
         self.operator = operator
         self.right = right
+        self.specialised = specialised # Check-free operator, set by TypeInference
         
     def __repr__(self):
         return f'{self.left} {self.operator} {self.right}'
@@ -102,10 +117,10 @@ class Binary(Expression):
         
         
 class Grouping(Expression):
+    __slots__ = ('expression',)
     
     
     def __init__(self, expression):
-        super().__init__()
         self.expression = expression
         
     
@@ -114,10 +129,10 @@ class Grouping(Expression):
         
 
 class Literal(Expression):
+    __slots__ = ('value',)
     
     
     def __init__(self, value):
-        super().__init__()
         self.value = value
 
 
@@ -126,12 +141,13 @@ class Literal(Expression):
     
 
 class Unary(Expression):
+    __slots__ = ('operator', 'right', 'specialised')
     
     
-    def __init__(self, operator, right):
-        super().__init__()
+    def __init__(self, operator, right, specialised=None):
         self.operator = operator
         self.right = right
+        self.specialised = specialised # Check-free operator, set by TypeInference
         
         
     def accept(self, visitor):
@@ -139,11 +155,12 @@ class Unary(Expression):
     
     
 class Variable_Expression(Expression):
+    __slots__ = ('name', 'slot')
     
     
-    def __init__(self, name):
-        super().__init__()
+    def __init__(self, name, slot=None):
         self.name = name
+        self.slot = slot # Frame slot, set by Resolver
         
         
     def accept(self, visitor):
@@ -151,11 +168,12 @@ class Variable_Expression(Expression):
     
     
 class Multi_Identifier_Variable_Expression(Expression):
+    __slots__ = ('names', 'slot')
     
 
-    def __init__(self, names):
-        super().__init__()
+    def __init__(self, names, slot=None):
         self.names = names # Must be a list 
+        self.slot = slot # Frame slot, set by Resolver
         
         
     def accept(self, visitor):
@@ -163,10 +181,10 @@ class Multi_Identifier_Variable_Expression(Expression):
     
     
 class Assign(Expression):
+    __slots__ = ('name', 'value')
     
     
     def __init__(self, name, value):
-        super().__init__()
         self.name = name
         self.value = value
         
@@ -176,10 +194,10 @@ class Assign(Expression):
     
     
 class Logical(Expression):
+    __slots__ = ('left', 'operator', 'right')
     
     
     def __init__(self, left, operator, right):
-        super().__init__()
         self.left = left
         self.operator = operator
         self.right = right
@@ -190,10 +208,10 @@ class Logical(Expression):
     
 
 class List(Expression):
+    __slots__ = ('sequence',)
 
     
     def __init__(self, sequence):
-        super().__init__()
         self.sequence = sequence
 
         
@@ -202,15 +220,34 @@ class List(Expression):
 
         
 class Range(Expression):
+    __slots__ = ('lower', 'upper')
 
     
     def __init__(self, lower, upper):
-        super().__init__()
         self.lower = lower
         self.upper = upper
 
         
     def accept(self, visitor):
         return visitor.visit_range(self)
+        
+        
+class Range_List(Expression):
+    '''
+    A list literal of consecutive numbers, [lower..upper].
+    
+    Only the bounds are stored, the elements are never materialised.
+    
+    '''
+    __slots__ = ('lower', 'upper')
+
+    
+    def __init__(self, lower, upper):
+        self.lower = lower
+        self.upper = upper
+
+        
+    def accept(self, visitor):
+        return visitor.visit_range_list(self)
          
         
\ No newline at end of file
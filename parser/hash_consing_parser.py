@@ -0,0 +1,129 @@
+'''
+File containing the hash-consing parser class.
+
+'''
+
+
+from environment import key
+from expression import (Assign, Binary, Grouping, Literal, Unary, Variable_Expression,
+                        Multi_Identifier_Variable_Expression, Logical, List, Range, Range_List)
+from custom_parser import Parser
+
+
+# Attributes of each expression class that hold child expressions
+CHILDREN = {
+    Assign: ('name', 'value'),
+    Binary: ('left', 'right'),
+    Grouping: ('expression',),
+    Literal: (),
+    Unary: ('right',),
+    Variable_Expression: ('name',),
+    Multi_Identifier_Variable_Expression: (),
+    Logical: ('left', 'right'),
+    List: (),
+    Range: ('lower', 'upper'),
+    Range_List: ('lower', 'upper'),
+    }
+
+
+def token_key(token):
+    ''' Function to reduce a token to what the visitors read from it, including the line errors report. '''
+    return (token.type, key(token), token.line_number)
+
+
+def operator_key(token):
+    ''' Function to reduce an operator token to what the visitors read from it. '''
+    return (token.type, token.lexeme, token.line_number)
+
+
+class HashConsingParser(Parser):
+    '''
+    Parser that shares structurally identical expression subtrees.
+
+    Every expression is interned bottom-up as it is parsed: literals come
+    from a constant pool and every other node is looked up in a pool keyed
+    by its class, operator and already-interned children. Repeated
+    literals, field paths and sub-expressions are then one object, so
+    later passes can memoise on id(node).
+
+    Runtime errors report the line of a node's tokens, so nodes with
+    tokens are only shared between occurrences on the same line, and
+    operators are told apart by lexeme as well as type ("<>" and "!=").
+    Shared nodes must not be modified in place.
+
+    '''
+
+
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.constants = dict()
+        self.pool = dict()
+        self.interned = set()
+        self.occurrences = 0
+
+
+    def expression(self):
+        ''' Function for expressions, interned before they are returned. '''
+        return self.intern(super().expression())
+
+
+    def intern(self, root):
+        ''' Function to replace a new expression tree with its shared equivalent. '''
+        interned = self.interned
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if id(node) in interned:
+                continue
+            if children_done:
+                self.intern_node(node)
+                continue
+            stack.append((node, True))
+            for name in CHILDREN[type(node)]:
+                child = getattr(node, name)
+                if hasattr(child, 'accept'):
+                    stack.append((child, False))
+            if type(node) == List:
+                stack.extend((element, False) for element in node.sequence)
+        return self.pool[self.node_key(root)]
+
+
+    def intern_node(self, node):
+        ''' Function to intern one node whose children are already interned. '''
+        pool = self.pool
+        node_class = type(node)
+        for name in CHILDREN[node_class]:
+            child = getattr(node, name)
+            if hasattr(child, 'accept'):
+                setattr(node, name, pool[self.node_key(child)])
+        if node_class == List:
+            node.sequence = [pool[self.node_key(element)] for element in node.sequence]
+
+        self.occurrences += 1
+        node_key = self.node_key(node)
+        if node_key not in pool:
+            pool[node_key] = node
+            self.interned.add(id(node))
+            if node_class == Literal:
+                self.constants[node_key[1:]] = node
+
+
+    def node_key(self, node):
+        ''' Function to build the pool key of a node from its interned children. '''
+        node_class = type(node)
+        if node_class == Literal:
+            return (Literal, type(node.value), node.value)
+        elif node_class in (Binary, Logical):
+            return (node_class, operator_key(node.operator), id(node.left), id(node.right))
+        elif node_class == Unary:
+            return (Unary, operator_key(node.operator), id(node.right))
+        elif node_class == Variable_Expression:
+            if hasattr(node.name, 'accept'):
+                return (Variable_Expression, id(node.name))
+            return (Variable_Expression, token_key(node.name))
+        elif node_class == Multi_Identifier_Variable_Expression:
+            return (node_class, tuple(map(token_key, node.names)))
+        elif node_class == List:
+            return (List, tuple(map(id, node.sequence)))
+        else:
+            return (node_class,) + tuple(id(getattr(node, name)) for name in CHILDREN[node_class])
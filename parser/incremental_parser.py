@@ -0,0 +1,104 @@
+'''
+File containing the incremental parser class.
+
+'''
+
+
+from bisect import bisect_left
+
+from custom_parser import Parser
+
+
+class IncrementalParser(Parser):
+    '''
+    Parser that keeps its statements up to date as the tokens change.
+
+    Remembers the token index each top-level statement starts at, so that
+    after an edit only the statements around the changed tokens are parsed
+    again. Every other statement, including whole IF, FOR and WHILE blocks,
+    is reused as the same object.
+
+    If parsing raises, as it does on a syntax error part way through an
+    edit, the parser is left dirty and the next reparse() parses every
+    token again, since statement_starts no longer match the tokens.
+
+    '''
+
+
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.statements = []
+        self.statement_starts = []
+        self.dirty = True
+
+
+    def parse(self):
+        ''' Function to kick off parsing and remember where each statement starts. '''
+        self.current = 0
+        self.dirty = True
+        self.statements, self.statement_starts = self.parse_statements()
+        self.dirty = False
+        return self.statements
+
+
+    def parse_statements(self, resync=None):
+        '''
+        Function to parse top-level statements from the current token.
+
+        Stops at the end of the tokens, or as soon as resync(start) returns
+        True for the start of the next statement. Returns the statements
+        and their start indices.
+
+        '''
+        statements = []
+        starts = []
+        while not self.at_end():
+            if resync != None and resync(self.current):
+                break
+            starts.append(self.current)
+            statements.append(self.declaration())
+        return statements, starts
+
+
+    def reparse(self, tokens, first, old_end, new_end):
+        '''
+        Function to update the statements after the tokens were edited.
+
+        tokens[first:new_end] replaced old_tokens[first:old_end], as
+        returned by IncrementalScanner.edit(). Returns the new statements.
+        A dirty parser parses all of tokens instead.
+
+        '''
+        if self.dirty:
+            self.tokens = tokens
+            return self.parse()
+        statements = self.statements
+        starts = self.statement_starts
+        delta = new_end - old_end
+
+        # A statement may have looked one token past its end, so the first
+        # one that can change is the one before the first start at or
+        # after first - 1
+        restart = max(bisect_left(starts, first - 1) - 1, 0)
+
+        def resync(position):
+            ''' Function to check if an old statement starts at this new position. '''
+            if position < new_end:
+                return False
+            index = bisect_left(starts, position - delta, restart)
+            return index < len(starts) and starts[index] == position - delta
+
+        self.tokens = tokens
+        self.current = starts[restart] if restart < len(starts) else 0
+        self.dirty = True
+        new_statements, new_starts = self.parse_statements(resync)
+
+        if self.at_end():
+            reused = len(starts)
+        else:
+            reused = bisect_left(starts, self.current - delta, restart)
+        self.statements = statements[:restart] + new_statements + statements[reused:]
+        self.statement_starts = (starts[:restart] + new_starts
+                                 + [start + delta for start in starts[reused:]])
+        self.dirty = False
+        return self.statements
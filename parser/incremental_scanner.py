@@ -0,0 +1,251 @@
+'''
+File containing the incremental scanner class.
+
+'''
+
+
+from bisect import bisect_right
+
+from tokens import TokenType, Token
+from regex_scanner import RegexScanner
+
+
+# Token's own slots, before ShiftedToken shadows them with properties
+OFFSET = Token.offset
+LINE_NUMBER = Token.line_number
+
+
+class ShiftedToken(Token):
+    '''
+    Token of an IncrementalScanner, whose offset and line number are
+    shifted lazily.
+
+    An edit does not patch the tokens after it. It appends its shift to
+    the scanner's shifts list instead, and a token applies the shifts
+    made since its epoch the next time its offset or line number is read.
+    Each shift is (end of the edit, offset delta, line delta), the end
+    being an offset into the source as it was before that edit.
+
+    '''
+    __slots__ = ('shifts', 'epoch')
+
+
+    def __init__(self, token, shifts, epoch):
+        self.type = token.type
+        self.lexeme = token.lexeme
+        self.literal = token.literal
+        self.symbol_id = token.symbol_id
+        OFFSET.__set__(self, token.offset)
+        LINE_NUMBER.__set__(self, token.line_number)
+        self.shifts = shifts
+        self.epoch = epoch
+
+
+    def __reduce__(self):
+        ''' Function to pickle the token as a plain Token, with its shifts applied. '''
+        return (Token, (self.type, self.lexeme, self.literal, self.line_number,
+                        self.offset, self.symbol_id))
+
+
+    def catch_up(self):
+        ''' Function to apply the shifts made since the token's epoch. '''
+        shifts = self.shifts
+        epoch = self.epoch
+        if epoch == len(shifts):
+            return
+        offset = OFFSET.__get__(self)
+        line_number = LINE_NUMBER.__get__(self)
+        for index in range(epoch, len(shifts)):
+            edit_end, delta, line_delta = shifts[index]
+            if offset >= edit_end:
+                offset += delta
+                line_number += line_delta
+        OFFSET.__set__(self, offset)
+        LINE_NUMBER.__set__(self, line_number)
+        self.epoch = len(shifts)
+
+
+    @property
+    def offset(self):
+        self.catch_up()
+        return OFFSET.__get__(self)
+
+
+    @property
+    def line_number(self):
+        self.catch_up()
+        return LINE_NUMBER.__get__(self)
+
+
+class IncrementalScanner(RegexScanner):
+    '''
+    Scanner that keeps its tokens up to date as the source is edited.
+
+    An edit is re-scanned from the last safe restart point before it until
+    the new tokens line up with the old ones again. Tokens after that point
+    are reused, and their offsets and line numbers are shifted lazily, see
+    ShiftedToken, so an edit costs time in proportion to the tokens it
+    re-scans rather than to the file.
+
+    A restart point is the start of a token. The scanner is never inside a
+    string there, and braces_counter is 0 because comments are skipped
+    whole between tokens, so scanning can resume from it with no other
+    state than the line number. An edit inside a string or comment
+    therefore re-scans from the token before that string or comment.
+
+    Each error is kept with the token that follows it, so an edit only
+    drops the errors in the region it re-scans.
+
+    '''
+
+
+    def __init__(self, source, tokens=None):
+        self.previous_tokens = tokens
+        self.shifts = []
+        # Errors by the token after them, as (message, lines before the token)
+        self.token_errors = dict()
+        self.unplaced_errors = []
+        super().__init__(source)
+
+
+    def scan_source_code(self):
+        ''' Function to scan source code, unless tokens from a previous scan were given. '''
+        if self.previous_tokens == None:
+            self.tokens.extend(self.generate_tokens())
+            self.tokens.append(ShiftedToken(Token(TokenType.EOF, '', None, self.line_number,
+                                                  len(self.source)), self.shifts, 0))
+            self.place_errors(self.tokens[-1])
+        else:
+            self.tokens = [ShiftedToken(token, self.shifts, 0) for token in self.previous_tokens]
+        self.previous_tokens = None
+
+
+    def generate_tokens(self, position=0):
+        ''' Function to lazily scan ShiftedTokens from position, placing errors on the token after them. '''
+        shifts = self.shifts
+        epoch = len(shifts)
+        for token in super().generate_tokens(position):
+            token = ShiftedToken(token, shifts, epoch)
+            if self.unplaced_errors:
+                self.place_errors(token)
+            yield token
+
+
+    def error(self, message):
+        ''' Function to record an error, which is placed on the next token scanned. '''
+        super().error(message)
+        self.unplaced_errors.append((message, self.line_number))
+
+
+    def place_errors(self, token):
+        ''' Function to keep the errors found since the last token with token. '''
+        if self.unplaced_errors:
+            line_number = LINE_NUMBER.__get__(token)
+            self.token_errors.setdefault(token, []).extend(
+                (message, line_number - error_line) for message, error_line in self.unplaced_errors)
+            self.unplaced_errors = []
+
+
+    def collect_errors(self):
+        ''' Function to rebuild errors and had_error from the errors kept with each token. '''
+        errors = []
+        for token in sorted(self.token_errors, key=lambda token: token.offset):
+            line_number = token.line_number
+            errors.extend(f'{message} on line {line_number - lines_before}.'
+                          for message, lines_before in self.token_errors[token])
+        self.errors = errors
+        self.had_error = bool(errors)
+
+
+    def apply_edits(self, edits):
+        '''
+        Function to apply a list of edits in order.
+
+        Each edit is (offset, removed length, inserted text) and its offset
+        is into the source as left by the edits before it. Returns the
+        changed token range of each edit, see edit().
+
+        '''
+        return [self.edit(offset, removed, inserted) for offset, removed, inserted in edits]
+
+
+    def restart_index(self, offset):
+        '''
+        Function to find the last token that an edit at offset cannot change.
+
+        The number scanner looks up to two characters past the end of a
+        token ("1" then ".5"), so the token must end at least two
+        characters before the edit. Returns -1 if there is no such token.
+
+        '''
+        return bisect_right(self.tokens, offset - 2,
+                            key=lambda token: token.offset + len(token.lexeme)) - 1
+
+
+    def edit(self, offset, removed, inserted):
+        '''
+        Function to apply one edit to the source and re-scan around it.
+
+        Returns (first, old_end, new_end): tokens[first:old_end] of the old
+        token list were replaced by tokens[first:new_end] of the new one.
+        errors holds every error still in the source: those found while
+        re-scanning this edit and those kept from untouched regions.
+
+        '''
+        tokens = self.tokens
+        old_source = self.source
+        edit_end = offset + removed
+        delta = len(inserted) - removed
+        line_delta = inserted.count('\n') - old_source.count('\n', offset, edit_end)
+        self.source = old_source[:offset] + inserted + old_source[edit_end:]
+
+        # Resume scanning at the start of the last unaffected token
+        first = self.restart_index(offset)
+        if first < 0:
+            first = 0
+            position = 0
+            self.line_number = 1
+        else:
+            restart = tokens[first]
+            position = restart.offset
+            self.line_number = restart.line_number - restart.lexeme.count('\n')
+
+        # Old tokens that start after the edit can be reused once a new
+        # token starts at the same (shifted) offset
+        old_end = bisect_right(tokens, edit_end - 1, key=lambda token: token.offset)
+        last = len(tokens) - 1
+        new_tokens = []
+        token_errors = self.token_errors
+        self.unplaced_errors = []
+        for token in self.generate_tokens(position):
+            while old_end < last and tokens[old_end].offset + delta < token.offset:
+                old_end += 1
+            if old_end < last and tokens[old_end].offset + delta == token.offset:
+                # The gap before the reused token was re-scanned too
+                token_errors.pop(tokens[old_end], None)
+                if token in token_errors:
+                    token_errors[tokens[old_end]] = token_errors.pop(token)
+                break
+            new_tokens.append(token)
+        else:
+            old_end = len(tokens)
+            new_tokens.append(ShiftedToken(Token(TokenType.EOF, '', None, self.line_number,
+                                                 len(self.source)), self.shifts, len(self.shifts)))
+            self.place_errors(new_tokens[-1])
+
+        # The gap before the restart token was not re-scanned, so its
+        # errors stay with the same token as scanned again
+        if position and tokens[first] in token_errors:
+            token_errors[new_tokens[0]] = token_errors.pop(tokens[first])
+        for token in tokens[first:old_end]:
+            token_errors.pop(token, None)
+
+        # Later tokens pick the shift up when they are next read
+        if delta or line_delta:
+            self.shifts.append((edit_end, delta, line_delta))
+            for token in new_tokens:
+                token.epoch = len(self.shifts)
+
+        tokens[first:old_end] = new_tokens
+        self.collect_errors()
+        return first, old_end, first + len(new_tokens)
@@ -7,23 +7,61 @@ File containing the interpreter class.
 from tokens import TokenType
 from expression import Visitor as Expression_Visitor
 from statement import Visitor as Statement_Visitor
-from environment import Environment
+from environment import Environment, variable_token
+from range_set import RangeSet
+from resolver import Resolver
+from type_inference import TypeInference
 
 
 environment = Environment()
 
+# Frame of the program being interpreted, its variables by Resolver slot
+frame = None
+
 
 class Interpreter(Expression_Visitor, Statement_Visitor):
     
     
-    def __init__(self):
-        pass
+    def __init__(self, infer_types=True):
+        self.infer_types = infer_types
     
     
     def interpret(self, statements):
-        ''' Function to interpret and execute a list of statements. '''
-        for statement in statements:
-            Interpreter.execute(statement)
+        '''
+        Function to interpret and execute a list of statements.
+        
+        The statements are resolved first, so variables live in a Frame
+        indexed by slot while they run and undefined variables are found
+        before anything runs. The environment is updated afterwards.
+        
+        This differs from ClosureCompiler, AstCompiler and VirtualMachine,
+        which raise the same error only when the read or assignment runs.
+        A program that uses an undefined variable fails here with nothing
+        printed or stored, even if that use is in a branch that never runs,
+        such as IF a > 5 THEN PRINT missing ENDIF with a = 1.
+        
+        With infer_types, operators whose operand types TypeInference
+        proves skip their type checks.
+        
+        Resolving and running recurse a few frames per nesting level, so
+        statements nested more than about 250 levels deep raise
+        RecursionError under Python's default recursion limit.
+        
+        '''
+        global frame
+        frame = Resolver.resolve(statements, environment)
+        if Resolver.errors:
+            raise RuntimeError(Resolver.errors[0])
+        if self.infer_types:
+            TypeInference.infer(statements, environment)
+        else:
+            TypeInference.clear(statements)
+        frame.load(environment)
+        try:
+            for statement in statements:
+                Interpreter.execute(statement)
+        finally:
+            frame.save(environment)
         # try:
         #     for statement in statements:
         #         Interpreter.execute(statement)
@@ -32,8 +70,12 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
             
             
     def execute(statement):
-        ''' Function to send statements back into the interpreter's visitor implementation. '''
-        statement.accept(Interpreter)
+        ''' Function to send a statement, or a list of them, back into the interpreter's visitor implementation. '''
+        if isinstance(statement, list):
+            for stmt in statement:
+                stmt.accept(Interpreter)
+        else:
+            statement.accept(Interpreter)
             
             
     def stringify(an_object):
@@ -52,8 +94,8 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
     
     # Statements
         
-    def visit_expression(statement):
-        ''' Overwrites the Statement.visit_expression() class method. '''
+    def visit_expression_statement(statement):
+        ''' Overwrites the Statement.visit_expression_statement() class method. '''
         Interpreter.evaluate(statement.expression)
         return None
     
@@ -75,18 +117,35 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
         value = None
         if statement.initialiser != None:
             value = Interpreter.evaluate(statement.initialiser)
-        environment.define(statement.name.lexeme, value)
+        frame.define(statement.name.slot, value)
         
         
     def visit_if(statement):
         ''' Overwrites the Statement.visit_if() class method. '''
         if Interpreter.is_truthy(Interpreter.evaluate(statement.condition)):
             Interpreter.execute(statement.then_branch)
-        elif statement.else_branch != None:
+            return None
+        for elif_branch in statement.elif_branch:
+            if elif_branch.accept(Interpreter):
+                return None
+        if statement.else_branch != None:
             Interpreter.execute(statement.else_branch)
         return None
     
     
+    def visit_elif(statement):
+        '''
+        Overwrites the Statement.visit_elif() class method.
+        
+        Returns True if the branch was taken, so later branches are skipped.
+        
+        '''
+        if Interpreter.is_truthy(Interpreter.evaluate(statement.condition)):
+            Interpreter.execute(statement.then_branch)
+            return True
+        return False
+    
+    
     def visit_while(statement):
         ''' Overwrites the Statement.visit_while() class method. '''
         while Interpreter.is_truthy(Interpreter.evaluate(statement.condition)):
@@ -94,17 +153,44 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
         return None
     
     
+    def visit_for(statement):
+        '''
+        Overwrites the Statement.visit_for() class method.
+        
+        The initialiser must be name := lower TO upper. The bounds are
+        evaluated once and the name counts from lower up to upper, so the
+        body does not run at all when lower > upper.
+        
+        '''
+        initialiser = statement.initialiser
+        if not hasattr(initialiser, 'initialiser') or initialiser.initialiser == None:
+            raise RuntimeError('FOR initialiser must be a range, "name := lower TO upper"')
+        numbers = Interpreter.evaluate(initialiser.initialiser)
+        if type(numbers) != RangeSet:
+            raise RuntimeError('FOR initialiser must be a range, "name := lower TO upper"')
+        slot = initialiser.name.slot
+        for number in numbers.steps():
+            frame.define(slot, number)
+            Interpreter.execute(statement.body)
+        return None
+    
+    
     # Expressions
     
     def visit_variable_expression(expression):
         ''' Overwrites the Expression.visit_variables_expression() class method. '''
-        return environment.get(expression.name.lexeme)   
+        return frame.get(expression.slot)
+    
+    
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites the Expression.visit_multi_identifier_variable_expression() class method. '''
+        return frame.get(expression.slot)
 
         
     def visit_assign(expression):
         ''' Overwrites the Expression.visit_assign() class method. '''
         value = Interpreter.evaluate(expression.value)
-        environment.assign(expression.name, value)
+        frame.assign(expression.name.slot, value)
         return value
     
     
@@ -115,7 +201,7 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
             if Interpreter.is_truthy(left):
                 return left
         else:
-            if Interpreter.is_truthy(left):
+            if not Interpreter.is_truthy(left):
                 return left
         return Interpreter.evaluate(expression.right)
 
@@ -167,6 +253,8 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
         ''' Overwrites the Visitor.visit_binary() class method. '''
         left = Interpreter.evaluate(expression.left)
         right = Interpreter.evaluate(expression.right)
+        if expression.specialised != None:
+            return expression.specialised(left, right)
         
         if expression.operator.type == TokenType.MINUS:
             Interpreter.check_number_operands(expression.operator, left, right)
@@ -175,9 +263,9 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
         # Handles special case of + where can be used to concat strings
         elif expression.operator.type == TokenType.PLUS:
             if type(left) == float and type(right) == float:
-                return float(left) + float(right)
+                return left + right
             elif type(left) == str and type(right) == str:
-                return str(left) + str(right)
+                return left + right
             else:
                 print('Unknown or mismatched types() of left and right expressions.'\
                       f'Left is type {type(left)}, right is type {type(right)}.')
@@ -220,6 +308,27 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
     def visit_grouping(expression):
         ''' Overwrites the Visitor.visit_grouping() class method. '''
         return Interpreter.evaluate(expression.expression)
+    
+    
+    def visit_list(expression):
+        ''' Overwrites the Visitor.visit_list() class method. '''
+        return [Interpreter.evaluate(element) for element in expression.sequence]
+    
+    
+    def visit_range(expression):
+        ''' Overwrites the Visitor.visit_range() class method. '''
+        lower = Interpreter.evaluate(expression.lower)
+        upper = Interpreter.evaluate(expression.upper)
+        Interpreter.check_number_operands('TO', lower, upper)
+        return RangeSet(lower, upper)
+    
+    
+    def visit_range_list(expression):
+        ''' Overwrites the Visitor.visit_range_list() class method. '''
+        lower = Interpreter.evaluate(expression.lower)
+        upper = Interpreter.evaluate(expression.upper)
+        Interpreter.check_number_operands('[..]', lower, upper)
+        return RangeSet(lower, upper)
 
 
     def visit_literal(expression):
@@ -230,10 +339,12 @@ class Interpreter(Expression_Visitor, Statement_Visitor):
     def visit_unary(expression):
         ''' Overwrites the Visitor.visit_unary() class method. '''
         right = Interpreter.evaluate(expression.right)
+        if expression.specialised != None:
+            return expression.specialised(right)
         if expression.operator.type == TokenType.MINUS:
             Interpreter.check_number_operand(expression.operator, right)
             return -right
-        elif expression.operator.type == TokenType.BANG:
+        elif expression.operator.type == TokenType.BANG or expression.operator.type == TokenType.NOT:
             return not Interpreter.is_truthy(right)
         else:
             return None
@@ -0,0 +1,343 @@
+'''
+File containing the loop invariant code motion class.
+
+'''
+
+
+from tokens import TokenType, Token
+from expression import Visitor as Expression_Visitor, Binary, Grouping, Literal, Unary, \
+    Variable_Expression, Multi_Identifier_Variable_Expression, Assign, Logical, List, Range, \
+    Range_List
+from statement import Visitor as Statement_Visitor, Expression, Print, Variable_Statement, \
+    If, Elif, While, For
+from environment import key, variable_token
+from type_inference import TypeInference
+from dead_code import DefUseChains
+from ast_compiler import first_line
+
+
+NOT_OPERATORS = (TokenType.BANG, TokenType.NOT)
+EQUALITY_OPERATORS = (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+
+# Expressions that do work when evaluated, so are worth a temporary
+COMPOUND = (Binary, Unary, Logical, List)
+
+
+def walk(node):
+    ''' Function to yield every node and token in a tree. '''
+    pending = [node]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, list):
+            pending.extend(item)
+        elif isinstance(item, Token):
+            yield item
+        elif hasattr(item, 'accept'):
+            yield item
+            pending.extend(getattr(item, slot) for slot in type(item).__slots__)
+
+
+def assigned_keys(loop):
+    ''' Function to find the keys of every variable a loop may declare or assign. '''
+    return set(key(variable_token(node.name)) for node in walk(loop)
+               if type(node) in (Variable_Statement, Assign))
+
+
+def identifiers(statements):
+    ''' Function to find the lower case identifiers a tree uses, which are its Python names. '''
+    return set(token.lexeme.lower() for token in walk(statements)
+               if type(token) == Token and token.type == TokenType.IDENTIFIER)
+
+
+class LoopInvariantMotion(Expression_Visitor, Statement_Visitor):
+    '''
+    Moves expressions that give the same value on every pass of a loop to
+    temporaries computed once before it.
+
+    An expression in a WHILE condition, or anywhere in a WHILE or FOR
+    body, is invariant when it reads no variable the loop declares or
+    assigns, and cannot raise or assign. Reads must be of variables
+    DefUseChains proves are defined, and checked operators must have
+    operand types TypeInference proves, except = and <> and NOT, which
+    never raise. Division is only moved by a nonzero literal. So running
+    a moved expression before a loop that would not have run it changes
+    nothing but time.
+
+    The largest invariant expressions are moved, once per node however
+    often it is shared. Temporaries are declarations of new variables
+    named _invariant1, _invariant2 and so on, so the Interpreter and
+    PythonPrinter run and print them as any others. Outer loops are done
+    before the loops inside them, and the tree is rebuilt rather than
+    changed. LoopInvariantMotion.moved counts the temporaries made.
+
+    '''
+
+
+    assigned = None
+    invariant = None
+    temporaries = None
+    hoisted = None
+    names = None
+    moved = 0
+
+
+    def move(statements):
+        ''' Function to move loop invariant expressions out of the loops in a list of statements. '''
+        TypeInference.infer(statements)
+        DefUseChains.analyse(statements)
+        LoopInvariantMotion.names = identifiers(statements)
+        LoopInvariantMotion.moved = 0
+        moved = LoopInvariantMotion.block(statements)
+        LoopInvariantMotion.names = None
+        return moved
+
+
+    def block(statements):
+        ''' Function to move the invariants out of every loop in a list of statements. '''
+        moved = []
+        for statement in statements:
+            statement_class = type(statement)
+            if statement_class in (While, For):
+                moved.extend(LoopInvariantMotion.hoist(statement))
+            elif statement_class == If:
+                else_branch = statement.else_branch
+                if else_branch != None:
+                    else_branch = LoopInvariantMotion.block(else_branch)
+                moved.append(If(statement.condition, LoopInvariantMotion.block(statement.then_branch),
+                                [Elif(elif_branch.condition, LoopInvariantMotion.block(elif_branch.then_branch))
+                                 for elif_branch in statement.elif_branch], else_branch))
+            else:
+                moved.append(statement)
+        return moved
+
+
+    def hoist(loop):
+        ''' Function to move the invariants out of a loop, returning their declarations and the new loop. '''
+        LoopInvariantMotion.assigned = assigned_keys(loop)
+        LoopInvariantMotion.invariant = dict()
+        LoopInvariantMotion.temporaries = dict()
+        LoopInvariantMotion.hoisted = []
+        if type(loop) == While:
+            loop = While(LoopInvariantMotion.rewrite(loop.condition), LoopInvariantMotion.rewrite_block(loop.body))
+        else:
+            loop = For(loop.initialiser, LoopInvariantMotion.rewrite_block(loop.body))
+        hoisted = LoopInvariantMotion.hoisted
+        LoopInvariantMotion.assigned = LoopInvariantMotion.invariant = None
+        LoopInvariantMotion.temporaries = LoopInvariantMotion.hoisted = None
+        # Loops inside can still move what changes here but not in them
+        if type(loop) == While:
+            loop = While(loop.condition, LoopInvariantMotion.block(loop.body))
+        else:
+            loop = For(loop.initialiser, LoopInvariantMotion.block(loop.body))
+        return hoisted + [loop]
+
+
+    def rewrite_block(statements):
+        ''' Function to replace the invariants in a list of statements. '''
+        return [statement.accept(LoopInvariantMotion) for statement in statements]
+
+
+    def rewrite(expression):
+        ''' Function to replace an expression with a temporary if invariant, or its invariant parts if not. '''
+        if id(expression) in LoopInvariantMotion.temporaries:
+            return LoopInvariantMotion.temporaries[id(expression)]
+        inner = expression
+        while type(inner) == Grouping:
+            inner = inner.expression
+        if type(inner) in COMPOUND and LoopInvariantMotion.is_invariant(expression):
+            return LoopInvariantMotion.temporary(expression)
+        return expression.accept(LoopInvariantMotion)
+
+
+    def temporary(expression):
+        ''' Function to declare a new temporary holding an expression before the loop. '''
+        LoopInvariantMotion.moved += 1
+        number = LoopInvariantMotion.moved
+        while f'_invariant{number}' in LoopInvariantMotion.names:
+            number += 1
+        lexeme = f'_invariant{number}'
+        LoopInvariantMotion.names.add(lexeme)
+        name = Token(TokenType.IDENTIFIER, lexeme, None, first_line(expression))
+        LoopInvariantMotion.hoisted.append(Variable_Statement(Variable_Expression(name), expression))
+        LoopInvariantMotion.temporaries[id(expression)] = Variable_Expression(name)
+        return LoopInvariantMotion.temporaries[id(expression)]
+
+
+    def is_invariant(expression):
+        ''' Function to determine if an expression gives the same value on every pass and cannot raise. '''
+        if id(expression) not in LoopInvariantMotion.invariant:
+            LoopInvariantMotion.invariant[id(expression)] = LoopInvariantMotion.check(expression)
+        return LoopInvariantMotion.invariant[id(expression)]
+
+
+    def check(expression):
+        ''' Function to test an expression for LoopInvariantMotion.is_invariant(). '''
+        expression_class = type(expression)
+        if expression_class == Literal:
+            return True
+        elif expression_class in (Variable_Expression, Multi_Identifier_Variable_Expression):
+            return key(variable_token(expression)) not in LoopInvariantMotion.assigned and \
+                id(expression) not in DefUseChains.undefined_reads
+        elif expression_class == Grouping:
+            return LoopInvariantMotion.is_invariant(expression.expression)
+        elif expression_class == Unary:
+            if expression.operator.type not in NOT_OPERATORS and expression.specialised == None:
+                return False
+            return LoopInvariantMotion.is_invariant(expression.right)
+        elif expression_class == Binary:
+            operator_type = expression.operator.type
+            if operator_type not in EQUALITY_OPERATORS and expression.specialised == None:
+                return False
+            if operator_type == TokenType.FWD_SLASH and \
+                    (type(expression.right) != Literal or expression.right.value == 0):
+                return False
+            return LoopInvariantMotion.is_invariant(expression.left) and \
+                LoopInvariantMotion.is_invariant(expression.right)
+        elif expression_class == Logical:
+            return LoopInvariantMotion.is_invariant(expression.left) and \
+                LoopInvariantMotion.is_invariant(expression.right)
+        elif expression_class == List:
+            return all(LoopInvariantMotion.is_invariant(element) for element in expression.sequence)
+        return False
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        return Expression(LoopInvariantMotion.rewrite(statement.expression))
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        return Print(LoopInvariantMotion.rewrite(statement.expression))
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        if statement.initialiser == None:
+            return statement
+        return Variable_Statement(statement.name, LoopInvariantMotion.rewrite(statement.initialiser))
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        else_branch = statement.else_branch
+        if else_branch != None:
+            else_branch = LoopInvariantMotion.rewrite_block(else_branch)
+        return If(LoopInvariantMotion.rewrite(statement.condition),
+                  LoopInvariantMotion.rewrite_block(statement.then_branch),
+                  [elif_branch.accept(LoopInvariantMotion) for elif_branch in statement.elif_branch],
+                  else_branch)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method. '''
+        return Elif(LoopInvariantMotion.rewrite(statement.condition),
+                    LoopInvariantMotion.rewrite_block(statement.then_branch))
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        return While(LoopInvariantMotion.rewrite(statement.condition),
+                     LoopInvariantMotion.rewrite_block(statement.body))
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if hasattr(initialiser, 'accept'):
+            initialiser = initialiser.accept(LoopInvariantMotion)
+        return For(initialiser, LoopInvariantMotion.rewrite_block(statement.body))
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        left = LoopInvariantMotion.rewrite(expression.left)
+        right = LoopInvariantMotion.rewrite(expression.right)
+        if left is expression.left and right is expression.right:
+            return expression
+        # A temporary has the type of what it replaced, so the operator stays proven
+        return Binary(left, expression.operator, right, expression.specialised)
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        inner = LoopInvariantMotion.rewrite(expression.expression)
+        if inner is expression.expression:
+            return expression
+        return Grouping(inner)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        return expression
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        right = LoopInvariantMotion.rewrite(expression.right)
+        if right is expression.right:
+            return expression
+        return Unary(expression.operator, right, expression.specialised)
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        return expression
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        return expression
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        value = LoopInvariantMotion.rewrite(expression.value)
+        if value is expression.value:
+            return expression
+        return Assign(expression.name, value)
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        left = LoopInvariantMotion.rewrite(expression.left)
+        right = LoopInvariantMotion.rewrite(expression.right)
+        if left is expression.left and right is expression.right:
+            return expression
+        return Logical(left, expression.operator, right)
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        sequence = [LoopInvariantMotion.rewrite(element) for element in expression.sequence]
+        if all(new is old for new, old in zip(sequence, expression.sequence)):
+            return expression
+        return List(sequence)
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        lower = LoopInvariantMotion.rewrite(expression.lower)
+        upper = LoopInvariantMotion.rewrite(expression.upper)
+        if lower is expression.lower and upper is expression.upper:
+            return expression
+        return Range(lower, upper)
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        lower = LoopInvariantMotion.rewrite(expression.lower)
+        upper = LoopInvariantMotion.rewrite(expression.upper)
+        if lower is expression.lower and upper is expression.upper:
+            return expression
+        return Range_List(lower, upper)
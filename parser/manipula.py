@@ -4,18 +4,54 @@ File containing the manipula parser class.
 '''
 
 
+import mmap
+
 from scanner import Scanner
+from bytes_scanner import BytesScanner
 from custom_parser import Parser
+from hash_consing_parser import HashConsingParser
+from optimiser import Optimiser
+from dead_code import DeadCodeEliminator
+from loop_invariants import LoopInvariantMotion
+from common_subexpressions import CommonSubexpressions
 from python_printer import PythonPrinter
+from stream_scanner import StreamingScanner, TokenStream
 
 
 class Manipula:
     
 
-    def __init__(self, path_to_file):
+    def __init__(self, path_to_file, scanner_class=Scanner, memory_map=False,
+                 parser_class=Parser, cache=None, optimise=False, eliminate_dead_code=False,
+                 move_invariants=False, eliminate_common=False):
         self.path_to_file = path_to_file
-        self.get_file_string()
+        self.scanner_class = scanner_class
+        self.parser_class = parser_class
+        self.cache = cache
+        self.eliminated = 0
+        self.dead_code = []
+        self.moved = 0
+        self.reused = 0
+        self.saved = 0
+        if memory_map:
+            self.scanner_class = BytesScanner
+            self.get_file_bytes()
+        else:
+            self.get_file_string()
         self.parse_file()
+        if optimise:
+            self.statements = Optimiser.optimise(self.statements)
+            self.eliminated = Optimiser.eliminated
+        if eliminate_dead_code:
+            self.statements = DeadCodeEliminator.eliminate(self.statements)
+            self.dead_code = DeadCodeEliminator.report
+        if move_invariants:
+            self.statements = LoopInvariantMotion.move(self.statements)
+            self.moved = LoopInvariantMotion.moved
+        if eliminate_common:
+            self.statements = CommonSubexpressions.eliminate(self.statements)
+            self.reused = CommonSubexpressions.reused
+            self.saved = CommonSubexpressions.saved
         self.write_python()
         
         
@@ -24,22 +60,86 @@ class Manipula:
         with open(self.path_to_file, 'r') as file:
             self.file_string = file.read()
             file.close()
+            
+            
+    def get_file_bytes(self):
+        '''
+        Function to memory map the source file instead of reading it.
+        
+        The map is scanned as bytes by BytesScanner and closed once the
+        file has been scanned. Empty files cannot be mapped, so they are
+        read as empty bytes.
+        
+        '''
+        with open(self.path_to_file, 'rb') as file:
+            try:
+                self.file_string = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self.file_string = b''
         
 
     def parse_file(self):
-        ''' Function to parse the read file. '''
-        self.scanner = Scanner(self.file_string)
+        '''
+        Function to parse the read file.
+        
+        With a cache, a file whose contents were parsed before is loaded
+        from it instead, and scanner and parser are left as None.
+        
+        '''
+        if self.cache != None:
+            tag = f'{self.scanner_class.__name__}:{self.parser_class.__name__}'
+            cached = self.cache.load(self.file_string, tag)
+            if cached != None:
+                self.close_file()
+                self.scanner = self.parser = None
+                self.tokens, self.statements, self.symbols = cached
+                return
+        self.scanner = self.scanner_class(self.file_string)
         self.tokens = self.scanner.tokens
+        self.symbols = self.scanner.symbols
         if self.scanner.had_error:
             print('Error(s) exists in syntax, cannot scan file.')
-        self.parser = Parser(self.tokens)
+        self.parser = self.parser_class(self.tokens)
         self.statements = self.parser.parse()
         if self.parser.had_error:
             print('Error(s) exists in tokens, cannot parse file.')
+        # Only clean files are cached, so errors are reported on every run
+        elif self.cache != None and not self.scanner.had_error:
+            self.cache.store(self.file_string, self.tokens, self.statements, self.symbols, tag)
+        self.close_file()
+        
+        
+    def close_file(self):
+        ''' Function to close the memory map of the source file, if there is one. '''
+        if isinstance(self.file_string, mmap.mmap):
+            self.file_string.close()
         
     
     def write_python(self):
         ''' Function to write the parsed statements into Python syntax. '''
-        self.syntax, self.identifiers = PythonPrinter._write(self.statements)
-    
+        memoise = issubclass(self.parser_class, HashConsingParser)
+        self.syntax, self.identifiers = PythonPrinter._write(self.statements, self.symbols, memoise)
+
+
+def convert_stream(path_to_file, output_file, chunk_size=1 << 16):
+    '''
+    Function to convert a source file to Python one statement at a time.
+
+    The file is scanned in chunks and each statement is written to
+    output_file as soon as it is parsed, so memory use stays flat no
+    matter how large the source is. Returns the scanner and parser so
+    their errors can be inspected.
 
+    '''
+    with open(path_to_file, 'r') as file:
+        scanner = StreamingScanner(file, chunk_size)
+        parser = Parser(TokenStream(scanner))
+        PythonPrinter.indent = 0
+        PythonPrinter.symbols = scanner.symbols
+        PythonPrinter.printed = None
+        for statement in parser.parse_lazily():
+            # Identifiers are not returned here, so none are kept
+            PythonPrinter.identifiers = []
+            output_file.write(PythonPrinter.execute(statement) + '\n')
+        PythonPrinter.identifiers = []
+    return scanner, parser
@@ -0,0 +1,30 @@
+'''
+File containing helpers for deeply nested programs.
+
+'''
+
+
+from statement import If, While, For
+
+
+def nesting_depth(statements):
+    ''' Function to measure how deeply IF, FOR and WHILE blocks are nested, without recursion. '''
+    deepest = 0
+    pending = [(statement, 0) for statement in statements]
+    while pending:
+        statement, depth = pending.pop()
+        if depth > deepest:
+            deepest = depth
+        statement_class = type(statement)
+        if statement_class == If:
+            children = list(statement.then_branch)
+            for elif_branch in statement.elif_branch:
+                children.extend(elif_branch.then_branch)
+            children.extend(statement.else_branch or [])
+        elif statement_class == While or statement_class == For:
+            children = statement.body
+        else:
+            continue
+        pending.extend((child, depth + 1) for child in children)
+    return deepest
+
@@ -0,0 +1,332 @@
+'''
+File containing the optimiser class.
+
+'''
+
+
+from tokens import TokenType
+from expression import Visitor as Expression_Visitor, Binary, Grouping, Literal, Unary, \
+    Variable_Expression, Multi_Identifier_Variable_Expression, Assign, Logical, List, Range, \
+    Range_List
+from statement import Visitor as Statement_Visitor, Expression, Print, Variable_Statement, \
+    If, Elif, While, For
+from interpreter import Interpreter
+
+
+# Operators that give a bool, or raise
+BOOLEAN_OPERATORS = frozenset((TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS,
+                               TokenType.LESS_EQUAL, TokenType.IN, TokenType.EQUAL_EQUAL,
+                               TokenType.BANG_EQUAL))
+
+# Operators that give a number, or raise
+NUMBER_OPERATORS = frozenset((TokenType.MINUS, TokenType.STAR, TokenType.FWD_SLASH))
+
+COMPARISONS = {
+    TokenType.GREATER: lambda a, b: a > b,
+    TokenType.GREATER_EQUAL: lambda a, b: a >= b,
+    TokenType.LESS: lambda a, b: a < b,
+    TokenType.LESS_EQUAL: lambda a, b: a <= b,
+    }
+
+# Expressions a grouping around does nothing
+ATOMS = (Literal, Variable_Expression, Multi_Identifier_Variable_Expression, Grouping, List, Range_List)
+
+NOT_OPERATORS = (TokenType.BANG, TokenType.NOT)
+
+
+def count_nodes(statements):
+    ''' Function to count the statement and expression nodes in a tree, shared nodes once per use. '''
+    count = 0
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif hasattr(node, 'accept'):
+            count += 1
+            pending.extend(getattr(node, slot) for slot in type(node).__slots__)
+    return count
+
+
+def is_boolean(expression):
+    ''' Function to determine if an expression can only give a bool. '''
+    while type(expression) == Grouping:
+        expression = expression.expression
+    expression_class = type(expression)
+    if expression_class == Literal:
+        return type(expression.value) is bool
+    elif expression_class == Unary:
+        return expression.operator.type in NOT_OPERATORS
+    elif expression_class == Binary:
+        return expression.operator.type in BOOLEAN_OPERATORS
+    return False
+
+
+def is_number(expression):
+    ''' Function to determine if an expression can only give a number. '''
+    while type(expression) == Grouping:
+        expression = expression.expression
+    expression_class = type(expression)
+    if expression_class == Literal:
+        return type(expression.value) is float
+    elif expression_class == Unary:
+        return expression.operator.type == TokenType.MINUS
+    elif expression_class == Binary:
+        return expression.operator.type in NUMBER_OPERATORS
+    return False
+
+
+def fold_binary(operator_type, left, right):
+    '''
+    Function to compute a binary operator on two literal values.
+
+    Returns a Literal, or None if the operator would raise or print, so
+    the error still happens at run time.
+
+    '''
+    numbers = type(left) is float and type(right) is float
+    if operator_type == TokenType.PLUS:
+        if numbers or (type(left) is str and type(right) is str):
+            return Literal(left + right)
+    elif operator_type == TokenType.MINUS and numbers:
+        return Literal(left - right)
+    elif operator_type == TokenType.STAR and numbers:
+        return Literal(left * right)
+    elif operator_type == TokenType.FWD_SLASH and numbers and right != 0:
+        return Literal(left / right)
+    elif operator_type in COMPARISONS and numbers:
+        return Literal(COMPARISONS[operator_type](left, right))
+    elif operator_type == TokenType.EQUAL_EQUAL:
+        return Literal(Interpreter.is_equal(left, right))
+    elif operator_type == TokenType.BANG_EQUAL:
+        return Literal(not Interpreter.is_equal(left, right))
+    elif operator_type == TokenType.IN and type(left) is str and type(right) is str:
+        return Literal(left in right)
+    return None
+
+
+class Optimiser(Expression_Visitor, Statement_Visitor):
+    '''
+    Folds constants and simplifies the AST, between parsing and running
+    or printing it.
+
+    Operators on literals are computed, unless they would raise. Groupings
+    that change nothing are removed, as are double negations of values
+    that are already numbers or bools. OR and AND with a literal on the
+    left become the side they would give, and x OR FALSE or x AND TRUE
+    become x when x is a bool. Anything that could raise is kept, so
+    errors happen as they did.
+
+    The tree is not changed, nodes are rebuilt when a child changes, so
+    trees that share nodes keep sharing them.
+
+    '''
+
+
+    optimised = None
+    eliminated = 0
+
+
+    def optimise(statements):
+        ''' Function to optimise a list of statements, setting Optimiser.eliminated to the nodes removed. '''
+        Optimiser.optimised = dict()
+        optimised = Optimiser.block(statements)
+        Optimiser.optimised = None
+        Optimiser.eliminated = count_nodes(statements) - count_nodes(optimised)
+        return optimised
+
+
+    def block(statements):
+        ''' Function to optimise a list of statements. '''
+        return [statement.accept(Optimiser) for statement in statements]
+
+
+    def simplify(expression):
+        ''' Function to optimise an expression, once per node however often it is shared. '''
+        if id(expression) not in Optimiser.optimised:
+            Optimiser.optimised[id(expression)] = expression.accept(Optimiser)
+        return Optimiser.optimised[id(expression)]
+
+
+    def root(expression):
+        ''' Function to optimise an expression nothing else is applied to, which needs no grouping. '''
+        expression = Optimiser.simplify(expression)
+        while type(expression) == Grouping:
+            expression = expression.expression
+        return expression
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        expression = Optimiser.root(statement.expression)
+        if expression is statement.expression:
+            return statement
+        return Expression(expression)
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        expression = Optimiser.root(statement.expression)
+        if expression is statement.expression:
+            return statement
+        return Print(expression)
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        if statement.initialiser == None:
+            return statement
+        initialiser = Optimiser.root(statement.initialiser)
+        if initialiser is statement.initialiser:
+            return statement
+        return Variable_Statement(statement.name, initialiser)
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        else_branch = statement.else_branch
+        if else_branch != None:
+            else_branch = Optimiser.block(else_branch)
+        return If(Optimiser.root(statement.condition), Optimiser.block(statement.then_branch),
+                  [elif_branch.accept(Optimiser) for elif_branch in statement.elif_branch], else_branch)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method. '''
+        return Elif(Optimiser.root(statement.condition), Optimiser.block(statement.then_branch))
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        return While(Optimiser.root(statement.condition), Optimiser.block(statement.body))
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if hasattr(initialiser, 'accept'):
+            initialiser = initialiser.accept(Optimiser)
+        return For(initialiser, Optimiser.block(statement.body))
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        left = Optimiser.simplify(expression.left)
+        right = Optimiser.simplify(expression.right)
+        if type(left) == Literal and type(right) == Literal:
+            folded = fold_binary(expression.operator.type, left.value, right.value)
+            if folded != None:
+                return folded
+        if left is expression.left and right is expression.right:
+            return expression
+        return Binary(left, expression.operator, right)
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        inner = Optimiser.simplify(expression.expression)
+        if isinstance(inner, ATOMS):
+            return inner
+        if inner is expression.expression:
+            return expression
+        return Grouping(inner)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        return expression
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        right = Optimiser.simplify(expression.right)
+        operator_type = expression.operator.type
+        inner = right
+        while type(inner) == Grouping:
+            inner = inner.expression
+        if operator_type == TokenType.MINUS:
+            if type(inner) == Literal and type(inner.value) is float:
+                return Literal(-inner.value)
+            if type(inner) == Unary and inner.operator.type == TokenType.MINUS and is_number(inner.right):
+                # Negating a number twice cannot raise
+                return inner.right
+        elif operator_type in NOT_OPERATORS:
+            if type(inner) == Literal:
+                return Literal(not Interpreter.is_truthy(inner.value))
+            if type(inner) == Unary and inner.operator.type in NOT_OPERATORS and is_boolean(inner.right):
+                return inner.right
+        if right is expression.right:
+            return expression
+        return Unary(expression.operator, right)
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        return expression
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        return expression
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        value = Optimiser.root(expression.value)
+        if value is expression.value:
+            return expression
+        return Assign(expression.name, value)
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        left = Optimiser.simplify(expression.left)
+        right = Optimiser.simplify(expression.right)
+        is_or = expression.operator.type == TokenType.OR
+        if type(left) == Literal:
+            # The left side decides alone which side is the value
+            if Interpreter.is_truthy(left.value) == is_or:
+                return left
+            return right
+        if type(right) == Literal and type(right.value) is bool and right.value != is_or and is_boolean(left):
+            # x OR FALSE and x AND TRUE give x when x is a bool
+            return left
+        if left is expression.left and right is expression.right:
+            return expression
+        return Logical(left, expression.operator, right)
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        sequence = [Optimiser.root(element) for element in expression.sequence]
+        if all(new is old for new, old in zip(sequence, expression.sequence)):
+            return expression
+        return List(sequence)
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        lower = Optimiser.simplify(expression.lower)
+        upper = Optimiser.simplify(expression.upper)
+        if lower is expression.lower and upper is expression.upper:
+            return expression
+        return Range(lower, upper)
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        lower = Optimiser.simplify(expression.lower)
+        upper = Optimiser.simplify(expression.upper)
+        if lower is expression.lower and upper is expression.upper:
+            return expression
+        return Range_List(lower, upper)
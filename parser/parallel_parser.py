@@ -0,0 +1,254 @@
+'''
+File containing the parallel parser class.
+
+'''
+
+
+import io
+import os
+import pickle
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+from tokens import TokenType
+from custom_parser import Parser
+from token_buffer import TokenView
+
+
+BLOCK_OPENERS = frozenset((TokenType.IF, TokenType.FOR, TokenType.WHILE))
+BLOCK_CLOSERS = frozenset((TokenType.ENDIF, TokenType.ENDDO))
+GROUP_OPENERS = frozenset((TokenType.LEFT_PAREN, TokenType.LEFT_SQUARE))
+GROUP_CLOSERS = frozenset((TokenType.RIGHT_PAREN, TokenType.RIGHT_SQUARE))
+
+# Tokens that can only start a statement
+STATEMENT_KEYWORDS = BLOCK_OPENERS | {TokenType.PRINT}
+
+# Tokens that can end an expression, after which an IDENTIFIER starts a
+# new statement instead of continuing the expression
+OPERAND_ENDS = frozenset((TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING,
+                          TokenType.TRUE, TokenType.FALSE, TokenType.RIGHT_PAREN,
+                          TokenType.RIGHT_SQUARE, TokenType.ENDIF, TokenType.ENDDO))
+
+# Tokens Parser.build_identifier() may take into a field path
+IDENTIFIER_PARTS = frozenset((TokenType.DOT, TokenType.LEFT_SQUARE, TokenType.IDENTIFIER,
+                              TokenType.RIGHT_SQUARE, TokenType.NUMBER))
+
+
+def skip_identifier(types, index):
+    '''
+    Function to skip a field path such as a.b[1] starting at index.
+
+    Takes exactly the tokens Parser.build_identifier() would. Returns the
+    index after the path and the type of its last token.
+
+    '''
+    last = TokenType.IDENTIFIER
+    bracket_counter = 0
+    index += 1
+    while types[index] in IDENTIFIER_PARTS:
+        token_type = types[index]
+        if token_type == TokenType.LEFT_SQUARE:
+            bracket_counter += 1
+        elif token_type == TokenType.RIGHT_SQUARE:
+            if bracket_counter == 0:
+                break
+            bracket_counter -= 1
+        elif token_type == TokenType.IDENTIFIER and last in (TokenType.IDENTIFIER, TokenType.RIGHT_SQUARE):
+            break
+        last = token_type
+        index += 1
+    return index, last
+
+
+def statement_boundaries(tokens):
+    '''
+    Function to find token indices where a top-level statement must start.
+
+    A boundary is a statement keyword, or an IDENTIFIER after a complete
+    operand, outside every IF/FOR/WHILE block and every bracket. The
+    tokens are walked once, tracking block and bracket depth.
+
+    '''
+    types = [token.type for token in tokens]
+    boundaries = []
+    depth = 0
+    nesting = 0
+    previous = None
+    index = 0
+    end = len(types) - 1
+    while index < end:
+        token_type = types[index]
+        if depth == 0 and nesting == 0 and index > 0:
+            if token_type in STATEMENT_KEYWORDS or (
+                    token_type == TokenType.IDENTIFIER and previous in OPERAND_ENDS):
+                boundaries.append(index)
+
+        if token_type == TokenType.IDENTIFIER and types[index + 1] in (TokenType.DOT, TokenType.LEFT_SQUARE):
+            index, previous = skip_identifier(types, index)
+            continue
+        elif token_type in BLOCK_OPENERS:
+            depth += 1
+        elif token_type in BLOCK_CLOSERS:
+            depth -= 1
+        elif token_type in GROUP_OPENERS:
+            nesting += 1
+        elif token_type in GROUP_CLOSERS:
+            nesting -= 1
+        if depth < 0 or nesting < 0:
+            # Unbalanced, the parser will report it so stop splitting here
+            break
+        previous = token_type
+        index += 1
+    return boundaries
+
+
+class RangeParser(Parser):
+    '''
+    Parser for the statements in tokens[start:end], run in a worker process.
+
+    The tokens past end are still visible to lookahead, so the statements
+    are the same as a serial parse would produce for that range. Errors
+    are kept instead of printed, the parent parses serially to report them.
+
+    '''
+
+
+    def __init__(self, tokens, start, end):
+        super().__init__(tokens)
+        self.current = start
+        self.end = end
+
+
+    def at_end(self):
+        ''' Function to determine if at end of the range. '''
+        return self.current >= self.end or super().at_end()
+
+
+    def error(self, token, message):
+        ''' Function to raise error without printing it. '''
+        self.had_error = True
+        raise Exception(message)
+
+
+class TokenPickler(pickle.Pickler):
+    '''
+    Pickler that writes tokens from the shared token list as their index.
+
+    The parent already has every token, so only the nodes are sent back
+    and the statements hold the parent's own token objects.
+
+    '''
+
+
+    def __init__(self, file, positions):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.positions = positions
+
+
+    def persistent_id(self, an_object):
+        ''' Function to get the index of a shared token, or None for other objects. '''
+        if type(an_object) == TokenView:
+            return an_object.index
+        return self.positions.get(id(an_object))
+
+
+class TokenUnpickler(pickle.Unpickler):
+    ''' Unpickler that looks token indices up in the parent's token list. '''
+
+
+    def __init__(self, file, tokens):
+        super().__init__(file)
+        self.tokens = tokens
+
+
+    def persistent_load(self, index):
+        ''' Function to get the token at index. '''
+        return self.tokens[index]
+
+
+# Tokens given to each worker process when the pool starts, and the index
+# of each Token object in them
+worker_tokens = None
+worker_positions = None
+
+
+def set_worker_tokens(tokens):
+    ''' Function to store the tokens in a worker process. '''
+    global worker_tokens, worker_positions
+    worker_tokens = tokens
+    if isinstance(tokens, list):
+        worker_positions = {id(token): index for index, token in enumerate(tokens)}
+    else:
+        worker_positions = {}
+
+
+def parse_range(start, end):
+    '''
+    Function to parse one range of the worker's tokens.
+
+    Returns the statements pickled by TokenPickler, or None on an error.
+
+    '''
+    try:
+        statements = RangeParser(worker_tokens, start, end).parse()
+    except Exception:
+        return None
+    file = io.BytesIO()
+    TokenPickler(file, worker_positions).dump(statements)
+    return file.getvalue()
+
+
+class ParallelParser(Parser):
+    '''
+    Parser that splits the tokens at top-level statement boundaries and
+    parses the ranges in a process pool.
+
+    The statement lists are concatenated in order and are the same as
+    Parser.parse(). If any range fails to parse, the whole token list is
+    parsed serially so errors are reported exactly as Parser reports them.
+
+    Tokens are sent to each worker once and statements are sent back, so a
+    list of Token objects is cheaper to send than a TokenBuffer.
+
+    '''
+
+
+    def __init__(self, tokens, workers=None, minimum_chunk=20000):
+        super().__init__(tokens)
+        self.workers = workers or os.cpu_count() or 1
+        self.minimum_chunk = minimum_chunk
+
+
+    def parse(self):
+        ''' Function to kick off parsing, in parallel if there are enough tokens. '''
+        bounds = self.chunk_bounds()
+        if len(bounds) <= 2:
+            return super().parse()
+
+        with ProcessPoolExecutor(len(bounds) - 1, initializer=set_worker_tokens,
+                                 initargs=(self.tokens,)) as executor:
+            results = list(executor.map(parse_range, bounds[:-1], bounds[1:]))
+        if any(result == None for result in results):
+            return super().parse()
+
+        self.current = bounds[-1]
+        statements = []
+        for result in results:
+            statements.extend(TokenUnpickler(io.BytesIO(result), self.tokens).load())
+        return statements
+
+
+    def chunk_bounds(self):
+        ''' Function to choose the token indices the ranges start and end at. '''
+        count = len(self.tokens) - 1
+        chunks = min(self.workers, count // self.minimum_chunk)
+        if chunks < 2:
+            return [0, count]
+        boundaries = statement_boundaries(self.tokens)
+        bounds = [0]
+        for chunk in range(1, chunks):
+            index = bisect_left(boundaries, count * chunk // chunks)
+            if index < len(boundaries) and boundaries[index] > bounds[-1]:
+                bounds.append(boundaries[index])
+        bounds.append(count)
+        return bounds
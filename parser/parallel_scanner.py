@@ -0,0 +1,186 @@
+'''
+File containing the parallel scanner class.
+
+'''
+
+
+import os
+import re
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+from tokens import TokenType
+from regex_scanner import skip_comment
+from token_buffer import TokenBuffer, BufferScanner, IDENTIFIER_CODE
+
+
+# The only characters that can open or close a string or comment
+DELIMITER_PATTERN = re.compile("['{}]")
+
+
+def unsafe_spans(source):
+    '''
+    Function to find every string and comment in the source.
+
+    Returns sorted, non-overlapping (start, end) spans. A quote inside a
+    comment and a brace inside a string are skipped with their span, and
+    nested comments are skipped whole, exactly as the scanners do.
+
+    '''
+    spans = []
+    search = DELIMITER_PATTERN.search
+    position = 0
+    while True:
+        found = search(source, position)
+        if found == None:
+            return spans
+        start = found.start()
+        character = found.group()
+        if character == "'":
+            close = source.find("'", start + 1)
+            if close == -1:
+                spans.append((start, len(source)))
+                return spans
+            position = close + 1
+        elif character == '{':
+            position, depth = skip_comment(source, start + 1)
+        else:
+            # An unmatched "}" is an error token, not a span
+            position = start + 1
+            continue
+        spans.append((start, position))
+
+
+def split_points(source, chunks):
+    '''
+    Function to choose up to chunks - 1 offsets to split the source at.
+
+    Each split is just after a newline that is outside every string and
+    comment, so a scanner can start there with no state but the line number.
+
+    '''
+    spans = unsafe_spans(source)
+    span_starts = [start for start, _ in spans]
+    points = []
+    for chunk in range(1, chunks):
+        target = max(len(source) * chunk // chunks, points[-1] if points else 0)
+        newline = source.find('\n', target)
+        while newline != -1:
+            index = bisect_right(span_starts, newline) - 1
+            if index < 0 or spans[index][1] <= newline:
+                break
+            newline = source.find('\n', spans[index][1])
+        if newline == -1:
+            break
+        if not points or newline + 1 > points[-1]:
+            points.append(newline + 1)
+    return points
+
+
+class ChunkScanner(BufferScanner):
+    '''
+    BufferScanner for one chunk of a larger source, run in a worker process.
+
+    Starts counting at the chunk's first line and keeps its errors instead
+    of printing them, so the parent can print every chunk's errors in order.
+
+    '''
+
+
+    def __init__(self, source, line_number):
+        self.first_line_number = line_number
+        super().__init__(source)
+
+
+    def error(self, message):
+        ''' Function to create an error and store in errors list. '''
+        self.had_error = True
+        self.errors.append(f'{message} on line {self.line_number}.')
+
+
+    def scan_source_code(self):
+        ''' Function to scan the chunk, starting at its first line. '''
+        self.line_number = self.first_line_number
+        super().scan_source_code()
+
+
+def scan_chunk(chunk, line_number, offset, offset_type):
+    '''
+    Function to scan one chunk in a worker process.
+
+    Returns the chunk's token columns without its EOF token, with offsets
+    made absolute, along with its symbol names and errors.
+
+    '''
+    scanner = ChunkScanner(chunk, line_number)
+    tokens = scanner.tokens
+    count = len(tokens) - 1
+    starts = array(offset_type, [start + offset for start in tokens.starts[:count]])
+    ends = array(offset_type, [end + offset for end in tokens.ends[:count]])
+    return (tokens.kinds[:count], starts, ends, tokens.literal_indices[:count],
+            tokens.literals, scanner.symbols.names, scanner.errors)
+
+
+class ParallelScanner(BufferScanner):
+    '''
+    Scanner that splits a large source into chunks and scans them in a
+    process pool.
+
+    The chunks' token columns are stitched back into one TokenBuffer whose
+    tokens, line numbers, symbol ids and errors are the same as a serial
+    scan of the whole source.
+
+    '''
+
+
+    def __init__(self, source, workers=None, minimum_chunk=1 << 20):
+        self.workers = workers or os.cpu_count() or 1
+        self.minimum_chunk = minimum_chunk
+        super().__init__(source)
+
+
+    def scan_source_code(self):
+        ''' Function to scan the source in parallel if it is large enough. '''
+        source = self.source
+        chunks = min(self.workers, len(source) // self.minimum_chunk)
+        points = split_points(source, chunks) if chunks > 1 else []
+        if not points:
+            super().scan_source_code()
+            return
+
+        bounds = [0] + points + [len(source)]
+        texts = [source[start:end] for start, end in zip(bounds, bounds[1:])]
+        lines = [1]
+        for start, end in zip(bounds, bounds[1:-1]):
+            lines.append(lines[-1] + source.count('\n', start, end))
+
+        tokens = TokenBuffer(source, self.symbols)
+        offset_type = tokens.starts.typecode
+        with ProcessPoolExecutor(len(texts)) as executor:
+            results = executor.map(scan_chunk, texts, lines, bounds[:-1],
+                                   [offset_type] * len(texts))
+            for kinds, starts, ends, literal_indices, literals, names, errors in results:
+                self.stitch(tokens, kinds, starts, ends, literal_indices, literals, names)
+                for error_message in errors:
+                    self.had_error = True
+                    self.errors.append(error_message)
+                    print(error_message)
+
+        tokens.append(TokenType.EOF, len(source), len(source))
+        self.tokens = tokens
+
+
+    def stitch(self, tokens, kinds, starts, ends, literal_indices, literals, names):
+        ''' Function to append one chunk's columns to the combined buffer. '''
+        # Chunk symbol ids become ids in this scanner's table, which gives
+        # the same ids as a serial scan because chunks are merged in order
+        remap = [self.symbols.intern(name) for name in names]
+        shift = len(tokens.literals)
+        tokens.kinds.extend(kinds)
+        tokens.starts.extend(starts)
+        tokens.ends.extend(ends)
+        tokens.literal_indices.extend(array('i', [
+            remap[index] if kind == IDENTIFIER_CODE else index + shift if index >= 0 else index
+            for kind, index in zip(kinds, literal_indices)]))
+        tokens.literals.extend(literals)
@@ -0,0 +1,185 @@
+'''
+File containing the parse cache class.
+
+'''
+
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+
+# Change whenever Scanner or Parser output changes, so old entries miss
+GRAMMAR_VERSION = '4'
+
+
+def atomic_write(path, data):
+    '''
+    Function to write data to path so readers never see a partial file.
+
+    The data goes to a temporary file in the same directory, which then
+    replaces path in one step. Safe with several processes writing.
+
+    '''
+    handle, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                              suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class ParseCache:
+    '''
+    Content-addressed directory of scanned and parsed sources.
+
+    Each entry is a pickle of the tokens, statements and symbol table of
+    one source, named by a hash of the source and a tag naming the grammar
+    version and the scanner and parser used. Entries are evicted least
+    recently used first once the directory grows past max_bytes, down to
+    EVICT_TO of it.
+
+    The size of the directory is counted once, on the first store, and
+    kept up to date with each entry written, so a store only scans the
+    directory when it crosses max_bytes. Entries other processes write
+    are found on that scan.
+
+    Subclasses can cache other entries by changing suffix, encode() and
+    decode().
+
+    '''
+
+
+    suffix = '.pickle'
+
+    # Fraction of max_bytes eviction leaves, so the next stores do not evict
+    EVICT_TO = 0.9
+
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = None
+        os.makedirs(directory, exist_ok=True)
+
+
+    def key(self, source, tag=''):
+        ''' Function to hash a source (str or bytes-like) and tag into an entry name. '''
+        digest = hashlib.sha256(f'{GRAMMAR_VERSION}:{tag}:'.encode())
+        if isinstance(source, str):
+            source = source.encode('utf-8', 'surrogatepass')
+        digest.update(source)
+        return digest.hexdigest()
+
+
+    def path(self, key):
+        ''' Function to get the file path of an entry. '''
+        return os.path.join(self.directory, key + self.suffix)
+
+
+    def load(self, source, tag=''):
+        '''
+        Function to load the cached (tokens, statements, symbols) of a source.
+
+        Returns None on a miss, including entries another process removed
+        or left unreadable, and entries written by older code that no
+        longer unpickle.
+
+        '''
+        path = self.path(self.key(source, tag))
+        try:
+            with open(path, 'rb') as file:
+                entry = self.decode(file)
+        except Exception:
+            # Unpickling can raise almost anything, e.g. AttributeError or
+            # ImportError for a class that was renamed or moved
+            return None
+        # Mark the entry as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+
+    def decode(self, file):
+        ''' Function to read an entry from an open cache file. '''
+        return pickle.load(file)
+
+
+    def encode(self, entry):
+        ''' Function to serialise an entry to bytes. '''
+        return pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+
+
+    def store(self, source, tokens, statements, symbols, tag=''):
+        ''' Function to cache the tokens, statements and symbols of a source. '''
+        self.store_entry(source, (tokens, statements, symbols), tag)
+
+
+    def store_entry(self, source, entry, tag=''):
+        ''' Function to cache any entry for a source. '''
+        try:
+            data = self.encode(entry)
+        except (RecursionError, ValueError):
+            # Too deeply nested or not serialisable, leave it uncached
+            return
+        path = self.path(self.key(source, tag))
+        if self.total_bytes == None:
+            self.total_bytes = self.directory_bytes()
+        try:
+            self.total_bytes -= os.path.getsize(path)
+        except OSError:
+            pass
+        atomic_write(path, data)
+        self.total_bytes += len(data)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+
+    def directory_bytes(self):
+        ''' Function to add up the size of the entries in the directory. '''
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(self.suffix):
+                    try:
+                        total += entry.stat().st_size
+                    except FileNotFoundError:
+                        pass
+        return total
+
+
+    def evict(self):
+        ''' Function to remove least recently used entries until under EVICT_TO of max_bytes. '''
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    status = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, entry.path))
+                total += status.st_size
+
+        entries.sort()
+        limit = self.max_bytes * self.EVICT_TO
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.total_bytes = total
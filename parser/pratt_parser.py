@@ -0,0 +1,106 @@
+'''
+File containing the Pratt parser class.
+
+'''
+
+
+from tokens import TokenType
+from expression import Assign, Binary, Literal, Unary, Variable_Expression, Logical, Range
+from custom_parser import Parser
+
+
+# Binding power of each infix operator, matching Parser's precedence from
+# _or() (loosest) down to factor() (tightest). All are left associative.
+BINDING_POWERS = {
+    TokenType.OR: 1,
+    TokenType.AND: 2,
+    TokenType.TO: 3,
+    TokenType.BANG_EQUAL: 4, TokenType.EQUAL_EQUAL: 4,
+    TokenType.GREATER: 5, TokenType.GREATER_EQUAL: 5,
+    TokenType.LESS: 5, TokenType.LESS_EQUAL: 5, TokenType.IN: 5,
+    TokenType.MINUS: 6, TokenType.PLUS: 6,
+    TokenType.FWD_SLASH: 7, TokenType.STAR: 7,
+    }
+
+LOGICAL_OPERATORS = frozenset((TokenType.OR, TokenType.AND))
+PREFIX_OPERATORS = frozenset((TokenType.BANG, TokenType.MINUS, TokenType.NOT))
+LITERALS = frozenset((TokenType.NUMBER, TokenType.STRING))
+IDENTIFIER_SUFFIXES = frozenset((TokenType.DOT, TokenType.LEFT_SQUARE))
+
+
+class PrattParser(Parser):
+    '''
+    Parser whose expressions are parsed by precedence climbing over
+    BINDING_POWERS instead of one method per precedence level.
+
+    Each token is looked up once, and the trees are the same Binary,
+    Logical, Range and Unary nodes that Parser builds.
+
+    '''
+
+
+    def assignment(self):
+        ''' Function to parse an assignment expression. '''
+        expression = self.binary(0)
+        equals = self.tokens[self.current]
+        if equals.type == TokenType.EQUAL:
+            self.current += 1
+            value = self.assignment()
+            if type(expression) == Variable_Expression:
+                name = Variable_Expression(expression.name)
+                return Assign(name, value)
+            else:
+                self.error(equals, 'invalid assignment target')
+        return expression
+
+
+    def binary(self, minimum_power):
+        ''' Function to parse infix operators that bind tighter than minimum_power. '''
+        expression = self.unary()
+        tokens = self.tokens
+        while True:
+            operator = tokens[self.current]
+            power = BINDING_POWERS.get(operator.type)
+            if power == None or power <= minimum_power:
+                return expression
+            self.current += 1
+            right = self.binary(power)
+            if operator.type in LOGICAL_OPERATORS:
+                expression = Logical(expression, operator, right)
+            elif operator.type == TokenType.TO:
+                expression = Range(expression, right)
+            else:
+                expression = Binary(expression, operator, right)
+
+
+    def unary(self):
+        ''' Function for unary operators. '''
+        operator = self.tokens[self.current]
+        if operator.type in PREFIX_OPERATORS:
+            self.current += 1
+            right = self.unary()
+            return Unary(operator, right)
+        else:
+            return self.primary()
+
+
+    def primary(self):
+        ''' Function for primary expressions, lists and groupings are left to Parser. '''
+        token = self.tokens[self.current]
+        token_type = token.type
+        if token_type in LITERALS:
+            self.current += 1
+            return Literal(token.literal)
+        elif token_type == TokenType.IDENTIFIER:
+            if self.peek_next().type in IDENTIFIER_SUFFIXES:
+                return Variable_Expression(self.build_identifier())
+            self.current += 1
+            return Variable_Expression(token)
+        elif token_type == TokenType.TRUE:
+            self.current += 1
+            return Literal(True)
+        elif token_type == TokenType.FALSE:
+            self.current += 1
+            return Literal(False)
+        else:
+            return super().primary()
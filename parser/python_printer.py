@@ -6,7 +6,9 @@ File containing the interpreter class.
 
 from tokens import Token
 from expression import Visitor as Expression_Visitor
-from expression import Range, Variable_Expression
+from tokens import TokenType
+from expression import Range, Range_List, Variable_Expression, Multi_Identifier_Variable_Expression, \
+    Literal, Grouping
 from statement import Visitor as Statement_Visitor
 
 
@@ -15,28 +17,78 @@ class PythonPrinter(Expression_Visitor, Statement_Visitor):
     
     indent = 0
     identifiers = []
+    symbols = None
+    printed = None
     
     
-    def _write(statements):
-        ''' Function to interpret and execute a list of statements. '''
-        python_syntax = []
-        for statement in statements:
-            python_syntax.append(PythonPrinter.execute(statement))
+    def _write(statements, symbols=None, memoise=False):
+        '''
+        Function to interpret and execute a list of statements.
+        
+        If the scanner's SymbolTable is given, identifiers are lowered once
+        per symbol instead of once per use. With memoise, each expression
+        node is printed once and its text reused wherever the node is
+        shared, as in trees from HashConsingParser.
+        
+        Printing recurses a few frames per nesting level, so statements
+        nested more than about 150 levels deep raise RecursionError under
+        Python's default recursion limit. Python itself accepts no more
+        than 100 indentation levels.
+        
+        '''
+        # Start from a clean state, a worker process may write many files
+        PythonPrinter.indent = 0
+        PythonPrinter.identifiers = []
+        PythonPrinter.symbols = symbols
+        PythonPrinter.printed = dict() if memoise else None
+        try:
+            python_syntax = [PythonPrinter.execute(statement) for statement in statements]
+        finally:
+            # Later prints outside _write must not reuse this tree's text
+            PythonPrinter.printed = None
         return python_syntax, list(set(PythonPrinter.identifiers))
 
             
     def execute(statement):
         ''' Function to send statements back into the printer's visitor implementation. '''
         if isinstance(statement, list):
-            for stmt in statement:
-                return stmt.accept(PythonPrinter)
+            separator = '\n' + '\t'*PythonPrinter.indent
+            return separator.join(stmt.accept(PythonPrinter) for stmt in statement)
         else:
             return statement.accept(PythonPrinter)
+    
+    
+    def block(statements):
+        ''' Function to print a list of statements as an indented block, starting on a new line. '''
+        PythonPrinter.indent += 1
+        string = '\n' + '\t'*PythonPrinter.indent
+        if statements == []:
+            string += 'pass'
+        else:
+            string += PythonPrinter.execute(statements)
+        PythonPrinter.indent -= 1
+        return string
             
     
     def evaluate(expression):
         ''' Function to send expression back into the printer's visitor implementation. '''
-        return expression.accept(PythonPrinter)
+        printed = PythonPrinter.printed
+        if printed == None:
+            return expression.accept(PythonPrinter)
+        # Keyed on the node itself, which keeps it alive, as an id() can
+        # be reused by a later node once the first is freed
+        text = printed.get(expression)
+        if text == None:
+            text = printed[expression] = expression.accept(PythonPrinter)
+        return text
+    
+    
+    def folded_name(token):
+        ''' Function to get the lower case name of an identifier token. '''
+        if PythonPrinter.symbols == None or token.symbol_id == None:
+            return token.lexeme.lower()
+        else:
+            return PythonPrinter.symbols.folded[token.symbol_id]
     
     
     def stringify(an_object):
@@ -82,64 +134,30 @@ class PythonPrinter(Expression_Visitor, Statement_Visitor):
     def visit_if(statement):
         ''' Overwrites Statement.visit_if() class method. '''
         condition = PythonPrinter.evaluate(statement.condition)
-        # string = '\n' + '\t'*PythonPrinter.indent
-        string = f'if {condition}:'
-        
-        PythonPrinter.indent += 1
-        # Then branch
-        for stmt in statement.then_branch:
-            string += '\n' + '\t'*PythonPrinter.indent
-            then_branch = PythonPrinter.execute(stmt)
-            string += then_branch
-        
-        
-        # Elif branch
-        if statement.elif_branch != []:
-            for stmt in statement.elif_branch:
-                elif_branch = PythonPrinter.execute(stmt)
-                PythonPrinter.indent -= 1
-                string += '\n' + '\t'*PythonPrinter.indent
-                PythonPrinter.indent += 1
-                string += elif_branch.replace('\t', '\t'*PythonPrinter.indent)
-        
-        # Else branch 
+        string = f'if {condition}:' + PythonPrinter.block(statement.then_branch)
+        for stmt in statement.elif_branch:
+            string += '\n' + '\t'*PythonPrinter.indent + PythonPrinter.execute(stmt)
         if statement.else_branch != None:
-            else_branch = PythonPrinter.execute(statement.else_branch)
-            PythonPrinter.indent -= 1
-            string += '\n' + '\t'*PythonPrinter.indent + 'else:'
-            PythonPrinter.indent += 1
-            string += '\n' + '\t'*PythonPrinter.indent + else_branch
-        
-        PythonPrinter.indent -= 1
+            string += '\n' + '\t'*PythonPrinter.indent + 'else:' + PythonPrinter.block(statement.else_branch)
         return string
         
         
     def visit_elif(statement):
         ''' Overwrites Statement.visit_elif() class method. '''
         condition = PythonPrinter.evaluate(statement.condition)
-        then_branch = PythonPrinter.execute(statement.then_branch)
-        return f'elif {condition}:' + '\n\t' + f'{then_branch}'
+        return f'elif {condition}:' + PythonPrinter.block(statement.then_branch)
 
         
     def visit_while(statement):
         ''' Overwrites Statement.visit_while() class method. '''
-        condition =  PythonPrinter.evaluate(statement.condition)
-        body =  PythonPrinter.execute(statement.body)
-        return f'while {condition}: {body}'
+        condition = PythonPrinter.evaluate(statement.condition)
+        return f'while {condition}:' + PythonPrinter.block(statement.body)
         
         
     def visit_for(statement):
         ''' Overwrites Statement.visit_for() class method. '''
         initialiser = PythonPrinter.evaluate(statement.initialiser)
-        string = f'for {initialiser}:'
-        PythonPrinter.indent += 1
-        for stmt in statement.body:
-            body = PythonPrinter.execute(stmt)
-        # Body
-            string += '\n' + '\t'*PythonPrinter.indent + f'{body}'
-        
-        PythonPrinter.indent -= 1
-        return string
+        return f'for {initialiser}:' + PythonPrinter.block(statement.body)
     
     
 # =============================================================================
@@ -149,6 +167,9 @@ class PythonPrinter(Expression_Visitor, Statement_Visitor):
     
     def visit_binary(expression):
         ''' Overwrites Expression.visit_binary() class method. '''
+        if expression.operator.type == TokenType.IN and isinstance(expression.right, Range_List):
+            # Membership of a range is a bounds check, not a set or range()
+            return PythonPrinter.range_membership(expression.left, expression.right)
         left = PythonPrinter.evaluate(expression.left)
         right = PythonPrinter.evaluate(expression.right)
         return f'{left} {expression.operator.type.value} {right}'
@@ -176,17 +197,18 @@ class PythonPrinter(Expression_Visitor, Statement_Visitor):
         ''' Overwrites Expression.visit_variable_expression() class method. '''
         name = expression.name
         if isinstance(name, Token):
-            PythonPrinter.identifiers.append(name.lexeme.lower())
-            return name.lexeme.lower()
+            folded = PythonPrinter.folded_name(name)
+            PythonPrinter.identifiers.append(folded)
+            return folded
         else:
             return PythonPrinter.evaluate(name)
         
 
     def visit_multi_identifier_variable_expression(expression):
         '''Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
-        elements = [token.lexeme for token in expression.names]
-        PythonPrinter.identifiers.append(elements[-1].lower())
-        return elements[-1].lower()
+        folded = PythonPrinter.folded_name(expression.names[-1])
+        PythonPrinter.identifiers.append(folded)
+        return folded
         
 
     def visit_assign(expression):
@@ -210,9 +232,83 @@ class PythonPrinter(Expression_Visitor, Statement_Visitor):
         
         
     def visit_range(expression):
-        ''' Overwrites Expression.visit_range() class method. '''
-        lower = PythonPrinter.evaluate(expression.lower)
-        upper = PythonPrinter.evaluate(expression.upper)
-        return f'range({lower}, {upper})'
-
-        
\ No newline at end of file
+        '''
+        Overwrites Expression.visit_range() class method.
+        
+        Prints the values of a FOR counter, as RangeSet.steps() gives them:
+        lower, lower + 1 and so on up to upper, none if lower > upper.
+        Whole literal bounds print as range(), others as a call that
+        evaluates each bound once.
+        
+        '''
+        lower = expression.lower
+        upper = expression.upper
+        if isinstance(lower, Literal) and isinstance(upper, Literal) \
+                and lower.value == int(lower.value) and upper.value == int(upper.value):
+            return f'range({int(lower.value)}, {max(int(lower.value), int(upper.value) + 1)})'
+        lower = PythonPrinter.evaluate(lower)
+        upper = PythonPrinter.evaluate(upper)
+        return ('(lambda lower, upper: [lower + step for step in range(int(upper - lower) + 1)] '
+                f'if lower <= upper else [])({lower}, {upper})')
+    
+    
+    def range_upper(expression):
+        ''' Function to write the whole number a range list ends at. '''
+        upper = expression.upper
+        if isinstance(upper, Literal):
+            return str(int(upper.value))
+        return f'int({PythonPrinter.evaluate(upper)})'
+    
+    
+    def is_simple(expression):
+        ''' Function to determine if an expression can be printed more than once, as it is a name or literal. '''
+        while isinstance(expression, Grouping):
+            expression = expression.expression
+        return isinstance(expression, (Literal, Variable_Expression, Multi_Identifier_Variable_Expression))
+    
+    
+    def range_membership(value, expression):
+        '''
+        Function to write a test that value is in a range list.
+        
+        Same as RangeSet.__contains__: value is the lower bound, or a whole
+        number above it up to the upper bound. Values are floats, and a
+        float in range() is a linear scan, so bounds are compared instead.
+        The value and lower bound are written more than once, so unless
+        they are names or literals they are passed to a lambda and
+        evaluated once.
+        
+        '''
+        lower = expression.lower
+        upper = PythonPrinter.range_upper(expression)
+        text = PythonPrinter.evaluate(value)
+        if isinstance(lower, Literal) and PythonPrinter.is_simple(value):
+            if lower.value == int(lower.value):
+                return f'({int(lower.value)} <= {text} <= {upper} and {text} == int({text}))'
+            return (f'({text} == {lower.value} or {int(lower.value)} < {text} <= {upper} '
+                    f'and {text} == int({text}))')
+        lower = PythonPrinter.evaluate(lower)
+        return (f'(lambda value, lower: value == lower or int(lower) < value <= {upper} '
+                f'and value == int(value))({text}, {lower})')
+    
+    
+    def visit_range_list(expression):
+        '''
+        Overwrites Expression.visit_range_list() class method.
+        
+        Prints the numbers RangeSet holds, the lower bound exactly and
+        every whole number after it up to the upper bound.
+        
+        '''
+        lower = expression.lower
+        upper = expression.upper
+        if isinstance(upper, Literal):
+            end = str(int(upper.value) + 1)
+        else:
+            end = f'{PythonPrinter.range_upper(expression)} + 1'
+        if isinstance(lower, Literal):
+            if lower.value == int(lower.value) and isinstance(upper, Literal) and lower.value <= int(upper.value):
+                return f'set(range({int(lower.value)}, {end}))'
+            return f'{{{lower.value}}} | set(range({int(lower.value) + 1}, {end}))'
+        lower = PythonPrinter.evaluate(lower)
+        return f'(lambda lower: {{lower}} | set(range(int(lower) + 1, {end})))({lower})'
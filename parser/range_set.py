@@ -0,0 +1,51 @@
+'''
+File containing the range set class.
+
+'''
+
+
+class RangeSet:
+    '''
+    Value of a range list, [lower..upper].
+    
+    Holds the same numbers Parser used to expand the list into, lower
+    followed by every whole number after it up to upper, but only stores
+    the bounds so membership is O(1).
+    
+    It is also the value of lower TO upper, whose FOR loop counts with
+    steps() rather than running over the list.
+    
+    '''
+    
+    
+    def __init__(self, lower, upper):
+        self.lower = lower
+        self.upper = upper
+        
+        
+    def __contains__(self, value):
+        if value == self.lower:
+            return True
+        elif type(value) != float or value != int(value):
+            return False
+        else:
+            return int(self.lower) < value <= int(self.upper)
+        
+        
+    def __iter__(self):
+        yield self.lower
+        for number in range(int(self.lower) + 1, int(self.upper) + 1):
+            yield float(number)
+            
+            
+    def steps(self):
+        ''' Function to yield the values of a FOR counter, lower, lower + 1 and so on up to upper, none if lower > upper. '''
+        lower = self.lower
+        if lower > self.upper:
+            return
+        for step in range(int(self.upper - lower) + 1):
+            yield lower + step
+            
+            
+    def __repr__(self):
+        return f'[{self.lower}..{self.upper}]'
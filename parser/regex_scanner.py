@@ -0,0 +1,139 @@
+'''
+File containing the regex scanner class.
+
+'''
+
+
+import re
+
+from tokens import TokenType, Token
+from scanner import Scanner
+
+
+# One compiled master pattern, tried in order at the current position. Runs
+# of whitespace, whole identifiers, numbers and strings are consumed in C.
+TOKEN_PATTERN = re.compile(r'''
+    (?P<WHITESPACE>[ \t\r\n]+)
+  | (?P<IDENTIFIER>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<OPERATOR>!=|:=|>=|<=|<>|[()\[\],.\-+;/*=!:<>])
+  | (?P<NUMBER>[0-9]+(?:\.[0-9]+)?)
+  | (?P<STRING>'[^']*')
+  | (?P<COMMENT>\{)
+  | (?P<UNMATCHED>\})
+  | (?P<UNTERMINATED>')
+  | (?P<UNEXPECTED>.)
+''', re.VERBOSE | re.DOTALL)
+
+
+# Operator lexemes and the token types the original scanner gives them
+OPERATORS = {
+    '(': TokenType.LEFT_PAREN,
+    ')': TokenType.RIGHT_PAREN,
+    '[': TokenType.LEFT_SQUARE,
+    ']': TokenType.RIGHT_SQUARE,
+    ',': TokenType.COMMA,
+    '.': TokenType.DOT,
+    '-': TokenType.MINUS,
+    '+': TokenType.PLUS,
+    ';': TokenType.SEMICOLON,
+    '/': TokenType.FWD_SLASH,
+    '*': TokenType.STAR,
+    '=': TokenType.EQUAL_EQUAL,
+    '!': TokenType.BANG,
+    '!=': TokenType.BANG_EQUAL,
+    ':': TokenType.COLON,
+    ':=': TokenType.EQUAL,
+    '>': TokenType.GREATER,
+    '>=': TokenType.GREATER_EQUAL,
+    '<': TokenType.LESS,
+    '<=': TokenType.LESS_EQUAL,
+    '<>': TokenType.BANG_EQUAL,
+    }
+
+
+def skip_comment(source, position, depth=1):
+    '''
+    Function to skip the rest of a (possibly nested) comment.
+
+    The position is inside a comment that is depth levels deep. Returns
+    the position after the matching "}" and a depth of 0, or the end of
+    the source and the depth still open if the comment is not closed.
+
+    '''
+    while depth:
+        close = source.find('}', position)
+        if close == -1:
+            return len(source), depth + source.count('{', position)
+        # Every "{" before the next "}" opens another level
+        depth += source.count('{', position, close) - 1
+        position = close + 1
+    return position, depth
+
+
+class RegexScanner(Scanner):
+    '''
+    Drop-in replacement for Scanner that is driven by TOKEN_PATTERN
+    instead of one advance() call per character.
+
+    Produces the same tokens, line numbers and error messages as Scanner.
+
+    '''
+
+
+    def generate_tokens(self, position=0):
+        ''' Function to lazily scan tokens from position to the end of the source. '''
+        source = self.source
+        length = len(source)
+        match = TOKEN_PATTERN.match
+        keywords = self.keywords
+        intern = self.symbols.intern
+        names = self.symbols.names
+
+        while position < length:
+            found = match(source, position)
+            kind = found.lastgroup
+            end = found.end()
+
+            if kind == 'WHITESPACE':
+                self.line_number += source.count('\n', position, end)
+            elif kind == 'IDENTIFIER':
+                text = found.group()
+                token_type = keywords.get(text)
+                if token_type == None:
+                    symbol_id = intern(text)
+                    yield Token(TokenType.IDENTIFIER, names[symbol_id], None,
+                                self.line_number, position, symbol_id)
+                else:
+                    yield Token(token_type, text, None, self.line_number, position)
+            elif kind == 'OPERATOR':
+                text = found.group()
+                yield Token(OPERATORS[text], text, None, self.line_number, position)
+            elif kind == 'NUMBER':
+                text = found.group()
+                yield Token(TokenType.NUMBER, text, float(text), self.line_number, position)
+            elif kind == 'STRING':
+                text = found.group()
+                self.line_number += text.count('\n')
+                yield Token(TokenType.STRING, text, text[1:-1], self.line_number, position)
+            elif kind == 'COMMENT':
+                end, depth = skip_comment(source, end)
+                if depth:
+                    self.line_number += source.count('\n', position)
+                    self.error('Unmatched character "{"')
+                    return
+                self.line_number += source.count('\n', position, end)
+            elif kind == 'UNMATCHED':
+                self.error('Unmatched character "}"')
+            elif kind == 'UNTERMINATED':
+                self.line_number += source.count('\n', position)
+                self.error('Untermenated string')
+                return
+            else:
+                self.error(f'Unexpected character "{found.group()}"')
+            position = end
+
+
+    def scan_source_code(self):
+        ''' Function to scan source code and extract tokens. '''
+        self.tokens.extend(self.generate_tokens())
+        self.tokens.append(Token(TokenType.EOF, '', None, self.line_number, len(self.source)))
@@ -0,0 +1,254 @@
+'''
+File containing the resolver class.
+
+'''
+
+
+from expression import Visitor as Expression_Visitor
+from statement import Visitor as Statement_Visitor, Variable_Statement, If, While, For
+from environment import key, variable_token, Frame
+
+
+def loop_definitions(statements):
+    ''' Function to find the keys every FOR or declaration in a loop body may define. '''
+    keys = set()
+    pending = list(statements)
+    while pending:
+        statement = pending.pop()
+        statement_class = type(statement)
+        if statement_class == Variable_Statement:
+            keys.add(key(variable_token(statement.name)))
+        elif statement_class == For:
+            if type(statement.initialiser) == Variable_Statement:
+                keys.add(key(variable_token(statement.initialiser.name)))
+            pending.extend(statement.body)
+        elif statement_class == While:
+            pending.extend(statement.body)
+        elif statement_class == If:
+            pending.extend(statement.then_branch)
+            for elif_branch in statement.elif_branch:
+                pending.extend(elif_branch.then_branch)
+            pending.extend(statement.else_branch or [])
+    return keys
+
+
+class Resolver(Expression_Visitor, Statement_Visitor):
+    '''
+    Gives every variable in a program a slot in a Frame before it runs.
+
+    Each variable node gets the slot of its name, so running the program
+    loads and stores by index instead of hashing names. A variable read
+    or assigned where no declaration or FOR could have defined it yet, on
+    any path, is an error reported here, before anything runs. Variables
+    that are only defined on some paths are still checked at run time.
+
+    '''
+
+
+    slots = None
+    keys = None
+    names = None
+    defined = None
+    errors = []
+    in_loop = False
+
+
+    def resolve(statements, environment=None):
+        '''
+        Function to resolve a list of statements, returning the Frame they run in.
+
+        Variables environment already holds count as defined. Errors are
+        kept in Resolver.errors, with the message the engines raise for
+        the same variable at run time.
+
+        '''
+        Resolver.slots = dict()
+        Resolver.keys = []
+        Resolver.names = []
+        Resolver.defined = set() if environment == None else set(environment.values)
+        Resolver.errors = []
+        Resolver.in_loop = False
+        Resolver.block(statements)
+        return Frame(Resolver.keys, Resolver.names)
+
+
+    def block(statements):
+        ''' Function to resolve a list of statements in order. '''
+        for statement in statements:
+            statement.accept(Resolver)
+
+
+    def resolve_expression(expression):
+        ''' Function to send an expression back into the resolver's visitor implementation. '''
+        expression.accept(Resolver)
+
+
+    def slot(node):
+        ''' Function to give a variable node the slot of its name. '''
+        token = variable_token(node)
+        name_key = key(token)
+        if name_key not in Resolver.slots:
+            Resolver.slots[name_key] = len(Resolver.keys)
+            Resolver.keys.append(name_key)
+            Resolver.names.append(token.lexeme)
+        node.slot = Resolver.slots[name_key]
+        return name_key, token
+
+
+    def use(node):
+        ''' Function to resolve a read of or assignment to a variable, which must be defined. '''
+        name_key, token = Resolver.slot(node)
+        if name_key not in Resolver.defined:
+            Resolver.errors.append(f'Undefined variable "{token.lexeme}"')
+
+
+    def define(node):
+        ''' Function to resolve a declaration of a variable. '''
+        name_key, _ = Resolver.slot(node)
+        Resolver.defined.add(name_key)
+
+
+    def define_loop_names(body):
+        '''
+        Function to count the names a WHILE or FOR body may define as defined.
+
+        An outer loop's definitions already include those of every loop
+        nested in it, so they are only collected for the outermost loop.
+
+        '''
+        if not Resolver.in_loop:
+            Resolver.defined.update(loop_definitions(body))
+
+
+    def loop_body(body):
+        ''' Function to resolve the body of a WHILE or FOR. '''
+        in_loop = Resolver.in_loop
+        Resolver.in_loop = True
+        try:
+            Resolver.block(body)
+        finally:
+            Resolver.in_loop = in_loop
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        Resolver.resolve_expression(statement.expression)
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        Resolver.resolve_expression(statement.expression)
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        if statement.initialiser != None:
+            Resolver.resolve_expression(statement.initialiser)
+        Resolver.define(statement.name)
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        Resolver.resolve_expression(statement.condition)
+        Resolver.block(statement.then_branch)
+        for elif_branch in statement.elif_branch:
+            elif_branch.accept(Resolver)
+        if statement.else_branch != None:
+            Resolver.block(statement.else_branch)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method. '''
+        Resolver.resolve_expression(statement.condition)
+        Resolver.block(statement.then_branch)
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        # The condition and body run again after the body defines things
+        Resolver.define_loop_names(statement.body)
+        Resolver.resolve_expression(statement.condition)
+        Resolver.loop_body(statement.body)
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if not hasattr(initialiser, 'initialiser') or initialiser.initialiser == None:
+            # Fails at run time before the body can run
+            return
+        Resolver.resolve_expression(initialiser.initialiser)
+        Resolver.define(initialiser.name)
+        Resolver.define_loop_names(statement.body)
+        Resolver.loop_body(statement.body)
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        Resolver.resolve_expression(expression.left)
+        Resolver.resolve_expression(expression.right)
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        Resolver.resolve_expression(expression.expression)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        return None
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        Resolver.resolve_expression(expression.right)
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        Resolver.use(expression)
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        Resolver.use(expression)
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        Resolver.resolve_expression(expression.value)
+        Resolver.use(expression.name)
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method. '''
+        Resolver.resolve_expression(expression.left)
+        Resolver.resolve_expression(expression.right)
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        for element in expression.sequence:
+            Resolver.resolve_expression(element)
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        Resolver.resolve_expression(expression.lower)
+        Resolver.resolve_expression(expression.upper)
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        Resolver.resolve_expression(expression.lower)
+        Resolver.resolve_expression(expression.upper)
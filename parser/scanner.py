@@ -5,6 +5,7 @@ File containing the scanner class.
 
 
 from tokens import TokenType, Token
+from symbol_table import SymbolTable
 
 
 class Scanner():
@@ -18,6 +19,7 @@ class Scanner():
         self.current = 0
         self.line_number = 1
         self.braces_counter = 0
+        self.symbols = SymbolTable()
         
         # Dictionary of Manipula keywords
         self.keywords = {
@@ -67,7 +69,7 @@ class Scanner():
     def add_token(self, token_type, literal=None):
         ''' Function to add token to self.tokens. '''
         lexeme = self.source[self.start:self.current]
-        token = Token(token_type, lexeme, literal, self.line_number)
+        token = Token(token_type, lexeme, literal, self.line_number, self.start)
         self.tokens.append(token)
     
     
@@ -160,7 +162,10 @@ class Scanner():
         text = self.source[self.start:self.current]
         token_type = self.keywords.get(text)
         if token_type == None:
-            self.add_token(TokenType.IDENTIFIER)
+            # Identifiers share one interned lexeme per symbol
+            symbol_id = self.symbols.intern(text)
+            self.tokens.append(Token(TokenType.IDENTIFIER, self.symbols.names[symbol_id],
+                                     None, self.line_number, self.start, symbol_id))
         else:
             self.add_token(token_type)
     
@@ -294,4 +299,4 @@ class Scanner():
             self.start = self.current
             self.scan_token()
             
-        self.tokens.append(Token(TokenType.EOF, '', None, self.line_number))
\ No newline at end of file
+        self.tokens.append(Token(TokenType.EOF, '', None, self.line_number, self.current))
\ No newline at end of file
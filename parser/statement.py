@@ -60,6 +60,14 @@ class Statement(ABC):
     visitor to traverse a hierachichal structure of objects.
     
     '''
+    __slots__ = ()
+
+
+    def __reduce__(self):
+        ''' Function to pickle a node as a call to its constructor, whose arguments match its slots. '''
+        return (type(self), tuple([getattr(self, name) for name in self.__slots__]))
+
+
     @abstractmethod
     def accept(visitor):
         ''' The visistor traverses and accesses each object through this method. '''
@@ -67,10 +75,10 @@ class Statement(ABC):
 
 
 class Expression(Statement):
+    __slots__ = ('expression',)
     
     
     def __init__(self, expression):
-        super().__init__()
         self.expression = expression
         
         
@@ -79,10 +87,10 @@ class Expression(Statement):
         
 
 class Print(Statement):
+    __slots__ = ('expression',)
     
     
     def __init__(self, expression):
-        super().__init__()
         self.expression = expression
         
         
@@ -91,10 +99,10 @@ class Print(Statement):
          
     
 class Variable_Statement(Statement):
+    __slots__ = ('name', 'initialiser')
     
     
     def __init__(self, name, initialiser):
-        super().__init__()
         self.name = name
         self.initialiser = initialiser
         
@@ -104,10 +112,10 @@ class Variable_Statement(Statement):
     
 
 class If(Statement):
+    __slots__ = ('condition', 'then_branch', 'elif_branch', 'else_branch')
     
     
     def __init__(self, condition, then_branch, elif_branch, else_branch):
-        super().__init__()
         self.condition = condition
         self.then_branch = then_branch
         self.elif_branch = elif_branch
@@ -119,10 +127,10 @@ class If(Statement):
     
     
 class Elif(Statement):
+    __slots__ = ('condition', 'then_branch')
     
     
     def __init__(self, condition, then_branch):
-        super().__init__()
         self.condition = condition
         self.then_branch = then_branch
         
@@ -132,10 +140,10 @@ class Elif(Statement):
     
     
 class While(Statement):
+    __slots__ = ('condition', 'body')
     
     
     def __init__(self, condition, body):
-        super().__init__()
         self.condition = condition
         self.body = body
         
@@ -145,10 +153,10 @@ class While(Statement):
     
     
 class For(Statement):
+    __slots__ = ('initialiser', 'body')
     
     
     def __init__(self, initialiser, body):
-        super().__init__()
         self.initialiser = initialiser
         self.body = body
         
@@ -0,0 +1,159 @@
+'''
+File containing the streaming scanner and token stream classes.
+
+'''
+
+
+from tokens import TokenType, Token
+from regex_scanner import RegexScanner, TOKEN_PATTERN, OPERATORS, skip_comment
+
+
+class StreamingScanner(RegexScanner):
+    '''
+    Scanner that reads a file object in chunks and yields tokens lazily.
+
+    Only the unscanned tail of the current chunk is kept in memory, so
+    peak memory does not grow with the size of the input. Tokens, strings
+    and nested comments may span chunk boundaries.
+
+    '''
+
+
+    def __init__(self, file, chunk_size=1 << 16):
+        self.file = file
+        self.chunk_size = chunk_size
+        super().__init__('')
+
+
+    def scan_source_code(self):
+        ''' Overwrites Scanner.scan_source_code(), tokens are only scanned when iterated. '''
+        return
+
+
+    def __iter__(self):
+        return self.generate_tokens()
+
+
+    def generate_tokens(self):
+        ''' Function to lazily scan tokens from the file, chunk by chunk. '''
+        match = TOKEN_PATTERN.match
+        keywords = self.keywords
+        intern = self.symbols.intern
+        names = self.symbols.names
+        buffer = ''
+        base = 0 # Offset of the buffer in the file
+        position = 0
+        depth = 0
+        final = False
+
+        while not final:
+            chunk = self.file.read(self.chunk_size)
+            final = chunk == ''
+            buffer = buffer[position:] + chunk
+            base += position
+            position = 0
+            length = len(buffer)
+
+            # Finish a comment left open by the previous chunk
+            if depth:
+                end, depth = skip_comment(buffer, position, depth)
+                self.line_number += buffer.count('\n', position, end)
+                position = end
+                if depth:
+                    if final:
+                        self.error('Unmatched character "{"')
+                    continue
+
+            while position < length:
+                found = match(buffer, position)
+                kind = found.lastgroup
+                end = found.end()
+
+                # A token touching the end of the chunk may continue in the
+                # next one, e.g. "ab|c", ":|=" or "1.|5"
+                if end + 2 > length and not final and kind != 'STRING' and kind != 'COMMENT':
+                    break
+
+                if kind == 'WHITESPACE':
+                    self.line_number += buffer.count('\n', position, end)
+                elif kind == 'IDENTIFIER':
+                    text = found.group()
+                    token_type = keywords.get(text)
+                    if token_type == None:
+                        symbol_id = intern(text)
+                        yield Token(TokenType.IDENTIFIER, names[symbol_id], None,
+                                    self.line_number, base + position, symbol_id)
+                    else:
+                        yield Token(token_type, text, None, self.line_number, base + position)
+                elif kind == 'OPERATOR':
+                    text = found.group()
+                    yield Token(OPERATORS[text], text, None, self.line_number, base + position)
+                elif kind == 'NUMBER':
+                    text = found.group()
+                    yield Token(TokenType.NUMBER, text, float(text), self.line_number, base + position)
+                elif kind == 'STRING':
+                    text = found.group()
+                    self.line_number += text.count('\n')
+                    yield Token(TokenType.STRING, text, text[1:-1], self.line_number, base + position)
+                elif kind == 'COMMENT':
+                    end, depth = skip_comment(buffer, end)
+                    self.line_number += buffer.count('\n', position, end)
+                    if depth:
+                        if final:
+                            self.error('Unmatched character "{"')
+                        position = end
+                        break
+                elif kind == 'UNMATCHED':
+                    self.error('Unmatched character "}"')
+                elif kind == 'UNTERMINATED':
+                    # The closing quote may be in a later chunk
+                    if not final:
+                        break
+                    self.line_number += buffer.count('\n', position)
+                    self.error('Untermenated string')
+                    position = length
+                    break
+                else:
+                    self.error(f'Unexpected character "{found.group()}"')
+                position = end
+
+        yield Token(TokenType.EOF, '', None, self.line_number, base + len(buffer))
+
+
+class TokenStream:
+    '''
+    Sliding window over a lazily produced token sequence.
+
+    Supports the indexing the Parser does, tokens[current - 1] up to
+    tokens[current + 1], while discarding tokens the Parser can no longer
+    reach.
+
+    '''
+
+
+    def __init__(self, tokens, lookbehind=2):
+        self.tokens = iter(tokens)
+        self.lookbehind = lookbehind
+        self.buffer = []
+        self.first = 0
+        self.exhausted = False
+
+
+    def __getitem__(self, index):
+        ''' Function to get the token at index, pulling more tokens as needed. '''
+        if index < self.first:
+            raise IndexError(f'token {index} is no longer buffered')
+        while index - self.first >= len(self.buffer):
+            if self.exhausted:
+                raise IndexError('token stream exhausted')
+            try:
+                self.buffer.append(next(self.tokens))
+            except StopIteration:
+                self.exhausted = True
+
+        # Drop tokens the Parser can no longer look back to
+        discard = index - self.lookbehind - self.first
+        if discard > 64:
+            del self.buffer[:discard]
+            self.first += discard
+        return self.buffer[index - self.first]
@@ -0,0 +1,36 @@
+'''
+File containing the symbol table class.
+
+'''
+
+
+class SymbolTable:
+    '''
+    Per-source table of the distinct identifiers a scanner has seen.
+
+    Each identifier is stored once, with its case-folded form, under a
+    dense integer symbol id. Tokens carry the id so later passes can key
+    on it instead of hashing and lowering the lexeme every time.
+
+    '''
+    
+    
+    def __init__(self):
+        self.ids = dict()
+        self.names = []
+        self.folded = []
+        
+        
+    def __len__(self):
+        return len(self.names)
+        
+        
+    def intern(self, name):
+        ''' Function to get the symbol id of name, adding it if new. '''
+        symbol_id = self.ids.get(name)
+        if symbol_id == None:
+            symbol_id = len(self.names)
+            self.ids[name] = symbol_id
+            self.names.append(name)
+            self.folded.append(name.lower())
+        return symbol_id
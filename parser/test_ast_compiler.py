@@ -0,0 +1,14 @@
+'''
+Tests that AstCompiler runs programs as Interpreter does.
+
+'''
+
+
+import pytest
+
+from conformance import CORPUS, run
+
+
+@pytest.mark.parametrize('name', CORPUS)
+def test_runs_as_interpreter(name):
+    assert run(CORPUS[name], 'AstCompiler') == run(CORPUS[name])
@@ -0,0 +1,58 @@
+'''
+Tests for BlockParser and passes over deeply nested programs.
+
+'''
+
+
+from regex_scanner import RegexScanner
+from custom_parser import Parser
+from block_parser import BlockParser
+from python_printer import PythonPrinter
+from interpreter import Interpreter
+from manipula import Manipula
+from nesting import nesting_depth
+import interpreter
+
+
+def nested_source(depth):
+    ''' Function to generate IF, FOR and WHILE blocks nested depth levels deep. '''
+    openers = ['IF a > 1 THEN\n', 'FOR i := 1 TO 2 DO\n', 'WHILE (b) DO\n']
+    closers = ['ELSEIF a < 1 THEN PRINT 1\nELSE PRINT 2\nENDIF\n', 'ENDDO\n', 'ENDDO\n']
+    levels = [level % 3 for level in range(depth)]
+    return (''.join(openers[level] for level in levels) + 'x := 1\n'
+            + ''.join(closers[level] for level in reversed(levels)))
+
+
+def runnable_source(depth):
+    ''' Function to generate IF and FOR blocks nested depth levels deep that each run once. '''
+    openers = ['IF a > 1 THEN\n', 'FOR i := 1 TO 1 DO\n']
+    closers = ['ENDIF\n', 'ENDDO\n']
+    return ('a := 2\nx := 0\n' + ''.join(openers[level % 2] for level in range(depth))
+            + 'x := x + 1\n' + ''.join(closers[level % 2] for level in reversed(range(depth))))
+
+
+def test_same_statements_as_parser():
+    tokens = RegexScanner(nested_source(60)).tokens
+    assert PythonPrinter._write(BlockParser(tokens).parse())[0] == PythonPrinter._write(Parser(tokens).parse())[0]
+
+
+def test_parses_deep_nesting():
+    statements = BlockParser(RegexScanner(nested_source(10000)).tokens).parse()
+    assert len(statements) == 1
+    assert nesting_depth(statements) == 10000
+
+
+def test_interprets_nesting_within_limit():
+    statements = BlockParser(RegexScanner(runnable_source(100)).tokens).parse()
+    Interpreter().interpret(statements)
+    assert interpreter.environment.values['x'] == 1.0
+    interpreter.environment.values.clear()
+
+
+def test_prints_nesting_within_limit(tmp_path):
+    path = tmp_path / 'deep.man'
+    path.write_text(runnable_source(99))
+    syntax = Manipula(str(path), parser_class=BlockParser).syntax
+    assert len(syntax) == 3
+    assert syntax[2].count('\n') == 99
+    assert syntax[2].endswith('\t' * 99 + 'x = x + 1.0')
@@ -0,0 +1,32 @@
+'''
+Tests that CommonSubexpressions keeps the results of programs.
+
+'''
+
+
+import pytest
+
+from conformance import CORPUS, ENGINES, parse, run
+from optimiser import Optimiser
+from dead_code import DeadCodeEliminator
+from loop_invariants import LoopInvariantMotion
+from common_subexpressions import CommonSubexpressions
+
+
+def test_reuses_repeats():
+    CommonSubexpressions.eliminate(parse(CORPUS['while']))
+    assert CommonSubexpressions.reused > 0
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', CORPUS)
+def test_keeps_results(name, engine):
+    assert run(CORPUS[name], engine, [CommonSubexpressions.eliminate]) == run(CORPUS[name])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', CORPUS)
+def test_keeps_results_after_other_passes(name, engine):
+    passes = [Optimiser.optimise, DeadCodeEliminator.eliminate, LoopInvariantMotion.move,
+              CommonSubexpressions.eliminate]
+    assert run(CORPUS[name], engine, passes) == run(CORPUS[name])
@@ -0,0 +1,45 @@
+'''
+Tests for DeadCodeEliminator.
+
+'''
+
+
+import pytest
+
+from conformance import CORPUS, ENGINES, parse, run
+from optimiser import Optimiser
+from dead_code import DeadCodeEliminator
+
+
+PASSES = [DeadCodeEliminator.eliminate]
+
+
+def test_keeps_store_before_empty_loop():
+    source = 'n := 0\nIF 1 > 0 THEN\nn := 1\nENDIF\nFOR i := 5 TO 1 DO\nn := 2\nENDDO\nPRINT n'
+    assert run(source, passes=PASSES) == run(source)
+    assert run(source, passes=PASSES)[0] == '1.0\n'
+
+
+def test_keeps_store_before_runtime_error():
+    source = "d := 'x'\na := 2\na := (d <= d)"
+    assert run(source, passes=PASSES) == run(source)
+    assert run(source, passes=PASSES)[1]['a'] == 2.0
+
+
+def test_removes_overwritten_store():
+    source = 'a := 1\na := 2\nPRINT a'
+    DeadCodeEliminator.eliminate(parse(source))
+    assert len(DeadCodeEliminator.report) == 1
+    assert run(source, passes=PASSES) == run(source)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', CORPUS)
+def test_keeps_results(name, engine):
+    assert run(CORPUS[name], engine, PASSES) == run(CORPUS[name])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', CORPUS)
+def test_keeps_results_after_optimiser(name, engine):
+    assert run(CORPUS[name], engine, [Optimiser.optimise] + PASSES) == run(CORPUS[name])
@@ -0,0 +1,30 @@
+'''
+Tests for FOR loops on every engine.
+
+'''
+
+
+import pytest
+
+from conformance import ENGINES, run
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_empty_loop(engine):
+    output, values, error = run('n := 0\nFOR i := 5 TO 1 DO\nn := n + 1\nENDDO', engine)
+    assert error == None
+    assert values == {'n': 0.0}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_one_step_loop(engine):
+    output, values, error = run('n := 0\nFOR i := 3 TO 3 DO\nn := n + i\nENDDO', engine)
+    assert error == None
+    assert values == {'n': 3.0, 'i': 3.0}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_counts_up_to_upper(engine):
+    output, values, error = run('FOR i := 1 TO 3 DO\nPRINT i\nENDDO', engine)
+    assert output == '1.0\n2.0\n3.0\n'
+    assert values == {'i': 3.0}
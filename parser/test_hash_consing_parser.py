@@ -0,0 +1,43 @@
+'''
+Tests for HashConsingParser.
+
+'''
+
+
+import contextlib
+import io
+
+import pytest
+
+from regex_scanner import RegexScanner
+from hash_consing_parser import HashConsingParser
+from interpreter import Interpreter
+import interpreter
+
+
+def parse(source):
+    ''' Function to scan and parse a source with shared subtrees. '''
+    return HashConsingParser(RegexScanner(source).tokens).parse()
+
+
+def test_shares_repeats_on_a_line():
+    statements = parse('PRINT (a + 1) * (a + 1)')
+    product = statements[0].expression
+    assert product.left is product.right
+
+
+def test_keeps_operator_lexemes_apart():
+    statements = parse('PRINT (a <> 2) AND (a != 2)')
+    logical = statements[0].expression
+    assert logical.left is not logical.right
+    assert logical.left.expression.operator.lexeme == '<>'
+    assert logical.right.expression.operator.lexeme == '!='
+
+
+def test_reports_line_of_each_occurrence():
+    statements = parse("a := 1\nPRINT a - 1\na := 'x'\nc := a - 1")
+    interpreter.environment.values.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with pytest.raises(RuntimeError, match='line 4'):
+            Interpreter().interpret(statements)
+    interpreter.environment.values.clear()
@@ -0,0 +1,82 @@
+'''
+Tests for LoopInvariantMotion.
+
+'''
+
+
+import pytest
+
+from conformance import CORPUS, ENGINES, parse, run
+from python_printer import PythonPrinter
+from optimiser import Optimiser
+from dead_code import DeadCodeEliminator
+from loop_invariants import LoopInvariantMotion
+
+
+SOURCE = '''a := 2
+b := 3
+n := 0
+m := 0
+i := 0
+WHILE (i < 3) DO
+n := n + a * b
+IF n > 6 THEN
+m := m + 1
+n := n + 1
+ENDIF
+i := i + 1
+ENDDO
+FOR j := 1 TO 3 DO
+n := n + a * b
+ENDDO
+FOR k := 5 TO 1 DO
+n := n + 100
+ENDDO
+FOR h := a + 0.5 TO b + 1 DO
+n := n + h
+ENDDO
+IF n > 100 THEN
+m := 1
+ELSEIF n > 5 THEN
+m := m + 10
+m := m * 2
+ELSE
+m := 3
+ENDIF'''
+
+
+def exec_printed(statements):
+    ''' Function to run the Python printed for statements, returning its variables but temporaries. '''
+    namespace = dict()
+    exec('\n'.join(PythonPrinter._write(statements)[0]), namespace)
+    return {name: value for name, value in namespace.items()
+            if name != '__builtins__' and not name.startswith('_invariant')}
+
+
+def test_moves_invariants():
+    LoopInvariantMotion.move(parse(SOURCE))
+    assert LoopInvariantMotion.moved == 2
+
+
+def test_printed_python_runs_as_interpreter():
+    output, values, error = run(SOURCE)
+    assert error == None
+    assert exec_printed(parse(SOURCE)) == values
+
+
+def test_moved_printed_python_runs_as_interpreter():
+    output, values, error = run(SOURCE)
+    assert exec_printed(LoopInvariantMotion.move(parse(SOURCE))) == values
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', CORPUS)
+def test_keeps_results(name, engine):
+    assert run(CORPUS[name], engine, [LoopInvariantMotion.move]) == run(CORPUS[name])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', CORPUS)
+def test_keeps_results_after_other_passes(name, engine):
+    passes = [Optimiser.optimise, DeadCodeEliminator.eliminate, LoopInvariantMotion.move]
+    assert run(CORPUS[name], engine, passes) == run(CORPUS[name])
@@ -0,0 +1,19 @@
+'''
+Tests for converting files with Manipula and convert_stream.
+
+'''
+
+
+import io
+
+from manipula import convert_stream
+from python_printer import PythonPrinter
+
+
+def test_streams_without_keeping_identifiers(tmp_path):
+    path = tmp_path / 'long.man'
+    path.write_text(''.join(f'a{line} := {line}\n' for line in range(1000)))
+    output = io.StringIO()
+    convert_stream(str(path), output, chunk_size=256)
+    assert output.getvalue().splitlines()[-1] == 'a999 = 999.0'
+    assert PythonPrinter.identifiers == []
@@ -0,0 +1,16 @@
+'''
+Tests that Optimiser keeps the results of programs.
+
+'''
+
+
+import pytest
+
+from conformance import CORPUS, ENGINES, run
+from optimiser import Optimiser
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', CORPUS)
+def test_keeps_results(name, engine):
+    assert run(CORPUS[name], engine, [Optimiser.optimise]) == run(CORPUS[name])
@@ -0,0 +1,42 @@
+'''
+Tests for printing range lists with PythonPrinter.
+
+'''
+
+
+from conformance import parse, run
+from python_printer import PythonPrinter
+from range_set import RangeSet
+
+
+SOURCE = '''a := 2
+c := 1.5
+b := a IN [1.5..4]
+d := c IN [1.5..4]
+e := (a + 0.5) IN [1.5..4]
+f := (a + 1) IN [(c)..4]
+s := [1.5..4]
+t := [(c)..3]
+u := [5..1]
+v := [1..3]'''
+
+
+def exec_printed(statements):
+    ''' Function to run the Python printed for statements, returning its variables. '''
+    namespace = dict()
+    exec('\n'.join(PythonPrinter._write(statements)[0]), namespace)
+    del namespace['__builtins__']
+    return namespace
+
+
+def test_range_lists_hold_interpreter_values():
+    output, values, error = run(SOURCE)
+    printed = exec_printed(parse(SOURCE))
+    assert {name: set(value) if isinstance(value, RangeSet) else value
+            for name, value in values.items()} == printed
+
+
+def test_membership_evaluates_value_once():
+    syntax = PythonPrinter._write(parse(SOURCE))[0]
+    assert syntax[4].count('a + 0.5') == 1
+    assert syntax[5].count('a + 1.0') == 1
@@ -0,0 +1,22 @@
+'''
+Tests for Resolver and the errors for undefined variables.
+
+'''
+
+
+import pytest
+
+from conformance import ENGINES, run
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_same_message_on_every_engine(engine):
+    assert run('PRINT missing', engine)[2] == 'Undefined variable "missing"'
+    assert run('a := 1\nmissing := a', engine)[2] == None
+    assert run('a := 1\nIF a > 0 THEN\nmissing := 2\nENDIF', engine)[2] == 'Undefined variable "missing"'
+
+
+def test_interpreter_rejects_branch_that_never_runs():
+    source = 'a := 1\nIF a > 5 THEN\nPRINT missing\nENDIF'
+    assert run(source)[2] == 'Undefined variable "missing"'
+    assert run(source, 'ClosureCompiler')[2] == None
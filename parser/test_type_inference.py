@@ -0,0 +1,20 @@
+'''
+Tests that skipping type checks TypeInference proves changes no results.
+
+'''
+
+
+import pytest
+
+from conformance import CORPUS, run
+from interpreter import Interpreter
+
+
+def unchecked(statements):
+    ''' Function to interpret statements with every type check kept. '''
+    Interpreter(infer_types=False).interpret(statements)
+
+
+@pytest.mark.parametrize('name', CORPUS)
+def test_runs_as_without_inference(name):
+    assert run(CORPUS[name]) == run(CORPUS[name], unchecked)
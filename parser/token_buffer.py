@@ -0,0 +1,207 @@
+'''
+File containing the compact token buffer and token view classes.
+
+'''
+
+
+import re
+from array import array
+from bisect import bisect_right
+
+from tokens import TokenType, Token
+from regex_scanner import RegexScanner, TOKEN_PATTERN, OPERATORS, skip_comment
+
+
+# Token types are stored as one byte codes
+KINDS = list(TokenType)
+KIND_CODES = {token_type: code for code, token_type in enumerate(KINDS)}
+IDENTIFIER_CODE = KIND_CODES[TokenType.IDENTIFIER]
+
+NEWLINE_PATTERN = re.compile('\n')
+
+
+class TokenView(Token):
+    '''
+    Lightweight view of one token in a TokenBuffer.
+
+    Has the same attributes as Token, computed on demand from the buffer's
+    columns, so the Parser and printers can use it in place of a Token.
+    Token's slots are shadowed by these properties and never filled.
+
+    '''
+    __slots__ = ('buffer', 'index')
+
+
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index = index
+
+
+    def __reduce__(self):
+        ''' Function to pickle a view as its buffer and index, as the properties cannot be set. '''
+        return (TokenView, (self.buffer, self.index))
+
+
+    @property
+    def type(self):
+        return KINDS[self.buffer.kinds[self.index]]
+
+
+    @property
+    def lexeme(self):
+        symbol_id = self.symbol_id
+        if symbol_id != None:
+            return self.buffer.symbols.names[symbol_id]
+        buffer = self.buffer
+        return buffer.source[buffer.starts[self.index]:buffer.ends[self.index]]
+
+
+    @property
+    def literal(self):
+        buffer = self.buffer
+        literal_index = buffer.literal_indices[self.index]
+        if literal_index < 0 or buffer.kinds[self.index] == IDENTIFIER_CODE:
+            return None
+        return buffer.literals[literal_index]
+
+
+    @property
+    def symbol_id(self):
+        buffer = self.buffer
+        if buffer.kinds[self.index] == IDENTIFIER_CODE:
+            return buffer.literal_indices[self.index]
+        return None
+
+
+    @property
+    def line_number(self):
+        return self.buffer.line_number(self.index)
+
+
+    @property
+    def offset(self):
+        return self.buffer.starts[self.index]
+
+
+class TokenBuffer:
+    '''
+    Struct-of-arrays store of a source's tokens.
+
+    Each token is a kind code, a start and end offset into the source and
+    an index into the literals list (-1 for no literal). Identifiers have
+    no literal, so for them the index column holds their symbol id instead.
+    Line numbers are computed on demand from a table of line start offsets.
+
+    '''
+
+
+    def __init__(self, source, symbols):
+        self.source = source
+        self.symbols = symbols
+        offset_type = 'I' if len(source) < 1 << 32 else 'Q'
+        self.kinds = array('B')
+        self.starts = array(offset_type)
+        self.ends = array(offset_type)
+        self.literal_indices = array('i')
+        self.literals = []
+        self.line_starts = array(offset_type, [0])
+        self.line_starts.extend(found.end() for found in NEWLINE_PATTERN.finditer(source))
+
+
+    def __len__(self):
+        return len(self.kinds)
+
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.kinds)
+        if index < 0 or index >= len(self.kinds):
+            raise IndexError('token index out of range')
+        return TokenView(self, index)
+
+
+    def append(self, token_type, start, end, literal=None):
+        ''' Function to add a token to the end of the buffer. '''
+        self.kinds.append(KIND_CODES[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+        if token_type == TokenType.IDENTIFIER:
+            self.literal_indices.append(self.symbols.intern(self.source[start:end]))
+        elif literal == None:
+            self.literal_indices.append(-1)
+        else:
+            self.literal_indices.append(len(self.literals))
+            self.literals.append(literal)
+
+
+    def line_number(self, index):
+        '''
+        Function to compute the line number of a token.
+
+        Like Scanner, a token that spans lines (a multiline string) is on
+        the line it ends on.
+
+        '''
+        start = self.starts[index]
+        end = self.ends[index]
+        if end > start:
+            end -= 1
+        return bisect_right(self.line_starts, end)
+
+
+class BufferScanner(RegexScanner):
+    '''
+    Scanner that stores its tokens in a TokenBuffer instead of a list of
+    Token objects. self.tokens is the buffer.
+
+    '''
+
+
+    def scan_source_code(self):
+        ''' Function to scan source code and extract tokens. '''
+        source = self.source
+        tokens = TokenBuffer(source, self.symbols)
+        append = tokens.append
+        length = len(source)
+        match = TOKEN_PATTERN.match
+        keywords = self.keywords
+        position = 0
+
+        while position < length:
+            found = match(source, position)
+            kind = found.lastgroup
+            end = found.end()
+
+            if kind == 'WHITESPACE':
+                self.line_number += source.count('\n', position, end)
+            elif kind == 'IDENTIFIER':
+                token_type = keywords.get(found.group())
+                if token_type == None:
+                    token_type = TokenType.IDENTIFIER
+                append(token_type, position, end)
+            elif kind == 'OPERATOR':
+                append(OPERATORS[found.group()], position, end)
+            elif kind == 'NUMBER':
+                append(TokenType.NUMBER, position, end, float(found.group()))
+            elif kind == 'STRING':
+                self.line_number += source.count('\n', position, end)
+                append(TokenType.STRING, position, end, source[position + 1:end - 1])
+            elif kind == 'COMMENT':
+                end, depth = skip_comment(source, end)
+                self.line_number += source.count('\n', position, end)
+                if depth:
+                    self.error('Unmatched character "{"')
+                    break
+            elif kind == 'UNMATCHED':
+                self.error('Unmatched character "}"')
+            elif kind == 'UNTERMINATED':
+                end = length
+                self.line_number += source.count('\n', position, end)
+                self.error('Untermenated string')
+                break
+            else:
+                self.error(f'Unexpected character "{found.group()}"')
+            position = end
+
+        append(TokenType.EOF, length, length)
+        self.tokens = tokens
@@ -53,14 +53,28 @@ class TokenType(Enum):
     EOF = None
     
     
+    def __reduce_ex__(self, protocol):
+        '''
+        Pickle members by name.
+        
+        IDENTIFIER's value is a bare object(), which does not survive
+        pickling by value, e.g. when sending tokens to worker processes.
+        
+        '''
+        return getattr, (self.__class__, self.name)
+    
+    
 class Token():
+    __slots__ = ('type', 'lexeme', 'literal', 'line_number', 'offset', 'symbol_id')
 
     
-    def __init__(self, token_type, lexeme, literal, line_number):
+    def __init__(self, token_type, lexeme, literal, line_number, offset=None, symbol_id=None):
         self.type = token_type
         self.lexeme = lexeme
         self.literal = literal
         self.line_number = line_number
+        self.offset = offset # Index of the first character in the source
+        self.symbol_id = symbol_id # Index into the scanner's SymbolTable
         
         
     def __repr__(self):
@@ -0,0 +1,281 @@
+'''
+File containing the type inference class.
+
+'''
+
+
+import operator
+
+from tokens import TokenType
+from expression import Visitor as Expression_Visitor, Binary, Unary
+from statement import Visitor as Statement_Visitor
+from environment import key, variable_token
+from range_set import RangeSet
+
+
+# A type is the frozenset of Python types a value may have, or None when
+# nothing is known. The empty set is an expression that never has a value.
+NUMBER = frozenset((float,))
+STRING = frozenset((str,))
+BOOLEAN = frozenset((bool,))
+NONE = frozenset((type(None),))
+LIST = frozenset((list,))
+RANGE = frozenset((RangeSet,))
+NOTHING = frozenset()
+UNKNOWN = None
+
+# Check-free operators for two numbers, and the type of their result
+NUMBER_OPERATORS = {
+    TokenType.PLUS: (operator.add, NUMBER),
+    TokenType.MINUS: (operator.sub, NUMBER),
+    TokenType.FWD_SLASH: (operator.truediv, NUMBER),
+    TokenType.STAR: (operator.mul, NUMBER),
+    TokenType.GREATER: (operator.gt, BOOLEAN),
+    TokenType.GREATER_EQUAL: (operator.ge, BOOLEAN),
+    TokenType.LESS: (operator.lt, BOOLEAN),
+    TokenType.LESS_EQUAL: (operator.le, BOOLEAN),
+    }
+
+# Types of the checked operators, which return this or raise
+CHECKED_TYPES = {
+    TokenType.PLUS: NUMBER | STRING,
+    TokenType.MINUS: NUMBER,
+    TokenType.FWD_SLASH: NUMBER,
+    TokenType.STAR: NUMBER,
+    TokenType.GREATER: BOOLEAN,
+    TokenType.GREATER_EQUAL: BOOLEAN,
+    TokenType.LESS: BOOLEAN,
+    TokenType.LESS_EQUAL: BOOLEAN,
+    TokenType.IN: BOOLEAN,
+    TokenType.EQUAL_EQUAL: BOOLEAN,
+    TokenType.BANG_EQUAL: BOOLEAN,
+    }
+
+
+def join(a, b):
+    ''' Function to get the type of a value that has type a or type b. '''
+    if a == UNKNOWN or b == UNKNOWN:
+        return UNKNOWN
+    return a | b
+
+
+class TypeInference(Expression_Visitor, Statement_Visitor):
+    '''
+    Infers the types of expressions and marks the operators whose
+    operand types are proven, so Interpreter can skip their checks.
+
+    A variable's type is the join of every value declared or assigned to
+    it anywhere in the program, and of its value in the environment, so
+    it holds wherever the variable is read. FOR counters are numbers. The
+    program is walked until the variable types stop changing, then once
+    more to set Binary.specialised and Unary.specialised to the check-free
+    function, or None where the checked path is still needed.
+
+    '''
+
+
+    variables = None
+    changed = False
+    annotate = False
+
+
+    def infer(statements, environment=None):
+        ''' Function to infer types and mark the operators, returning the type of each variable by key. '''
+        TypeInference.variables = dict()
+        if environment != None:
+            for name_key, value in environment.values.items():
+                TypeInference.variables[name_key] = frozenset((type(value),))
+        TypeInference.annotate = False
+        TypeInference.changed = True
+        while TypeInference.changed:
+            TypeInference.changed = False
+            TypeInference.block(statements)
+        TypeInference.annotate = True
+        TypeInference.block(statements)
+        return TypeInference.variables
+
+
+    def clear(statements):
+        ''' Function to unmark every operator, so all of them are checked. '''
+        pending = list(statements)
+        while pending:
+            node = pending.pop()
+            if isinstance(node, list):
+                pending.extend(node)
+            elif hasattr(node, 'accept'):
+                if type(node) in (Binary, Unary):
+                    node.specialised = None
+                pending.extend(getattr(node, slot) for slot in type(node).__slots__)
+
+
+    def block(statements):
+        ''' Function to walk a list of statements. '''
+        for statement in statements:
+            statement.accept(TypeInference)
+
+
+    def type_of(expression):
+        ''' Function to send an expression back into the visitor implementation for its type. '''
+        return expression.accept(TypeInference)
+
+
+    def define(name, value_type):
+        ''' Function to widen a variable's type by a value given to it. '''
+        name_key = key(variable_token(name))
+        old_type = TypeInference.variables.get(name_key, NOTHING)
+        new_type = join(old_type, value_type)
+        if new_type != old_type:
+            TypeInference.variables[name_key] = new_type
+            TypeInference.changed = True
+
+
+    def mark(expression, function):
+        ''' Function to record the check-free function of an operator, once types are final. '''
+        if TypeInference.annotate:
+            expression.specialised = function
+
+
+# =============================================================================
+# Statements
+# =============================================================================
+
+
+    def visit_expression_statement(statement):
+        ''' Overwrites Statement.visit_expression_statement() class method. '''
+        TypeInference.type_of(statement.expression)
+
+
+    def visit_print(statement):
+        ''' Overwrites Statement.visit_print() class method. '''
+        TypeInference.type_of(statement.expression)
+
+
+    def visit_variable_statement(statement):
+        ''' Overwrites Statement.visit_variable_statement() class method. '''
+        value_type = NONE
+        if statement.initialiser != None:
+            value_type = TypeInference.type_of(statement.initialiser)
+        TypeInference.define(statement.name, value_type)
+
+
+    def visit_if(statement):
+        ''' Overwrites Statement.visit_if() class method. '''
+        TypeInference.type_of(statement.condition)
+        TypeInference.block(statement.then_branch)
+        for elif_branch in statement.elif_branch:
+            elif_branch.accept(TypeInference)
+        if statement.else_branch != None:
+            TypeInference.block(statement.else_branch)
+
+
+    def visit_elif(statement):
+        ''' Overwrites Statement.visit_elif() class method. '''
+        TypeInference.type_of(statement.condition)
+        TypeInference.block(statement.then_branch)
+
+
+    def visit_while(statement):
+        ''' Overwrites Statement.visit_while() class method. '''
+        TypeInference.type_of(statement.condition)
+        TypeInference.block(statement.body)
+
+
+    def visit_for(statement):
+        ''' Overwrites Statement.visit_for() class method. '''
+        initialiser = statement.initialiser
+        if not hasattr(initialiser, 'initialiser') or initialiser.initialiser == None:
+            return
+        TypeInference.type_of(initialiser.initialiser)
+        TypeInference.define(initialiser.name, NUMBER)
+        TypeInference.block(statement.body)
+
+
+# =============================================================================
+# Expressions
+# =============================================================================
+
+
+    def visit_binary(expression):
+        ''' Overwrites Expression.visit_binary() class method. '''
+        left = TypeInference.type_of(expression.left)
+        right = TypeInference.type_of(expression.right)
+        operator_type = expression.operator.type
+        if left == NUMBER and right == NUMBER and operator_type in NUMBER_OPERATORS:
+            function, result = NUMBER_OPERATORS[operator_type]
+            TypeInference.mark(expression, function)
+            return result
+        if left == STRING and right == STRING and operator_type == TokenType.PLUS:
+            TypeInference.mark(expression, operator.add)
+            return STRING
+        if operator_type in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL) and left != UNKNOWN \
+                and right != UNKNOWN and type(None) not in left and type(None) not in right:
+            # Interpreter.is_equal() only differs from == for None
+            TypeInference.mark(expression, operator.eq if operator_type == TokenType.EQUAL_EQUAL else operator.ne)
+            return BOOLEAN
+        TypeInference.mark(expression, None)
+        return CHECKED_TYPES.get(operator_type, NONE)
+
+
+    def visit_grouping(expression):
+        ''' Overwrites Expression.visit_grouping() class method. '''
+        return TypeInference.type_of(expression.expression)
+
+
+    def visit_literal(expression):
+        ''' Overwrites Expression.visit_literal() class method. '''
+        return frozenset((type(expression.value),))
+
+
+    def visit_unary(expression):
+        ''' Overwrites Expression.visit_unary() class method. '''
+        right = TypeInference.type_of(expression.right)
+        operator_type = expression.operator.type
+        if operator_type == TokenType.MINUS:
+            TypeInference.mark(expression, operator.neg if right == NUMBER else None)
+            return NUMBER
+        elif operator_type == TokenType.BANG or operator_type == TokenType.NOT:
+            TypeInference.mark(expression, operator.not_ if right == BOOLEAN else None)
+            return BOOLEAN
+        TypeInference.mark(expression, None)
+        return NONE
+
+
+    def visit_variable_expression(expression):
+        ''' Overwrites Expression.visit_variable_expression() class method. '''
+        return TypeInference.variables.get(key(variable_token(expression)), NOTHING)
+
+
+    def visit_multi_identifier_variable_expression(expression):
+        ''' Overwrites Expression.visit_multi_identifier_variable_expression() class method. '''
+        return TypeInference.visit_variable_expression(expression)
+
+
+    def visit_assign(expression):
+        ''' Overwrites Expression.visit_assign() class method. '''
+        value_type = TypeInference.type_of(expression.value)
+        TypeInference.define(expression.name, value_type)
+        return value_type
+
+
+    def visit_logical(expression):
+        ''' Overwrites Expression.visit_logical() class method, which gives one of its operands. '''
+        return join(TypeInference.type_of(expression.left), TypeInference.type_of(expression.right))
+
+
+    def visit_list(expression):
+        ''' Overwrites Expression.visit_list() class method. '''
+        for element in expression.sequence:
+            TypeInference.type_of(element)
+        return LIST
+
+
+    def visit_range(expression):
+        ''' Overwrites Expression.visit_range() class method. '''
+        TypeInference.type_of(expression.lower)
+        TypeInference.type_of(expression.upper)
+        return RANGE
+
+
+    def visit_range_list(expression):
+        ''' Overwrites Expression.visit_range_list() class method. '''
+        return TypeInference.visit_range(expression)
@@ -0,0 +1,217 @@
+'''
+File containing the virtual machine class.
+
+'''
+
+
+from bytecode_compiler import CONSTANT, LOAD, DEFINE, ASSIGN, ASSIGN_KEEP, POP, PRINT, ADD, \
+    NUMBER_OPERATION, EQUAL, NOT_EQUAL, IN, NEGATE, NOT, RANGE, LIST, JUMP, JUMP_IF_FALSE, \
+    JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP, RANGE_ITERATOR, FOR_NEXT, FAIL, RETURN, \
+    COMPARE_JUMP, COMPARE_LOCAL_CONSTANT_JUMP, INCREMENT, DECREMENT, OPERATIONS
+from environment import UNDEFINED
+import interpreter
+from interpreter import RangeSet
+
+
+def mismatched(left, right, message):
+    ''' Function to report a + between anything but two numbers or two strings. '''
+    print('Unknown or mismatched types() of left and right expressions.'\
+          f'Left is type {type(left)}, right is type {type(right)}.')
+    raise RuntimeError(message)
+
+
+class VirtualMachine:
+    '''
+    Runs a Chunk from BytecodeCompiler with a value stack and a list of
+    slots.
+
+    The slots are loaded from an Environment before running and the
+    variables that were defined are written back afterwards, even after
+    an error, so the Environment ends as Interpreter would leave it.
+
+    '''
+
+
+    def run(chunk, environment=None):
+        ''' Function to run a chunk with variables in environment, by default the Interpreter's. '''
+        if environment == None:
+            environment = interpreter.environment
+        values = environment.values
+        slots = [values.get(name_key, UNDEFINED) for name_key in chunk.keys]
+        try:
+            VirtualMachine.execute(chunk, slots)
+        finally:
+            for name_key, value in zip(chunk.keys, slots):
+                if value is not UNDEFINED:
+                    values[name_key] = value
+
+
+    def execute(chunk, slots):
+        ''' Function to run the dispatch loop until RETURN. '''
+        code = chunk.code
+        constants = chunk.constants
+        names = chunk.names
+        operations = OPERATIONS
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        # The most frequent instructions in loops are tested first
+        while True:
+            opcode = code[pc]
+            if opcode == LOAD:
+                value = slots[code[pc + 1]]
+                if value is UNDEFINED:
+                    raise RuntimeError(f'Undefined variable "{names[code[pc + 1]]}"')
+                push(value)
+                pc += 2
+            elif opcode == CONSTANT:
+                push(constants[code[pc + 1]])
+                pc += 2
+            elif opcode == COMPARE_LOCAL_CONSTANT_JUMP:
+                left = slots[code[pc + 2]]
+                if type(left) is not float:
+                    if left is UNDEFINED:
+                        raise RuntimeError(f'Undefined variable "{names[code[pc + 2]]}"')
+                    raise RuntimeError(constants[code[pc + 4]])
+                if operations[code[pc + 1]](left, constants[code[pc + 3]]):
+                    pc += 6
+                else:
+                    pc = code[pc + 5]
+            elif opcode == INCREMENT or opcode == DECREMENT:
+                slot = code[pc + 1]
+                value = slots[slot]
+                if type(value) is not float:
+                    if value is UNDEFINED:
+                        raise RuntimeError(f'Undefined variable "{names[slot]}"')
+                    if opcode == INCREMENT:
+                        mismatched(value, constants[code[pc + 2]], constants[code[pc + 3]])
+                    raise RuntimeError(constants[code[pc + 3]])
+                if opcode == INCREMENT:
+                    slots[slot] = value + constants[code[pc + 2]]
+                else:
+                    slots[slot] = value - constants[code[pc + 2]]
+                pc += 4
+            elif opcode == JUMP:
+                pc = code[pc + 1]
+            elif opcode == ASSIGN:
+                slot = code[pc + 1]
+                if slots[slot] is UNDEFINED:
+                    raise RuntimeError(f'Undefined variable "{names[slot]}"')
+                slots[slot] = pop()
+                pc += 2
+            elif opcode == NUMBER_OPERATION:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise RuntimeError(constants[code[pc + 2]])
+                stack[-1] = operations[code[pc + 1]](left, right)
+                pc += 3
+            elif opcode == ADD:
+                right = pop()
+                left = stack[-1]
+                if (type(left) is float and type(right) is float) or (type(left) is str and type(right) is str):
+                    stack[-1] = left + right
+                else:
+                    mismatched(left, right, constants[code[pc + 1]])
+                pc += 2
+            elif opcode == COMPARE_JUMP:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise RuntimeError(constants[code[pc + 2]])
+                if operations[code[pc + 1]](left, right):
+                    pc += 4
+                else:
+                    pc = code[pc + 3]
+            elif opcode == JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    pc = code[pc + 1]
+                else:
+                    pc += 2
+            elif opcode == FOR_NEXT:
+                for number in stack[-1]:
+                    slots[code[pc + 1]] = number
+                    pc += 3
+                    break
+                else:
+                    pop()
+                    pc = code[pc + 2]
+            elif opcode == DEFINE:
+                slots[code[pc + 1]] = pop()
+                pc += 2
+            elif opcode == PRINT:
+                print(str(pop()))
+                pc += 1
+            elif opcode == POP:
+                pop()
+                pc += 1
+            elif opcode == ASSIGN_KEEP:
+                slot = code[pc + 1]
+                if slots[slot] is UNDEFINED:
+                    raise RuntimeError(f'Undefined variable "{names[slot]}"')
+                slots[slot] = stack[-1]
+                pc += 2
+            elif opcode == EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] == right
+                pc += 1
+            elif opcode == NOT_EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] != right
+                pc += 1
+            elif opcode == IN:
+                right = pop()
+                stack[-1] = stack[-1] in right
+                pc += 1
+            elif opcode == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+                pc += 1
+            elif opcode == NEGATE:
+                if type(stack[-1]) is not float:
+                    raise RuntimeError(constants[code[pc + 1]])
+                stack[-1] = -stack[-1]
+                pc += 2
+            elif opcode == JUMP_IF_FALSE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    pc = code[pc + 1]
+                else:
+                    pop()
+                    pc += 2
+            elif opcode == JUMP_IF_TRUE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    pop()
+                    pc += 2
+                else:
+                    pc = code[pc + 1]
+            elif opcode == RANGE:
+                upper = pop()
+                lower = stack[-1]
+                if type(lower) is not float or type(upper) is not float:
+                    raise RuntimeError(constants[code[pc + 1]])
+                stack[-1] = RangeSet(lower, upper)
+                pc += 2
+            elif opcode == LIST:
+                count = code[pc + 1]
+                if count:
+                    elements = stack[-count:]
+                    del stack[-count:]
+                else:
+                    elements = []
+                push(elements)
+                pc += 2
+            elif opcode == RANGE_ITERATOR:
+                if type(stack[-1]) is not RangeSet:
+                    raise RuntimeError('FOR initialiser must be a range, "name := lower TO upper"')
+                stack[-1] = stack[-1].steps()
+                pc += 1
+            elif opcode == FAIL:
+                raise RuntimeError(constants[code[pc + 1]])
+            elif opcode == RETURN:
+                return
+            else:
+                raise RuntimeError(f'Unknown opcode {opcode} at {pc}')